@@ -6,4 +6,6 @@ AntiORM, the ORM that goes against all others
 from utils import driver_factory as AntiORM
 #from backends.generic import Generic as AntiORM
 
-__all__ = ['AntiORM']
+from asynchronous import AsyncAntiORM
+
+__all__ = ['AntiORM', 'AsyncAntiORM']
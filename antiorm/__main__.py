@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""
+Command line interface of AntiORM
+"""
+
+from antiorm.compiler import main
+
+
+main()
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+Asynchronous engine, executing the generated methods on a pool of threads
+
+The calls to the methods return immediately an `AsyncResult` (with `get()`,
+`wait()` and `ready()` methods) while the query is executed on a bounded pool
+of threads, each one with its own connection, so the caller (like an event
+loop) is not blocked by the database driver.
+"""
+
+from multiprocessing.pool import ThreadPool
+from Queue                import Empty, Full, Queue
+from sys                  import exc_info
+
+from antiorm.pool  import ConnectionPool, ThreadLocalConnection
+from antiorm.utils import driver_factory
+
+
+# Modules of the connections that are used by one thread at a time
+THREAD_LOCAL = frozenset(('sqlite3', 'apsw'))
+
+
+class _Prefetcher(object):
+    """
+    Chunks of rows fetched on a thread of the pool for an `AsyncIterator`
+
+    The producer only references this object, so the iterator can be garbage
+    collected (stopping the producer) when the caller drops it.
+    """
+
+    def __init__(self, prefetch):
+        """
+        Constructor
+
+        @param prefetch: maximum number of prefetched chunks
+        @type prefetch: integer
+        """
+        self.queue = Queue(prefetch)
+        self.closed = False
+
+    def put(self, item):
+        """
+        Queue an item, returning False if the iterator was closed meanwhile
+        """
+        while not self.closed:
+            try:
+                self.queue.put(item, True, 0.1)
+            except Full:
+                continue
+            return True
+
+        return False
+
+    def produce(self, func, kwargs, chunk_size):
+        """
+        Fetch the rows and queue them in chunks (on a thread of the pool)
+        """
+        rows = None
+
+        try:
+            rows = func(kwargs)
+
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+
+                if len(chunk) >= chunk_size:
+                    if not self.put((chunk, None)):
+                        return
+                    chunk = []
+
+            if chunk and not self.put((chunk, None)):
+                return
+            self.put((None, None))
+
+        except Exception:
+            self.put((None, exc_info()))
+
+        finally:
+            # Release the cursor and the transaction on this thread
+            if rows is not None:
+                rows.close()
+
+
+class AsyncIterator(object):
+    """
+    Iterator of the rows of a table method, fetched on a thread of the pool
+
+    The rows are prefetched in chunks while the previous ones are being
+    consumed, up to `prefetch` chunks. The thread of the pool (and its
+    connection) is used until the rows are exhausted or the iterator closed
+    or garbage collected.
+    """
+
+    def __init__(self, thread_pool, func, kwargs, chunk_size, prefetch=2):
+        """
+        Constructor
+
+        @param thread_pool: pool where to execute the query
+        @type thread_pool: multiprocessing.pool.ThreadPool
+        @param func: entry point of the method returning the rows lazily
+        @type func: callable
+        @param kwargs: parameters of the query
+        @type kwargs: dict
+        @param chunk_size: number of rows of each prefetched chunk
+        @type chunk_size: integer
+        @param prefetch: maximum number of prefetched chunks
+        @type prefetch: integer
+        """
+        self._prefetcher = _Prefetcher(prefetch)
+        self._rows = iter(())
+
+        thread_pool.apply_async(self._prefetcher.produce,
+                                (func, kwargs, chunk_size))
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        """
+        Get the next row, waiting for its chunk if it's not fetched yet
+        """
+        for row in self._rows:
+            return row
+
+        prefetcher = self._prefetcher
+        if prefetcher.closed:
+            raise StopIteration
+
+        chunk, error = prefetcher.queue.get()
+
+        if error:
+            prefetcher.closed = True
+            raise error[0], error[1], error[2]
+
+        if chunk is None:
+            prefetcher.closed = True
+            raise StopIteration
+
+        self._rows = iter(chunk)
+        return next(self._rows)
+
+    def close(self):
+        """
+        Stop fetching the rows and release the thread of the pool
+        """
+        prefetcher = self._prefetcher
+        prefetcher.closed = True
+        self._rows = iter(())
+
+        # Unblock the producer if it's waiting to queue a chunk
+        try:
+            while True:
+                prefetcher.queue.get_nowait()
+        except Empty:
+            pass
+
+    def __del__(self):
+        self.close()
+
+
+class AsyncQuery(object):
+    """
+    Asynchronous version of a generated method and its entry points
+    """
+
+    def __init__(self, query, engine):
+        """
+        Constructor
+
+        @param query: the method of the synchronous engine
+        @type query: antiorm.base.BoundQuery
+        @param engine: the asynchronous engine
+        @type engine: AsyncAntiORM
+        """
+        self.__doc__ = query.__doc__
+        self.__name__ = query.__name__
+
+        self.query = query
+        self.engine = engine
+
+        if not hasattr(query, 'iter'):
+            self.iter = None
+
+    def __call__(self, *args, **kwargs):
+        return self.engine.thread_pool.apply_async(self.query, args, kwargs)
+
+    def one(self, kwargs):
+        """
+        Exec the query with a dict of parameters
+        """
+        return self.engine.thread_pool.apply_async(self.query.one, (kwargs,))
+
+    def many(self, list_kwargs, *args, **kwargs):
+        """
+        Exec the query for each dict of parameters
+        """
+        return self.engine.thread_pool.apply_async(self.query.many,
+                                                   (list_kwargs,) + args,
+                                                   kwargs)
+
+    def load(self, list_kwargs, *args, **kwargs):
+        """
+        Exec the query for each dict of parameters of an iterable on bulk
+        """
+        return self.engine.thread_pool.apply_async(self.query.load,
+                                                   (list_kwargs,) + args,
+                                                   kwargs)
+
+    def iter(self, kwargs, prefetch=2):
+        """
+        Get an iterator of the rows, fetched lazily on a thread of the pool
+        """
+        engine = self.engine.engine
+
+        return AsyncIterator(self.engine.thread_pool, self.query.iter, kwargs,
+                             engine.itersize or engine.chunk_size, prefetch)
+
+
+class AsyncAntiORM(object):
+    """
+    Engine whose generated methods are executed asynchronously
+
+    The synchronous engine is built with `driver_factory()`, giving it a
+    connection for each thread (on SQLite and APSW) or a pool of `workers`
+    connections (on the other drivers) opened with `factory`, and its methods
+    are accessed as attributes of this one (other attributes, like
+    `parse_dir()`, are the ones of the synchronous engine).
+    """
+
+    def __init__(self, factory, dir_path=None, workers=4, pragmas=(),
+                 **kwargs):
+        """
+        Constructor
+
+        @param factory: function that opens a new connection
+        @type factory: callable
+        @param dir_path: path of the dir with files from where to load SQL code
+        @type dir_path: string
+        @param workers: number of threads executing the queries
+        @type workers: integer
+        @param pragmas: statements to execute on each new SQLite connection
+        @type pragmas: iterable of strings
+        @param kwargs: extra options for the engine (like `cache_path`)
+        @type kwargs: dict
+        """
+        connection = ThreadLocalConnection(factory, pragmas)
+
+        if connection.connection_class.__module__ not in THREAD_LOCAL:
+            connection.close()
+            connection = ConnectionPool(factory, max_size=workers)
+
+        self.connection = connection
+        self.engine = driver_factory(connection, dir_path, **kwargs)
+        self.thread_pool = ThreadPool(workers)
+
+        self._methods = {}
+
+    def __getattr__(self, name):
+        """
+        Get the asynchronous version of the methods of the engine
+        """
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        attr = getattr(self.engine, name)
+        if not hasattr(attr, 'many'):
+            return attr
+
+        # Reuse the wrapper while the method is not replaced on the engine
+        method = self._methods.get(name)
+        if method is None or method.query is not attr:
+            method = self._methods[name] = AsyncQuery(attr, self)
+
+        return method
+
+    def close(self):
+        """
+        Wait for the pending queries and close the threads and connections
+        """
+        self.thread_pool.close()
+        self.thread_pool.join()
+        self.connection.close()
@@ -6,10 +6,12 @@ Created on 17/02/2012
 @author: piranna
 '''
 
-from logging import warning
+from itertools import islice
+from logging   import warning
 
 from antiorm.backends import BaseConnection, BaseCursor
 from antiorm.base     import Base
+from antiorm.pool     import ThreadLocalConnection
 
 
 class APSWCursor(BaseCursor):
@@ -37,6 +39,12 @@ class APSWCursor(BaseCursor):
         except StopIteration:
             pass
 
+    def fetchmany(self, size=1000):
+        """
+        Get the next `size` results from a previous sql query
+        """
+        return list(islice(self._cursor, size))
+
     @property
     def lastrowid(self):
         """
@@ -105,51 +113,52 @@ class APSW(Base):
     "APSW driver for AntiORM"
     _max_cachedmethods = 100
 
-    def __init__(self, db_conn, dir_path=None, bypass_types=False, lazy=False):
+    def __init__(self, db_conn, dir_path=None, bypass_types=False, lazy=False,
+                 **kwargs):
         """
         Constructor
 
-        @param db_conn: connection of the database
-        @type db_conn: DB-API 2.0 database connection
+        @param db_conn: connection of the database, or a connection for each
+            thread
+        @type db_conn: apsw.Connection or antiorm.pool.ThreadLocalConnection
         @param dir_path: path of the dir with files from where to load SQL code
         @type dir_path: string
         @param bypass_types: set if types should be bypassed on calling
         @type bypass_types: boolean
         @param lazy: set if SQL code at dir_path should be lazy loaded
         @type lazy: boolean
+        @param kwargs: extra options for the engine (like `cache_path`)
+        @type kwargs: dict
         """
         self._cachedmethods = 0
 
-        db_conn = APSWConnection(db_conn)
+        if isinstance(db_conn, ThreadLocalConnection):
+            db_conn.wrapper = APSWConnection
+        else:
+            db_conn = APSWConnection(db_conn)
 
-        Base.__init__(self, db_conn, dir_path, bypass_types, lazy)
+        Base.__init__(self, db_conn, dir_path, bypass_types, lazy, **kwargs)
 
         self.tx_manager = db_conn
 
-    def parse_string(self, sql, method_name, include_path='sql',
-                     bypass_types=False, lazy=False):
+    def build_method(self, spec, bypass_types=False, register=True):
         """
-        Build a function from a string containing a SQL query
+        Build a function from an already parsed method specification
 
-        If the number of parsed methods is bigger of the APSW SQLite bytecode
+        If the number of built methods is bigger of the APSW SQLite bytecode
         cache it shows an alert because performance will decrease.
 
-        :param sql: the SQL code of the method to be parsed
-        :type sql: string
-        :param method_name: the name of the method
-        :type method_name: string
-        :param dir_path: path to the dir with the SQL files (for INCLUDE)
-        :type dir_path: string
+        :param spec: the parsed method
+        :type spec: antiorm.base.MethodSpec
         :param bypass_types: set if parsing should bypass types
         :type bypass_types: boolean
-        :param lazy: set if parsing should be postpone until required
-        :type lazy: boolean
+        :param register: set if the function should be registered as a method
+        :type register: boolean
 
-        :return: the parsed function or None if `lazy` is True
-        :rtype: function or None
+        :return: the built function
+        :rtype: function
         """
-        result = Base.parse_string(self, sql, method_name, include_path,
-                                   bypass_types, lazy)
+        result = Base.build_method(self, spec, bypass_types, register)
 
         self._cachedmethods += 1
         if self._cachedmethods > self._max_cachedmethods:
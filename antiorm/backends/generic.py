@@ -9,13 +9,66 @@ Created on 05/03/2012
 from antiorm.backends      import BaseConnection, BaseCursor
 from antiorm.backends.apsw import APSWConnection
 from antiorm.base          import Base
+from antiorm.pool          import ConnectionPool, PoolManager
 from antiorm.utils         import TransactionManager
 
 
 class GenericCursor(BaseCursor):
     """
     Cursor class wrapper that add support to define row_factory
+
+    Row factories are applied to the rows of `fetchone()`, `fetchmany()` and
+    `fetchall()`. If the row factory has a `batch` attribute (like
+    `antiorm.utils.namedtuple_factory`), it's used to convert all the rows of
+    `fetchmany()` and `fetchall()` at once.
     """
+    def __init__(self, cursor, conn=None):
+        """
+        Constructor
+
+        @param cursor: the cursor to wrap
+        @type cursor: DB-API 2.0 Cursor
+        @param conn: the connection wrapper with the row_factory
+        @type conn: GenericConnection
+        """
+        BaseCursor.__init__(self, cursor, conn)
+
+        # Bind the methods of the wrapped cursor used on the queries, so they
+        # don't need to be get with __getattr__ on each call
+        self.execute = self._cursor.execute
+        self.executemany = self._cursor.executemany
+
+    def _rows(self, rows):
+        """
+        Apply the row factory (if necessary) to a list of rows
+        """
+        row_factory = self._conn.row_factory
+        if not row_factory or not rows:
+            return rows
+
+        cursor = self._cursor
+
+        batch = getattr(row_factory, 'batch', None)
+        if batch:
+            return batch(cursor, rows)
+
+        return [row_factory(cursor, row) for row in rows]
+
+    def fetchall(self):
+        """
+        Get all the (remaining) results from a previous sql query
+        """
+        return self._rows(self._cursor.fetchall())
+
+    def fetchmany(self, size=None):
+        """
+        Get the next `size` results from a previous sql query
+        """
+        if size is None:
+            return self._rows(self._cursor.fetchmany())
+
+        return self._rows(self._cursor.fetchmany(size))
+
     def fetchone(self):
         """
         Get one result from a previous sql query
@@ -25,8 +78,8 @@ class GenericCursor(BaseCursor):
 
         # Apply row factory (if necessary)
         row_factory = self._conn.row_factory
-        if row_factory:
-            result = row_factory(self, result)
+        if row_factory and result is not None:
+            result = row_factory(self._cursor, result)
 
         # Return the (adapted) query result
         return result
@@ -54,11 +107,14 @@ class GenericConnection(BaseConnection):
         """
         return self._connection.commit()
 
-    def cursor(self):
+    def cursor(self, *args, **kwargs):
         """
         Build and return a new cursor.
+
+        The arguments are given to the wrapped connection (like the cursor
+        class on MySQLdb or the cursor name on psycopg2).
         """
-        return GenericCursor(self._connection.cursor(), self)
+        return GenericCursor(self._connection.cursor(*args, **kwargs), self)
 
     def rollback(self):
         """
@@ -76,24 +132,44 @@ class Generic(Base):
     optimizations.
     """
 
-    def __init__(self, db_conn, dir_path=None, bypass_types=False, lazy=False):
+    def __init__(self, db_conn, dir_path=None, bypass_types=False, lazy=False,
+                 **kwargs):
         """
         Constructor
 
-        @param db_conn: connection of the database
-        @type db_conn: DB-API 2.0 database connection
+        @param db_conn: connection of the database, or a pool of them
+        @type db_conn: DB-API 2.0 database connection or
+            antiorm.pool.ConnectionPool
         @param dir_path: path of the dir with files from where to load SQL code
         @type dir_path: string
         @param bypass_types: set if types should be bypassed on calling
         @type bypass_types: boolean
         @param lazy: set if SQL code at dir_path should be lazy loaded
         @type lazy: boolean
+        @param kwargs: extra options for the engine (like `cache_path`)
+        @type kwargs: dict
         """
+        pool = None
+
         # Check if database connection is from APSW so we force the wrapper
         if db_conn.__class__.__module__ == 'apsw':
             db_conn = APSWConnection(db_conn)
         else:
+            if isinstance(db_conn, ConnectionPool):
+                pool = db_conn
             db_conn = GenericConnection(db_conn)
-        Base.__init__(self, db_conn, dir_path, bypass_types, lazy)
+        Base.__init__(self, db_conn, dir_path, bypass_types, lazy, **kwargs)
+
+        # Check out a connection of the pool for each transaction
+        if pool:
+            self.tx_manager = PoolManager(pool, self._wrap_connection)
+        else:
+            self.tx_manager = TransactionManager(db_conn)
 
-        self.tx_manager = TransactionManager(db_conn)
+    def _wrap_connection(self, conn):
+        """
+        Wrap a connection of the pool to use the row factory of the engine
+        """
+        result = GenericConnection(conn)
+        result.row_factory = self.connection.row_factory
+        return result
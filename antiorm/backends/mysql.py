@@ -7,6 +7,7 @@ Created on 22/04/2012
 '''
 
 from antiorm.base  import Base
+from antiorm.pool  import ConnectionPool, PoolManager
 from antiorm.utils import TransactionManager
 
 
@@ -14,19 +15,27 @@ class MySQL(Base):
     """
     MySQL driver for AntiORM
     """
-    def __init__(self, db_conn, dir_path=None, bypass_types=False, lazy=False):
+    def __init__(self, db_conn, dir_path=None, bypass_types=False, lazy=False,
+                 **kwargs):
         """
         Constructor
 
-        @param db_conn: connection of the database
-        @type db_conn: DB-API 2.0 database connection
+        @param db_conn: connection of the database, or a pool of them
+        @type db_conn: DB-API 2.0 database connection or
+            antiorm.pool.ConnectionPool
         @param dir_path: path of the dir with files from where to load SQL code
         @type dir_path: string
         @param bypass_types: set if types should be bypassed on calling
         @type bypass_types: boolean
         @param lazy: set if SQL code at dir_path should be lazy loaded
         @type lazy: boolean
+        @param kwargs: extra options for the engine (like `cache_path`)
+        @type kwargs: dict
         """
-        Base.__init__(self, db_conn, dir_path, bypass_types, lazy)
+        Base.__init__(self, db_conn, dir_path, bypass_types, lazy, **kwargs)
 
-        self.tx_manager = TransactionManager(db_conn)
+        # Check out a connection of the pool for each transaction
+        if isinstance(db_conn, ConnectionPool):
+            self.tx_manager = PoolManager(db_conn)
+        else:
+            self.tx_manager = TransactionManager(db_conn)
@@ -3,12 +3,20 @@
 Base class of AntiORM wrapper class and proxy factory
 """
 
-from io       import open
-from new      import instancemethod
-from opcode   import opmap
-from os       import listdir
-from os.path  import basename, join, splitext
-from warnings import warn
+from collections     import namedtuple
+from contextlib      import contextmanager
+from functools       import partial
+from io              import open
+from itertools       import count, islice
+from keyword         import iskeyword
+from multiprocessing import Pool
+from new             import instancemethod
+from opcode          import opmap
+from os              import listdir
+from os.path         import basename, join, splitext
+from re              import compile as re_compile, IGNORECASE, VERBOSE
+from threading       import Lock
+from warnings        import warn
 
 try:
     from sys import _getframe
@@ -20,23 +28,647 @@ try:
 except ImportError:
     byteplay = None
 
+try:
+    from psycopg2.extras import execute_batch
+except ImportError:
+    execute_batch = None
+
+try:
+    from MySQLdb.cursors import SSCursor
+except ImportError:
+    SSCursor = None
+
 from sqlparse           import split2
 from sqlparse.filters   import compact, IncludeStatement, Tokens2Unicode
 from sqlparse.functions import IsType, getcolumns, getlimit
 from sqlparse.lexer     import tokenize
 from sqlparse.pipeline  import Pipeline
 
-from antiorm.utils import named2pyformat
+from antiorm.cache     import SpecCache
+from antiorm.pool      import ReplicaManager
+from antiorm.results   import CachedQuery, InvalidatingQuery, ResultCache
+from antiorm.results   import query_tables, read_only
+from antiorm.scanner   import scan
+from antiorm.templates import dict_source, IDENTIFIER, indent, specialize
+from antiorm.templates import MANAGERS, TEMPLATES, tuple_source
+from antiorm.utils     import args_getter, JoinedManager, named2format
+from antiorm.utils     import named2pyformat, named2qmark, parameters
+from antiorm.utils     import streaming_connections
 
 
 LOAD_ATTR = opmap['LOAD_ATTR']
 
+# INSERT statements of only one row, where each execution insert one row
+INSERT_ROW = re_compile(r"""
+    ^INSERT \s+ INTO \s+ (\w+) \s* (?: \( ([\w\s,]*) \) )? \s*
+    VALUES \s* ( \( (?: '(?:[^']|'')*' | [^;()'] | \( [^;()']* \) )* \) )
+    \s* ;? \s* $""", IGNORECASE | VERBOSE)
+
+# Plain column of a SELECT statement, optionally qualified and with an alias
+COLUMN = r"""(?: \w+ \s* \. \s* )? (?: \w+ | \* )
+             (?: \s+ (?:AS \s+)? (?!FROM\b) \w+ )?"""
+
+# SELECT statements of one row by the value of a column, where the queries for
+# several values can be done at once with an IN clause. Only plain columns are
+# allowed, since functions (like the aggregate ones) or DISTINCT would be
+# evaluated over the rows of all the values
+LOOKUP = re_compile(r"""
+    ^SELECT \s+ (?!(?:DISTINCT|ALL)\b)
+    ( %(column)s (?: \s* , \s* %(column)s )* ) \s+
+    FROM \s+ (\w+ (?: \s+ (?:AS \s+)? (?!WHERE\b) \w+ )?) \s+
+    WHERE \s+ ([\w.]+) \s* = \s* :(\w+) \s+
+    LIMIT \s+ 1 \s* ;? \s* $""" % {'column': COLUMN}, IGNORECASE | VERBOSE)
+
+# Functions to get the row id inserted by a previous statement
+LASTROWID = re_compile(r"""
+    \b(?:last_insert_rowid|last_insert_id|lastval|currval|scope_identity)
+    \s*\( | @@identity""", IGNORECASE | VERBOSE)
+
+# Names of the SQLite rowid column
+ROWID = frozenset(('rowid', 'oid', '_rowid_'))
+
+# Columns of the primary key of a PostgreSQL table, and if the table exists
+PRIMARY_KEY = """SELECT to_regclass(%s) IS NOT NULL,
+                        ARRAY(SELECT a.attname::text
+                              FROM pg_index i
+                              JOIN pg_attribute a
+                                ON a.attrelid = i.indrelid
+                               AND a.attnum = ANY(i.indkey)
+                              WHERE i.indrelid = to_regclass(%s)
+                                AND i.indisprimary)"""
+
+# Default value of the arguments of the specialized methods
+MISSING = object()
+
+# Types of the first argument used by the old calling conventions
+ROWS = (dict, list, tuple)
+
+# Compiled code of the specialized methods by the shape of their queries, so
+# it's shared by the methods (and engines) with the same parameters and kind
+_specialized = {}
+
+# Unique names of the psycopg2 server side cursors and of the savepoints
+_cursor_names = count()
+_savepoint_names = count()
+
+
+class MethodSpec(namedtuple('MethodSpec', 'name kind sql reads')):
+    """
+    Parsed and classified SQL method
+
+    It's the result of parsing a SQL query, so it can be stored (it's
+    picklable) and later be used to build the method on any engine without
+    re-parsing it.
+
+    `kind` is the name of the optimized functions factory to use (for example
+    'one_statement_value'), `sql` is the paramstyle adapted SQL query, or a
+    tuple of them for the multiple statement kinds, and `reads` is set if the
+    query can be executed on the read only replicas (None if not checked).
+    """
+    __slots__ = ()
+
+    def __new__(cls, name, kind, sql, reads=None):
+        return super(MethodSpec, cls).__new__(cls, name, kind, sql, reads)
+
+    def adapt(self, paramstyle):
+        """
+        Get a copy of the method with the SQL code adapted to a paramstyle
+
+        :param paramstyle: paramstyle adapter for the connection
+        :type paramstyle: function or None
+
+        :return: the adapted parsed method
+        :rtype: MethodSpec
+        """
+        if not paramstyle:
+            return self
+
+        if isinstance(self.sql, tuple):
+            return self._replace(sql=tuple(map(paramstyle, self.sql)))
+
+        return self._replace(sql=paramstyle(self.sql))
+
+
+class _QueryDoc(object):
+    """
+    Docstring of the bound queries, the one of their function
+    """
+
+    def __init__(self, doc):
+        self.doc = doc
+
+    def __get__(self, query, cls=None):
+        if query is None:
+            return self.doc
+        return query.func.__doc__
+
+
+class BoundQuery(partial):
+    __doc__ = _QueryDoc("""
+    Method of a query bound to an engine
+
+    Calling it has the same cost of a bound method, and it also give access to
+    the `one(mapping)`, `many(iterable)`, `stream(iterable)` and
+    `load(iterable)` entry points of the query, and to `iter(mapping)` for the
+    table queries. The entry points are bound when they are accessed, so
+    binding the query is as cheap as binding a method.
+    """)
+
+    @property
+    def __name__(self):
+        return self.func.__name__
+
+    @property
+    def one(self):
+        return partial(self.func.one, self.args[0])
+
+    @property
+    def many(self):
+        return partial(self.func.many, self.args[0])
+
+    @property
+    def stream(self):
+        return partial(stream, self.args[0], self.func.many)
+
+    @property
+    def load(self):
+        return partial(load, self.args[0], self.func.many)
+
+    @property
+    def iter(self):
+        # Only the table queries can return their rows lazily
+        iter_ = getattr(self.func, 'iter', None)
+        if iter_ is None:
+            raise AttributeError('iter')
+
+        return partial(iter_, self.args[0])
+
+
+class QueryMethod(object):
+    """
+    Descriptor of a query method defined on the engine class
+
+    Accessing it from an engine returns the query bound to it, so the methods
+    are shared by all the engines of the class instead of being stored on
+    each one of them.
+    """
+    __slots__ = ('func',)
+
+    def __init__(self, func):
+        """
+        Constructor
+
+        :param func: the function of the query
+        :type func: function
+        """
+        self.func = func
+
+    def __get__(self, engine, cls=None):
+        if engine is None:
+            return self
+        return BoundQuery(self.func, engine)
+
+
+def stream(self, many, list_kwargs, commit_every=None, **options):
+    """
+    Exec a query for each dict of an iterable, committing every N rows
+
+    The rows are get from the iterable and executed on chunks of
+    `commit_every` rows (by default, the `commit_every` of the engine), each
+    one on its own transaction, so long loads don't hold a giant transaction
+    and only the results of a chunk are on memory.
+
+    :param many: optimized function for a list of dicts
+    :type many: function
+    :param list_kwargs: an iterable with the keyword arguments of the query
+    :type list_kwargs: iterable of dicts
+    :param commit_every: number of rows executed on each transaction
+    :type commit_every: integer
+    :param options: extra options for the optimized function (like `rowids`)
+
+    :return: generator of the results of the rows
+    :rtype: generator
+    """
+    commit_every = commit_every or self.commit_every
+    list_kwargs = iter(list_kwargs)
+
+    while True:
+        chunk = list(islice(list_kwargs, commit_every))
+        if not chunk:
+            return
+
+        result = many(self, chunk, **options)
+        if result is not None:
+            for row in result:
+                yield row
+
+
+def load(self, many, list_kwargs, commit_every=None, **options):
+    """
+    Exec a query for each dict of an iterable discarding the results
+
+    It works like `stream()`, committing every `commit_every` rows. For INSERT
+    methods give `rowids=False` so the row ids are not calculated.
+
+    :param many: optimized function for a list of dicts
+    :type many: function
+    :param list_kwargs: an iterable with the keyword arguments of the query
+    :type list_kwargs: iterable of dicts
+    :param commit_every: number of rows executed on each transaction
+    :type commit_every: integer
+    :param options: extra options for the optimized function (like `rowids`)
+
+    :return: the number of executed rows
+    :rtype: integer
+    """
+    commit_every = commit_every or self.commit_every
+    list_kwargs = iter(list_kwargs)
+
+    count = 0
+    while True:
+        chunk = list(islice(list_kwargs, commit_every))
+        if not chunk:
+            return count
+
+        many(self, chunk, **options)
+        count += len(chunk)
+
+
+def _old_style(values):
+    """
+    Check if the arguments of a call use the old calling conventions
+
+    :param values: the values of the parameters and the extra positional
+        arguments of the call
+    :type values: tuple
+
+    :return: if the first one is a dict or a list (or tuple) of dicts and the
+        other given ones are dicts
+    :rtype: boolean
+    """
+    if not values:
+        return False
+
+    first = values[0]
+    if isinstance(first, (list, tuple)):
+        for item in first:
+            if not isinstance(item, dict):
+                return False
+
+    elif not isinstance(first, dict):
+        return False
+
+    for value in values[1:]:
+        if value is not MISSING and not isinstance(value, dict):
+            return False
+
+    return True
+
+
+def fallback(self, method_name, names, values, args, kwargs=None):
+    """
+    Exec a query for the calls not giving the parameters as arguments
+
+    They are the calls with a dict, a list of dicts or several dicts (the old
+    calling conventions) or the calls with extra arguments. Missing or
+    unexpected parameters raise a TypeError as any other function call. Other
+    values are always binded as parameters, also if they are lists (like the
+    PostgreSQL arrays).
+
+    :param method_name: name of the method of the query
+    :type method_name: string
+    :param names: names of the parameters of the query
+    :type names: tuple of strings
+    :param values: values of the parameters arguments
+    :type values: tuple
+    :param args: extra positional arguments
+    :type args: tuple
+    :param kwargs: keyword arguments of the methods whose parameters can't be
+        used as arguments
+    :type kwargs: dict or None
+
+    :return: the result of the query
+    """
+    query = getattr(self, method_name)
+
+    values += args
+
+    # Old style calls (a dict, a list of dicts or several dicts)
+    if _old_style(values):
+        if len(values) - values.count(MISSING) > 1:
+            return query.many([value for value in values
+                               if value is not MISSING])
+
+        if isinstance(values[0], dict):
+            return query.one(values[0])
+        return query.many(values[0])
+
+    if args:
+        raise TypeError("%s() takes at most %d arguments (%d given)"
+                        % (method_name, len(names) + 1, len(values) + 1))
+
+    # Parameters that can't be arguments, they are given by keyword
+    if kwargs is not None:
+        return query.one(kwargs)
+
+    # Build the parameters dict
+    kwargs = {}
+    for name, value in zip(names, values):
+        if value is MISSING:
+            raise TypeError("%s() missing %r argument" % (method_name, name))
+
+        kwargs[name] = value
+
+    return query.one(kwargs)
+
+
+def sqlite_max_variables(module):
+    """
+    Get the default maximum number of variables of a SQLite statement
+
+    It's 999 before SQLite 3.32.0 and 32766 since then.
+
+    :param module: name of the module of the SQLite driver
+    :type module: string
+
+    :return: the maximum number of variables
+    :rtype: integer
+    """
+    try:
+        if module == 'sqlite3':
+            from sqlite3 import sqlite_version_info
+        else:
+            from apsw import sqlitelibversion
+            sqlite_version_info = tuple(map(int,
+                                            sqlitelibversion().split('.')))
+    except (ImportError, ValueError):
+        return 999
+
+    if sqlite_version_info >= (3, 32, 0):
+        return 32766
+    return 999
+
+
+def mysql_server_cursor(conn, itersize):
+    """
+    Get a MySQLdb cursor that fetch the rows from the server when requested
+
+    :param conn: the connection
+    :type conn: MySQLdb connection
+    :param itersize: number of rows fetched on each round trip (unused, they
+        are fetched on the `fetchmany()` calls)
+    :type itersize: integer
+
+    :return: the unbuffered cursor
+    :rtype: MySQLdb.cursors.SSCursor
+    """
+    return conn.cursor(SSCursor)
+
+
+def psycopg2_server_cursor(conn, itersize):
+    """
+    Get a psycopg2 named cursor, that keep the results on the server
+
+    :param conn: the connection
+    :type conn: psycopg2 connection
+    :param itersize: number of rows fetched on each round trip when iterating
+    :type itersize: integer
+
+    :return: the named cursor
+    :rtype: psycopg2 cursor
+    """
+    cursor = conn.cursor('antiorm_%d' % next(_cursor_names))
+
+    # Set it on the psycopg2 cursor, not on the wrapper of the Generic backend
+    getattr(cursor, '_cursor', cursor).itersize = itersize
+    return cursor
+
+
+def _literal_size(value):
+    """
+    Get the maximum size of a value once quoted on a SQL statement
+    """
+    if isinstance(value, unicode):
+        return 8 * len(value) + 3
+    if isinstance(value, basestring):
+        return 2 * len(value) + 3
+    return 32
+
+
+def _kwargs(kwargs):
+    """
+    Get the arguments of a query binded by name (the parameters dict itself)
+    """
+    return kwargs
+
+
+def classify(stream, paramstyle=None):
+    """
+    Classify a stream of tokens and get the SQL code adapted to the paramstyle
+
+    :param stream: the (compacted) stream of tokens
+    :type stream: iterable of tokens
+    :param paramstyle: paramstyle adapter for the connection
+    :type paramstyle: function or None
+
+    :return: the kind of the method and its SQL query (or queries)
+    :rtype: tuple
+    """
+    stmts = split2(stream)
+
+    # One statement query
+    if len(stmts) == 1:
+        sql = Tokens2Unicode(stream)
+
+        if paramstyle:
+            sql = paramstyle(sql)
+
+        # Insert statement (return last row id)
+        if IsType('INSERT')(stream):
+            return 'one_statement_INSERT', sql
+
+        ## Update statement (return affected row count)
+        #if IsType('UPDATE')(stream):
+        #    return 'one_statement_UPDATE', sql
+
+        # One-value function (a row of a cell)
+        if getlimit(stream) == 1:
+            columns = getcolumns(stream)
+
+            # Value function (one row, one field)
+            if len(columns) == 1 and columns[0] != '*':
+                return 'one_statement_value', sql
+
+            # Register function (one row, several fields)
+            return 'one_statement_register', sql
+
+        # Table function (several rows)
+        return 'one_statement_table', sql
+
+    # Multiple statement query
+    stmts = map(unicode, stmts)
+
+    if paramstyle:
+        stmts = map(paramstyle, stmts)
+
+    # Insert statement (return last row id)
+    if IsType('INSERT')(stream):
+        return 'multiple_statement_INSERT', tuple(stmts)
+
+    # Standard multiple statement query
+    return 'multiple_statement_standard', tuple(stmts)
+
+
+def parse_sql(sql, dirpaths=(), paramstyle=None, reads=True):
+    """
+    Parse and classify a string containing a SQL query
+
+    The most common queries are classified by the lightweight scanner, and
+    only the ones it can't classify confidently are parsed with sqlparse.
+    Checking if the query only reads also needs sqlparse, so it can be
+    disabled when it's not needed (when there are no replicas).
+
+    :param sql: the SQL code to be parsed
+    :type sql: string
+    :param dirpaths: paths to the dirs with the SQL files (for INCLUDE)
+    :type dirpaths: list of strings
+    :param paramstyle: paramstyle adapter for the connection
+    :type paramstyle: function or None
+    :param reads: set if it should be checked if the query only reads
+    :type reads: boolean
+
+    :return: the kind of the method, its SQL query (or queries) and if it
+        only reads (None if not checked)
+    :rtype: tuple
+    """
+    parsed = scan(sql, paramstyle)
+    if not parsed:
+        parsed = parse_sql_full(sql, dirpaths, paramstyle)
+
+    kind, sql = parsed
+    return kind, sql, read_only(sql) if reads else None
+
+
+def parse_sql_full(sql, dirpaths=(), paramstyle=None):
+    """
+    Parse and classify a string containing a SQL query using sqlparse
+
+    :param sql: the SQL code to be parsed
+    :type sql: string
+    :param dirpaths: paths to the dirs with the SQL files (for INCLUDE)
+    :type dirpaths: list of strings
+    :param paramstyle: paramstyle adapter for the connection
+    :type paramstyle: function or None
+
+    :return: the kind of the method and its SQL query (or queries)
+    :rtype: tuple
+    """
+    pipe = Pipeline()
+    pipe.append(tokenize)
+    pipe.append(IncludeStatement(list(dirpaths)))
+
+    return classify(compact(pipe(sql.strip())), paramstyle)
+
+
+def _parse_spec(args):
+    """
+    Parse a SQL method on a worker process
+
+    :param args: the name of the method, its SQL code, the dirpaths where to
+        look for the INCLUDE statements, the paramstyle adapter and if it
+        should be checked if the query only reads
+    :type args: tuple
+
+    :return: the parsed method
+    :rtype: MethodSpec
+    """
+    method_name, sql, dirpaths, paramstyle, reads = args
+    return MethodSpec(method_name, *parse_sql(sql, dirpaths, paramstyle,
+                                              reads))
+
+
+def parse_dir_specs(dir_path, dirpaths=None, paramstyle=None, cache=None,
+                    workers=None, reads=True):
+    """
+    Parse the SQL queries inside the files at `dir_path`
+
+    The files not found on the cache are parsed on a pool of processes if
+    `workers` is bigger than one, and later stored on the cache.
+
+    :param dir_path: path to the dir with the SQL files
+    :type dir_path: string
+    :param dirpaths: paths to the dirs with the SQL files (for INCLUDE)
+    :type dirpaths: list of strings
+    :param paramstyle: paramstyle adapter for the connection
+    :type paramstyle: function or None
+    :param cache: cache of the parsed methods
+    :type cache: antiorm.cache.SpecCache
+    :param workers: number of processes used to parse the files
+    :type workers: integer
+    :param reads: set if it should be checked if the queries only read
+    :type reads: boolean
+
+    :return: the parsed methods
+    :rtype: list of MethodSpec
+    """
+    if dirpaths is None:
+        dirpaths = [dir_path]
+
+    specs = []
+    keys = []
+    pending = []
+
+    for filename in listdir(dir_path):
+        method_name = splitext(filename)[0]
+
+        with open(join(dir_path, filename), 'rt') as file_sql:
+            sql = file_sql.read()
+
+        # Get the method directly from the cache if it was parsed previously
+        if cache is not None:
+            key = cache.key(sql, dirpaths, paramstyle)
 
-def proxy_factory(priv_dict, priv_list):
+            parsed = cache.get(key)
+            if parsed is not None:
+                specs.append(MethodSpec(method_name, *parsed))
+                continue
+
+            keys.append(key)
+
+        pending.append((method_name, sql, dirpaths, paramstyle, reads))
+
+    if not pending:
+        return specs
+
+    # Parse the pending files on the pool of processes
+    if workers > 1:
+        pool = Pool(workers)
+        try:
+            parsed = pool.map(_parse_spec, pending,
+                              max(1, len(pending) // (workers * 4)))
+        finally:
+            pool.terminate()
+    else:
+        parsed = map(_parse_spec, pending)
+
+    # Store the parsed methods on the cache
+    if cache is not None:
+        for index, spec in enumerate(parsed):
+            cache.set(keys[index], spec[1:])
+
+    return specs + parsed
+
+
+def proxy_factory(priv_dict, priv_list, kind=None, priv_iter=None):
     """
     Factory function to proxy the optimized functions to the class
+
+    If `kind` is given, the methods are specialized using its templates
+    instead of calling to the `priv_dict` optimized function. If `priv_iter`
+    is given, it's used as the `iter()` entry point of the methods.
     """
-    def _wrapped_method(self, method_name, sql, bypass_types):
+    def _wrapped_method(self, method_name, sql, bypass_types, register=True,
+                        reads=False):
         """
         Single INSERT statement query
 
@@ -46,11 +678,15 @@ def proxy_factory(priv_dict, priv_list):
         @type sql: string
         @param bypass_types: flag to set if types should be bypassed on calling
         @type bypass_types: boolean
+        @param register: set if the function should be registered as a method
+        @type register: boolean
+        @param reads: set if the query only reads from the database
+        @type reads: boolean
 
         :returns: the registered optimized function
         """
-        _priv_dict = priv_dict(self, sql)
-        _priv_list = priv_list(self, sql)
+        _priv_dict = priv_dict(self, sql, method_name, reads)
+        _priv_list = priv_list(self, sql, method_name, reads)
 
         def _priv_l_kw(self, *args):
             """
@@ -65,7 +701,7 @@ def proxy_factory(priv_dict, priv_list):
             return _priv_dict(self, kwargs)
 
         # Use type specific functions
-        if byteplay and bypass_types:
+        if byteplay and bypass_types and register:
             def _bypass_types(self, list_or_dict=None, *args, **kwargs):
                 """
                 Proxy function that bypass types on calling function
@@ -145,34 +781,26 @@ def proxy_factory(priv_dict, priv_list):
             setattr(self, method_name + '__l_kw', instancemethod(_priv_l_kw, self, self.__class__))
             setattr(self, method_name + '__keyw', instancemethod(_priv_keyw, self, self.__class__))
 
+            _bypass_types.one = _priv_dict
+            _bypass_types.many = _priv_list
+            if priv_iter:
+                _bypass_types.iter = priv_iter(self, sql, method_name, reads)
+
             # Register and return by-pass
-            setattr(self, method_name, instancemethod(_bypass_types, self, self.__class__))
+            setattr(self, method_name, BoundQuery(_bypass_types, self))
             return _bypass_types
 
-        def _proxy_types(self, list_or_dict=None, *args, **kwargs):
-            """
-            Proxy function that proxy to the correct type function
-
-            @param list_or_dict: arguments passed as a list or a dict.
-                Cannonically this should be called by *args or **kwargs
-            @type list_or_dict: a list or a dict
-
-            @return: the result of the call after being bypassed
-            @rtype: single value, a row or an iterable (depending of `sql`)
-            """
-
-            # Received un-named parameter, it would be a iterable
-            if list_or_dict != None:
-                if isinstance(list_or_dict, dict):
-                    return _priv_dict(self, list_or_dict)
-                return _priv_list(self, list_or_dict)
-            if args:
-                return _priv_l_kw(self, *args)
-            return _priv_keyw(self, **kwargs)
+        # Specialize the method for the parameters of the query
+        func = self._specialize(method_name, sql, kind, _priv_dict, reads)
+        func.one = _priv_dict
+        func.many = _priv_list
+        if priv_iter:
+            func.iter = priv_iter(self, sql, method_name, reads)
 
-        # Register and return types proxy
-        setattr(self, method_name, instancemethod(_proxy_types, self, self.__class__))
-        return _proxy_types
+        # Register and return the specialized method
+        if register:
+            setattr(self, method_name, BoundQuery(func, self))
+        return func
 
     return _wrapped_method
 
@@ -190,257 +818,1267 @@ class Base(object):
     check a functions cache if your database engine support it or similar).
     """
 
-    def __init__(self, db_conn, dir_path=None, bypass_types=False, lazy=False):
+    def __init__(self, db_conn, dir_path=None, bypass_types=False, lazy=False,
+                 cache_path=None, workers=None, catalog=None, positional=True,
+                 chunk_size=1000, commit_every=10000, server_side=False,
+                 itersize=None, replicas=None, balance='round_robin'):
         """
         Constructor
 
-        :param db_conn: connection of the database
-        :type db_conn: DB-API 2.0 database connection
+        :param db_conn: connection of the database, or a pool of them
+        :type db_conn: DB-API 2.0 database connection or
+            antiorm.pool.ConnectionPool
         :param dir_path: path of the dir with files from where to load SQL code
         :type dir_path: string
         :param bypass_types: set if parsing should bypass types
         :type bypass_types: boolean
         :param lazy: set if SQL code at dir_path should be lazy loaded
         :type lazy: boolean
+        :param cache_path: path of the file where to cache the parsed methods
+        :type cache_path: string
+        :param workers: number of processes used to parse the dir_path files
+        :type workers: integer
+        :param catalog: shared catalog of methods to bind to the engine
+        :type catalog: antiorm.catalog.QueryCatalog
+        :param positional: set if parameters should be binded by position
+        :type positional: boolean
+        :param chunk_size: number of rows executed at once by the bulk methods
+        :type chunk_size: integer
+        :param commit_every: number of rows executed on each transaction by
+            the streamed methods
+        :type commit_every: integer
+        :param server_side: set if the iterators of the table methods should
+            use server side cursors on MySQL and PostgreSQL
+        :type server_side: boolean
+        :param itersize: number of rows fetched on each round trip by the
+            iterators of the table methods (by default, `chunk_size`)
+        :type itersize: integer
+        :param replicas: connections (or pools) of read only replicas of the
+            database, where to exec the read only methods
+        :type replicas: list of DB-API 2.0 database connections
+        :param balance: how to select the replica of each read only call,
+            'round_robin' or 'least_busy'
+        :type balance: string
         """
         self.connection = db_conn
 
-        # Get type of the connection
-        type_conn = db_conn.__class__.__module__
-        if type_conn == 'antiorm.backends.generic':
-            type_conn = db_conn._connection.__class__.__module__
+        # Get type of the connection
+        type_conn = db_conn.__class__.__module__
+        if type_conn == 'antiorm.backends.generic':
+            type_conn = db_conn._connection.__class__.__module__
+
+        # Get type of the connections of a pool
+        if type_conn == 'antiorm.pool':
+            pool = getattr(db_conn, '_connection', db_conn)
+            type_conn = pool.connection_class.__module__
+
+        # Get paramstyle adapters for the connection. Queries are binded by
+        # position on the known drivers, others use the 'named' paramstyle
+        self._paramstyle = None
+        self._positional = None
+
+        if type_conn in ('MySQLdb.connections', 'psycopg2._psycopg'):
+            if positional:
+                self._positional = named2format
+            else:
+                self._paramstyle = named2pyformat
+
+        elif type_conn in ('sqlite3', 'apsw', 'antiorm.backends.apsw'):
+            if positional:
+                self._positional = named2qmark
+
+        # Row ids of the bulk INSERTs can be calculated on SQLite and returned
+        # by PostgreSQL. Size of the multi-row INSERTs is limited by the
+        # number of variables on SQLite and by the size of the packets on MySQL
+        self.chunk_size = chunk_size
+        self.commit_every = commit_every
+        self.max_variables = None
+        self.max_packet = None
+
+        self._executemany = None
+        self._mysql = type_conn == 'MySQLdb.connections'
+        self._sqlite3 = type_conn == 'sqlite3'
+        self._rowid_ranges = None
+        self._primary_keys = None
+
+        if type_conn == 'psycopg2._psycopg':
+            self._executemany = execute_batch
+            self._primary_keys = {}
+
+        elif type_conn in ('sqlite3', 'apsw', 'antiorm.backends.apsw'):
+            self.max_variables = sqlite_max_variables(type_conn)
+            self._rowid_ranges = {}
+
+        # Factory to return the results of the table methods as columns (like
+        # antiorm.utils.columnar_factory) instead of as a list of rows
+        self.column_factory = None
+
+        # Server side cursors for the iterators of the table methods, so the
+        # rows are not buffered on the client before yielding the first one
+        self.server_side = server_side
+        self.itersize = itersize
+        self._server_cursor = None
+
+        if type_conn == 'MySQLdb.connections':
+            self._server_cursor = mysql_server_cursor
+        elif type_conn == 'psycopg2._psycopg':
+            self._server_cursor = psycopg2_server_cursor
+
+        # Caches of the results of the read methods by method name, and SQL
+        # code of the registered methods to know the tables they use
+        self.result_caches = {}
+        self._sqls = {}
+
+        # Read only methods are executed on the replicas (if any), while the
+        # other ones and the reads inside `primary()` use the primary database
+        self.replicas = []
+        self.read_manager = None
+
+        if replicas:
+            self.replicas = [self.__class__(replica) for replica in replicas]
+            self.read_manager = ReplicaManager(self, self.replicas, balance)
+
+        # Transaction manager joining the calls to the explicit transactions,
+        # installed while any thread has one open
+        self._joined = None
+        self._transactions = 0
+        self._transactions_lock = Lock()
+
+        self._lazy = {}
+        self._dirpaths = []
+
+        if cache_path:
+            self.cache = SpecCache(cache_path)
+        else:
+            self.cache = None
+
+        if catalog:
+            catalog.bind(self)
+
+        if dir_path:
+            self.parse_dir(dir_path, bypass_types, lazy, workers)
+
+    def __getattr__(self, method_name):
+        """
+        Parse and return the methods marked previously for lazy loading
+        """
+        # Get the lazy loading stored data
+        try:
+            parser, data, dir_path, bypass_types = self._lazy.pop(method_name)
+
+        # method was not marked for lazy loading, raise exception
+        except KeyError:
+            raise AttributeError(method_name)
+
+        # Do the parsing right now and return the method
+        parser(data, method_name, dir_path, bypass_types)
+
+        if self.cache is not None:
+            self.cache.sync()
+
+        return getattr(self, method_name)
+
+    def parse_dir(self, dir_path='sql', bypass_types=False, lazy=False,
+                  workers=None):
+        """
+        Build functions from the SQL queries inside the files at `dir_path`
+
+        Also add the functions as a methods to the AntiORM class
+
+        :param dir_path: path to the dir with the SQL files (for INCLUDE)
+        :type dir_path: string
+        :param bypass_types: set if parsing should bypass types
+        :type bypass_types: boolean
+        :param lazy: set if parsing should be postpone until required
+        :type lazy: boolean
+        :param workers: number of processes used to parse the files in parallel
+        :type workers: integer
+
+        :return: nothing
+        :rtype: None
+        """
+
+        if dir_path not in self._dirpaths:
+            self._dirpaths.append(dir_path)
+
+#        # Lazy processing, store data & only do the parse if later is required
+#        if lazy:
+#            self._lazy[method_name] = (self.parse_dir, dir_path)
+#            return
+
+        # Parallel processing, parse the files on a pool of processes
+        if workers > 1 and not lazy:
+            for spec in parse_dir_specs(dir_path, self._dirpaths,
+                                        self._paramstyle, self.cache, workers,
+                                        self._check_reads()):
+                self.build_method(spec, bypass_types)
+
+        else:
+            for filename in listdir(dir_path):
+                self.parse_file(join(dir_path, filename), None, dir_path,
+                                bypass_types, lazy)
+
+        if self.cache is not None:
+            self.cache.sync()
+
+    def parse_file(self, file_path, method_name=None, dir_path='sql',
+                    bypass_types=False, lazy=False):
+        """
+        Build a function from a file containing a SQL query
+
+        Also add the function as a method to the AntiORM class
+
+        :param file_path: the path of SQL file of the method to be parsed
+        :type file_path: string
+        :param method_name: the name of the method
+        :type method_name: string
+        :param dir_path: path to the dir with the SQL files (for INCLUDE)
+        :type dir_path: string
+        :param lazy: set if parsing should be postpone until required
+        :type lazy: boolean
+
+        :returns: the parsed function (except if lazy is True)
+        :rtype: function
+        """
+
+        if not method_name:
+            method_name = splitext(basename(file_path))[0]
+
+        # Lazy processing, store data & only do the parse if later is required
+        if lazy:
+            self._lazy[method_name] = (self.parse_file, file_path, dir_path,
+                                       bypass_types)
+            return
+
+        with open(file_path, 'rt') as file_sql:
+            return self.parse_string(file_sql.read(), method_name, dir_path,
+                                     bypass_types)
+
+    def parse_string(self, sql, method_name, dir_path='sql',
+                       bypass_types=False, lazy=False):
+        """
+        Build a function from a string containing a SQL query
+
+        Also add the function as a method to the AntiORM class
+
+        :param sql: the SQL code of the method to be parsed
+        :type sql: string
+        :param method_name: the name of the method
+        :type method_name: string
+        :param dir_path: path to the dir with the SQL files (for INCLUDE)
+        :type dir_path: string
+        :param bypass_types: set if parsing should bypass types
+        :type bypass_types: boolean
+        :param lazy: set if parsing should be postpone until required
+        :type lazy: boolean
+
+        :return: the parsed function or None if `lazy` is True
+        :rtype: function or None
+        """
+
+        # Lazy processing, store data & only do the parse if later is required
+        if lazy:
+            self._lazy[method_name] = (self.parse_string, sql, dir_path,
+                                       bypass_types)
+            return
+
+        # Set the dirpaths where to look for the INCLUDE statements
+        dirpaths = self._dirpaths
+        if dir_path not in dirpaths:
+            dirpaths.append(dir_path)
+
+        # Get the method classification from the cache, or parse and store it
+        if self.cache is not None:
+            key = self.cache.key(sql, dirpaths, self._paramstyle)
+
+            parsed = self.cache.get(key)
+            if parsed is None:
+                parsed = parse_sql(sql, dirpaths, self._paramstyle,
+                                   self._check_reads())
+                self.cache.set(key, parsed)
+        else:
+            parsed = parse_sql(sql, dirpaths, self._paramstyle,
+                               self._check_reads())
+
+        return self.build_method(MethodSpec(method_name, *parsed),
+                                 bypass_types)
+
+    def _check_reads(self):
+        """
+        Check if the parsed methods need to know if their queries only read
+
+        It's needed for the replicas, and also when caching the parsed methods
+        so they can be used later by engines with replicas.
+        """
+        return self.read_manager is not None or self.cache is not None
+
+    def build_method(self, spec, bypass_types=False, register=True):
+        """
+        Build a function from an already parsed method specification
+
+        Also add the function as a method to the AntiORM class
+
+        :param spec: the parsed method
+        :type spec: MethodSpec
+        :param bypass_types: set if parsing should bypass types
+        :type bypass_types: boolean
+        :param register: set if the function should be registered as a method
+        :type register: boolean
+
+        :return: the built function
+        :rtype: function
+        """
+        # Disable by-pass of types if not using CPython compatible bytecode
+        if bypass_types and not _getframe:
+            warn(RuntimeWarning("Can't acces to stack. "
+                                "Disabling by-pass of types."))
+            bypass_types = False
+
+        # Only the engines with replicas need to know if the method only reads
+        reads = spec.reads
+        if reads is None:
+            reads = self.read_manager is not None and read_only(spec.sql)
+
+        factory = getattr(self, '_' + spec.kind)
+        result = factory(spec.name, spec.sql, bypass_types, register, reads)
+
+        if register:
+            self._sqls[spec.name] = spec.sql
+
+            # Invalidate the cached results if the new method write on tables
+            if self.result_caches:
+                self._hook_writes((spec.name,))
+
+        return result
+
+    def cache_results(self, method_name, size=128, ttl=None):
+        """
+        Cache the results of a read only method
+
+        The results are cached by the values of the parameters of the calls,
+        and they are invalidated when a method writing on any of the tables
+        read by the method is called through the engine.
+
+        :param method_name: the name of the method
+        :type method_name: string
+        :param size: maximum number of cached results
+        :type size: integer
+        :param ttl: seconds the results are valid, or None to not expire them
+        :type ttl: number
+
+        :return: the cache of the results of the method
+        :rtype: antiorm.results.ResultCache
+        """
+        query = getattr(self, method_name)
+        if isinstance(query, CachedQuery):
+            query = query.query
+
+        sql = self._method_sql(method_name)
+        reads, writes = query_tables(sql)
+        if writes is None or writes:
+            raise ValueError("%r is not a read only method" % method_name)
+
+        cache = ResultCache(size, ttl, reads)
+        self.result_caches[method_name] = cache
+        setattr(self, method_name,
+                CachedQuery(query, cache, parameters(sql), self))
+
+        self._hook_writes()
+        return cache
+
+    def cache_stats(self):
+        """
+        Get the counters of the caches of results
+
+        :return: the hits, misses, evictions, invalidations and current size of
+            the cache of each method
+        :rtype: dict
+        """
+        return dict((method_name, cache.stats())
+                    for method_name, cache in self.result_caches.iteritems())
+
+    def _method_sql(self, method_name):
+        """
+        Get the SQL code of a registered, catalog or compiled method
+        """
+        try:
+            return self._sqls[method_name]
+        except KeyError:
+            return getattr(self, '_SQLS', {})[method_name]
+
+    def _hook_writes(self, method_names=None):
+        """
+        Invalidate the cached results after the calls to the write methods
+
+        :param method_names: names of the methods to check (by default, all)
+        :type method_names: iterable of strings
+        """
+        if method_names is None:
+            method_names = set(self._sqls)
+            method_names.update(getattr(self, '_SQLS', ()))
+
+        for method_name in method_names:
+            query = getattr(self, method_name, None)
+            if query is None or isinstance(query, (CachedQuery,
+                                                   InvalidatingQuery)):
+                continue
+
+            writes = query_tables(self._method_sql(method_name))[1]
+            if writes is None or writes:
+                setattr(self, method_name,
+                        InvalidatingQuery(query, self, writes))
+
+    def _invalidate(self, tables):
+        """
+        Invalidate the cached results of the methods reading from tables
+
+        :param tables: the written tables, or None to invalidate all of them
+        :type tables: frozenset of strings or None
+        """
+        # Invalidate them again when the explicit transaction is finished, so
+        # the results cached meanwhile by other threads are discarded
+        if self._in_transaction():
+            joined = self._joined
+            if tables is None or joined.written is None:
+                joined.written = None
+            else:
+                joined.written |= tables
+
+        for cache in self.result_caches.values():
+            if tables is None or cache.tables & tables:
+                cache.clear()
+
+    @property
+    def row_factory(self):
+        """
+        Getter of row_factory property
+        """
+        return self.connection.row_factory
+
+    @row_factory.setter
+    def row_factory(self, value):
+        """
+        Setter of row_factory property
+        """
+        self.connection.row_factory = value
+
+        for replica in self.replicas:
+            replica.row_factory = value
+
+    @contextmanager
+    def primary(self):
+        """
+        Context manager to exec the read only methods on the primary database
+
+        Reads of the current thread inside it (like the ones of an explicit
+        transaction) can see the changes not yet replicated.
+        """
+        read_manager = self.read_manager
+        if read_manager is None:
+            yield self
+            return
+
+        read_manager.pin()
+        try:
+            yield self
+        finally:
+            read_manager.unpin()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Context manager of an explicit transaction
+
+        All the method calls of the current thread inside it are done on the
+        same transaction, that is committed once when exiting the context, or
+        rollbacked if there was an exception. Nested contexts use savepoints,
+        so an exception only rollbacks the calls done inside them. The reads
+        are done on the primary database.
+
+        :return: the connection of the transaction
+        """
+        with self._transactions_lock:
+            joined = self._joined
+            if joined is None:
+                joined = self._joined = JoinedManager(self.tx_manager)
+                self.tx_manager = joined
+            self._transactions += 1
+
+        try:
+            conn = joined.connection
+
+            # Nested transaction, using a savepoint
+            if conn is not None:
+                name = 'antiorm_%d' % next(_savepoint_names)
+
+                cursor = conn.cursor()
+                cursor.execute("SAVEPOINT " + name)
+
+                try:
+                    yield conn
+
+                except:
+                    cursor.execute("ROLLBACK TO SAVEPOINT " + name)
+                    cursor.execute("RELEASE SAVEPOINT " + name)
+                    raise
+
+                cursor.execute("RELEASE SAVEPOINT " + name)
+                return
+
+            joined.written = frozenset()
+            try:
+                with joined.manager as conn:
+                    # sqlite3 module commits implicitly before the savepoints,
+                    # so the transaction is managed explicitly
+                    if self._sqlite3:
+                        db_conn = getattr(conn, '_connection', conn)
+                        isolation_level = db_conn.isolation_level
+                        db_conn.isolation_level = None
+                        db_conn.execute("BEGIN")
+
+                    joined.connection = conn
+                    try:
+                        with self.primary():
+                            yield conn
+
+                    finally:
+                        joined.connection = None
+
+                        if self._sqlite3:
+                            db_conn.isolation_level = isolation_level
+
+            # Invalidate the cached results of the tables written on the
+            # transaction after its commit or rollback
+            finally:
+                written = joined.written
+                if written is None or written:
+                    self._invalidate(written)
+
+        finally:
+            with self._transactions_lock:
+                self._transactions -= 1
+                if not self._transactions:
+                    self.tx_manager = joined.manager
+                    self._joined = None
+
+    def _in_transaction(self):
+        """
+        Check if the current thread has an explicit transaction open
+
+        :return: if the calls of the thread join an explicit transaction
+        :rtype: boolean
+        """
+        joined = self._joined
+        return joined is not None and joined.connection is not None
+
+    def _manager(self, reads):
+        """
+        Get the transaction manager of a method
+
+        :param reads: set if the method only reads from the database
+        :type reads: boolean
+
+        :return: the replicas one for the read only methods (if any), or the
+            one of the primary database
+        """
+        if reads and self.read_manager:
+            return self.read_manager
+        return self.tx_manager
+
+    def _prepare(self, sql, method_name=None, expected=None):
+        """
+        Adapt a SQL query to the positional paramstyle of the connection
+
+        The names of the parameters are extracted when building the method, so
+        the calls only need to get their values from the parameters dict. If
+        `method_name` is given, the keys of the dict are checked against them.
+
+        :param sql: the sql query
+        :type sql: string
+        :param method_name: name of the method
+        :type method_name: string or None
+        :param expected: names of all the parameters of the method (by
+            default, the ones of the query)
+        :type expected: tuple of strings or None
+
+        :return: the adapted sql query and a function to get its arguments
+            from the parameters dict
+        :rtype: tuple
+        """
+        if self._positional:
+            sql, names = self._positional(sql)
+            return sql, args_getter(names, method_name, expected)
+
+        return sql, _kwargs
+
+    def _prepare_all(self, stmts, method_name):
+        """
+        Adapt the SQL queries of a multiple statements method
+
+        Only the parameters dict given to the first statement is checked,
+        since the other ones get the same dict.
+
+        :param stmts: the sql queries
+        :type stmts: sequence of strings
+        :param method_name: name of the method
+        :type method_name: string
+
+        :return: the adapted sql queries and the functions to get their
+            arguments from the parameters dict
+        :rtype: list of tuples
+        """
+        return ([self._prepare(stmts[0], method_name, parameters(tuple(stmts)))]
+                + [self._prepare(stmt) for stmt in stmts[1:]])
+
+    def _specialize(self, method_name, sql, kind, one, reads=False):
+        """
+        Build a method with the parameters of the query as its arguments
+
+        Calls giving all the parameters as arguments exec the query directly
+        using the `kind` template (if any) or the `one` optimized function,
+        and others are managed by the `fallback` function.
+
+        :param method_name: name of the method
+        :type method_name: string
+        :param sql: sql query (or queries) of the method
+        :type sql: string or tuple of strings
+        :param kind: name of the template of the method body
+        :type kind: string or None
+        :param one: optimized function for a dict of parameters
+        :type one: function
+        :param reads: set if the query only reads from the database
+        :type reads: boolean
+
+        :return: the specialized function
+        :rtype: function
+        """
+        names = parameters(sql)
+        namespace = {'_MISSING': MISSING, '_NAME': method_name, '_ROWS': ROWS,
+                     '_fallback': fallback, '_one': one}
+
+        # Exec the query directly on the function
+        if kind:
+            if self._positional:
+                sql, args = self._positional(sql)
+                params = tuple_source(args)
+            else:
+                params = dict_source(names)
+
+            namespace['_SQL'] = sql
+            key = kind, names, params, reads
+
+        # Exec the query calling to the optimized function
+        else:
+            key = None, names
+
+        # Compile the code only the first time the shape is used
+        try:
+            code = _specialized[key]
+
+        except KeyError:
+            if kind:
+                body = '_params = %s\n\n' % params + indent(
+                    TEMPLATES[kind][0] % {'args': '_params', 'sql': '_SQL',
+                                          'manager': MANAGERS[reads]}, '')
+            else:
+                body = 'return _one(self, %s)' % dict_source(names)
+
+            code = _specialized[key] = compile(
+                specialize(None, names, body, '_query', '_NAME'),
+                '<antiorm>', 'exec')
+
+        exec code in namespace
+
+        func = namespace['_query']
+        func.__doc__ = "Exec the `%s` query" % method_name
+
+        # Method names that are not valid identifiers (like the ones from
+        # files starting with a digit) are only accessible with `getattr()`
+        if IDENTIFIER.match(method_name) and not iskeyword(method_name):
+            func.__name__ = str(method_name)
+
+        return func
+
+    def _rowid_range(self, cursor, sql):
+        """
+        Check if the row ids of a bulk INSERT can be get from the last one
+
+        This is only possible on SQLite when each execution insert one row and
+        its row id is set by SQLite, so they are consecutive inside the
+        transaction. It's checked once for each statement.
+
+        :param cursor: cursor of the transaction
+        :type cursor: DB-API 2.0 cursor
+        :param sql: the sql INSERT statement
+        :type sql: string
+
+        :return: if the row ids can be calculated from the last one
+        :rtype: boolean
+        """
+        if self._rowid_ranges is None:
+            return False
+
+        try:
+            return self._rowid_ranges[sql]
+        except KeyError:
+            pass
+
+        match = INSERT_ROW.match(sql)
+        if not match:
+            self._rowid_ranges[sql] = False
+            return False
+
+        table, columns, _ = match.groups()
+
+        try:
+            cursor.execute("SELECT name, type, pk FROM pragma_table_info(?)",
+                           (table,))
+            info = cursor.fetchall()
+        except Exception:
+            info = None
+
+        # Table not found (yet), check it again on next call
+        if not info:
+            return False
+
+        if columns is None:
+            columns = [row[0] for row in info]
+        else:
+            columns = [column.strip() for column in columns.split(',')]
+
+        columns = set(column.lower() for column in columns)
+        keys = [row for row in info if row[2]]
+
+        # The row id is set by the statement
+        result = not columns & ROWID
+        if len(keys) == 1 and keys[0][1].upper() == 'INTEGER':
+            result = result and keys[0][0].lower() not in columns
+
+        self._rowid_ranges[sql] = result
+        return result
+
+    def _primary_key(self, cursor, sql):
+        """
+        Get the primary key returned by the bulk INSERTs of a statement
+
+        This is only possible on PostgreSQL, that can return the primary key
+        of the rows of a multi-row INSERT with a RETURNING clause, when the
+        statement insert one row and the primary key of its table is only one
+        column. It's checked once for each statement.
+
+        :param cursor: cursor of the transaction
+        :type cursor: DB-API 2.0 cursor
+        :param sql: the sql INSERT statement
+        :type sql: string
+
+        :return: the quoted name of the primary key column, or None if the
+            row ids can't be returned
+        :rtype: string or None
+        """
+        if self._primary_keys is None:
+            return None
+
+        try:
+            return self._primary_keys[sql]
+        except KeyError:
+            pass
+
+        match = INSERT_ROW.match(sql)
+        if not match:
+            self._primary_keys[sql] = None
+            return None
+
+        table = match.group(1)
+
+        cursor.execute(PRIMARY_KEY, (table, table))
+        found, keys = cursor.fetchone()
+
+        # Table not found (yet), check it again on next call
+        if not found:
+            return None
+
+        result = None
+        if len(keys) == 1:
+            result = '"%s"' % keys[0].replace('"', '""')
+
+        self._primary_keys[sql] = result
+        return result
+
+    def _insert_many(self, sql, getargs, list_kwargs, rowids=True,
+                     multirow=False):
+        """
+        Exec an INSERT statement for each dict of parameters on bulk
+
+        The statement is executed with `executemany()` on chunks of
+        `chunk_size` rows, or rewritten to insert all the rows of the chunk at
+        once if `multirow` is set. On PostgreSQL the row ids are returned by
+        multi-row INSERTs. If the row ids are requested and they can't be
+        calculated or returned for the statement, it's executed once for each
+        row.
+
+        :param sql: the sql INSERT statement
+        :type sql: string
+        :param getargs: function to get the arguments from a parameters dict
+        :type getargs: function
+        :param list_kwargs: an iterable with the keyword arguments of the query
+        :type list_kwargs: iterable of dicts
+        :param rowids: set if the inserted row ids should be returned
+        :type rowids: boolean
+        :param multirow: set if the rows should be inserted with only one
+            multi-row INSERT statement for each chunk
+        :type multirow: boolean
+
+        :return: the inserted row ids, or None if `rowids` is False
+        :rtype: list of integers or None
+        """
+        # Parameters are binded by name
+        if getargs is None:
+            getargs = _kwargs
+
+        with self.tx_manager as conn:
+            return self._insert_rows(conn.cursor(), sql, getargs, list_kwargs,
+                                     rowids, multirow)
+
+    def _insert_rows(self, cursor, sql, getargs, list_kwargs, rowids=True,
+                     multirow=False):
+        """
+        Exec an INSERT statement for each dict of parameters on a transaction
+
+        It's the body of `_insert_many()`, so it can be used by the methods
+        with several statements to exec all of them on the same transaction.
+
+        :param cursor: cursor of the transaction
+        :type cursor: DB-API 2.0 cursor
+        :param sql: the sql INSERT statement
+        :type sql: string
+        :param getargs: function to get the arguments from a parameters dict
+        :type getargs: function
+        :param list_kwargs: an iterable with the keyword arguments of the query
+        :type list_kwargs: iterable of dicts
+        :param rowids: set if the inserted row ids should be returned
+        :type rowids: boolean
+        :param multirow: set if the rows should be inserted with only one
+            multi-row INSERT statement for each chunk
+        :type multirow: boolean
+
+        :return: the inserted row ids, or None if `rowids` is False
+        :rtype: list of integers or None
+        """
+        # Row ids returned by the database, they need multi-row INSERTs
+        if rowids and getargs is not _kwargs:
+            key = self._primary_key(cursor, sql)
+            if key:
+                return self._insert_values(cursor, sql,
+                                           INSERT_ROW.match(sql).span(3),
+                                           getargs, list_kwargs, key)
+
+        # Row ids requested but they can't be calculated, exec row by row
+        if rowids and not self._rowid_range(cursor, sql):
+            result = []
+
+            for kwargs in list_kwargs:
+                cursor.execute(sql, getargs(kwargs))
+                result.append(cursor.lastrowid)
+
+            return result
+
+        # Multi-row INSERTs need the parameters binded by position
+        if multirow and getargs is not _kwargs:
+            match = INSERT_ROW.match(sql)
+            if match:
+                return self._insert_values(cursor, sql, match.span(3),
+                                           getargs, list_kwargs, rowids)
+
+        result = [] if rowids else None
+        list_kwargs = iter(list_kwargs)
+
+        while True:
+            chunk = map(getargs, islice(list_kwargs, self.chunk_size))
+            if not chunk:
+                return result
+
+            if self._executemany:
+                self._executemany(cursor, sql, chunk)
+            else:
+                cursor.executemany(sql, chunk)
+
+            # Row ids are consecutive, calculate them from the last one
+            if rowids:
+                cursor.execute("SELECT last_insert_rowid()")
+                last = cursor.fetchone()[0]
+
+                result.extend(xrange(last - len(chunk) + 1, last + 1))
+
+    def _insert_statements(self, stmts, getargs, list_kwargs):
+        """
+        Exec several statements for each dict of parameters on bulk
+
+        Each statement is executed for all the dicts before the next one
+        (statement-major order), so they can be done with `executemany()` and
+        the first one return its inserted row ids as in `_insert_many()`. If
+        the next statements use the row id inserted by the previous one (like
+        with `last_insert_rowid()`), they are executed row by row instead.
+
+        :param stmts: the sql statements, being the first one an INSERT
+        :type stmts: sequence of strings
+        :param getargs: functions to get the arguments of each statement from
+            a parameters dict, or None if they are binded by name
+        :type getargs: sequence of functions or None
+        :param list_kwargs: an iterable with the keyword arguments of the query
+        :type list_kwargs: iterable of dicts
+
+        :return: the row ids inserted by the first statement
+        :rtype: list of integers
+        """
+        # Parameters are binded by name
+        if getargs is None:
+            getargs = [_kwargs] * len(stmts)
+
+        list_kwargs = list(list_kwargs)
+
+        with self.tx_manager as conn:
+            cursor = conn.cursor()
+
+            # Statements depending on the last row id, exec them row by row
+            if LASTROWID.search(' '.join(stmts[1:])):
+                result = []
+
+                for kwargs in list_kwargs:
+                    cursor.execute(stmts[0], getargs[0](kwargs))
+                    result.append(cursor.lastrowid)
+
+                    for stmt, args in zip(stmts[1:], getargs[1:]):
+                        cursor.execute(stmt, args(kwargs))
 
-        # Get paramstyle adapter for the connection
-        if type_conn in ('MySQLdb.connections', 'psycopg2._psycopg'):
-            self._paramstyle = named2pyformat
-        else:
-            self._paramstyle = None
+                return result
 
-        self._lazy = {}
-        self._dirpaths = []
+            result = self._insert_rows(cursor, stmts[0], getargs[0],
+                                       list_kwargs)
 
-        if dir_path:
-            self.parse_dir(dir_path, bypass_types, lazy)
+            for stmt, args in zip(stmts[1:], getargs[1:]):
+                for start in xrange(0, len(list_kwargs), self.chunk_size):
+                    chunk = map(args,
+                                list_kwargs[start:start + self.chunk_size])
 
-    def __getattr__(self, method_name):
+                    if self._executemany:
+                        self._executemany(cursor, stmt, chunk)
+                    else:
+                        cursor.executemany(stmt, chunk)
+
+            return result
+
+    def _insert_values(self, cursor, sql, span, getargs, list_kwargs,
+                       rowids=True):
         """
-        Parse and return the methods marked previously for lazy loading
+        Exec an INSERT statement for a list of rows as multi-row INSERTs
+
+        The VALUES row of the statement is repeated for each row of the chunk
+        and their parameters are flattened. Chunks are limited to
+        `chunk_size` rows, to `max_variables` parameters and to `max_packet`
+        bytes (queried from the server on MySQL). If `rowids` is the name of
+        a column, the row ids are its values returned by the statements
+        (with a RETURNING clause, as on PostgreSQL) instead of calculating
+        them from the last one.
+
+        :param cursor: cursor of the transaction
+        :type cursor: DB-API 2.0 cursor
+        :param sql: the sql INSERT statement of one row
+        :type sql: string
+        :param span: start and end of the VALUES row on the statement
+        :type span: tuple of integers
+        :param getargs: function to get the arguments from a parameters dict
+        :type getargs: function
+        :param list_kwargs: an iterable with the keyword arguments of the query
+        :type list_kwargs: iterable of dicts
+        :param rowids: set if the inserted row ids should be returned, or the
+            column returned as row id
+        :type rowids: boolean or string
+
+        :return: the inserted row ids, or None if `rowids` is False
+        :rtype: list of integers or None
         """
-        # Get the lazy loading stored data
-        try:
-            parser, data, dir_path, bypass_types = self._lazy.pop(method_name)
+        start, end = span
+        head = sql[:start]
+        row = sql[start:end]
+        tail = sql[end:]
 
-        # method was not marked for lazy loading, raise exception
-        except KeyError:
-            raise AttributeError(method_name)
+        returning = isinstance(rowids, basestring)
+        if returning:
+            tail = ' RETURNING ' + rowids + tail
 
-        # Do the parsing right now and return the method
-        result = parser(data, method_name, dir_path, bypass_types)
-        return result.__get__(self, self.__class__)
+        if self._mysql and self.max_packet is None:
+            cursor.execute("SELECT @@max_allowed_packet")
+            self.max_packet = cursor.fetchone()[0]
 
-    def parse_dir(self, dir_path='sql', bypass_types=False, lazy=False):
-        """
-        Build functions from the SQL queries inside the files at `dir_path`
+        result = [] if rowids else None
+        list_kwargs = iter(list_kwargs)
 
-        Also add the functions as a methods to the AntiORM class
+        # Get the first row to know the number of parameters of each one
+        pending = None
+        for kwargs in list_kwargs:
+            pending = getargs(kwargs)
+            break
 
-        :param dir_path: path to the dir with the SQL files (for INCLUDE)
-        :type dir_path: string
-        :param bypass_types: set if parsing should bypass types
-        :type bypass_types: boolean
-        :param lazy: set if parsing should be postpone until required
-        :type lazy: boolean
+        max_rows = self.chunk_size
+        if self.max_variables and pending:
+            max_rows = min(max_rows, self.max_variables // len(pending))
+        max_rows = max(max_rows, 1)
 
-        :return: nothing
-        :rtype: None
-        """
+        max_size = None
+        if self.max_packet:
+            max_size = self.max_packet - len(head) - len(tail)
 
-        if dir_path not in self._dirpaths:
-            self._dirpaths.append(dir_path)
+        statements = {}
 
-#        # Lazy processing, store data & only do the parse if later is required
-#        if lazy:
-#            self._lazy[method_name] = (self.parse_dir, dir_path)
-#            return
+        while pending is not None:
+            args = list(pending)
+            rows = 1
 
-        for filename in listdir(dir_path):
-            self.parse_file(join(dir_path, filename), None, dir_path,
-                            bypass_types, lazy)
+            size = 0
+            if max_size:
+                size = len(row) + sum(map(_literal_size, pending))
 
-    def parse_file(self, file_path, method_name=None, dir_path='sql',
-                    bypass_types=False, lazy=False):
-        """
-        Build a function from a file containing a SQL query
+            pending = None
 
-        Also add the function as a method to the AntiORM class
+            # Add rows to the chunk while they fit on the limits
+            if rows < max_rows:
+                for kwargs in list_kwargs:
+                    values = getargs(kwargs)
 
-        :param file_path: the path of SQL file of the method to be parsed
-        :type file_path: string
-        :param method_name: the name of the method
-        :type method_name: string
-        :param dir_path: path to the dir with the SQL files (for INCLUDE)
-        :type dir_path: string
-        :param lazy: set if parsing should be postpone until required
-        :type lazy: boolean
+                    if max_size:
+                        row_size = len(row) + 1 \
+                                 + sum(map(_literal_size, values))
+                        if size + row_size > max_size:
+                            pending = values
+                            break
+                        size += row_size
 
-        :returns: the parsed function (except if lazy is True)
-        :rtype: function
+                    args.extend(values)
+                    rows += 1
+
+                    if rows == max_rows:
+                        break
+
+            # Exec the chunk
+            try:
+                statement = statements[rows]
+            except KeyError:
+                statement = statements[rows] = \
+                    head + ','.join([row] * rows) + tail
+
+            cursor.execute(statement, args)
+
+            if returning:
+                result.extend(key for key, in cursor.fetchall())
+
+            # Row ids are consecutive, calculate them from the last one
+            elif rowids:
+                cursor.execute("SELECT last_insert_rowid()")
+                last = cursor.fetchone()[0]
+
+                result.extend(xrange(last - rows + 1, last + 1))
+
+            # Get the first row of the next chunk
+            if pending is None:
+                for kwargs in list_kwargs:
+                    pending = getargs(kwargs)
+                    break
+
+        return result
+
+    def _lookup(self, sql):
         """
+        Get the parts of a SELECT statement of a row by a column value
 
-        if not method_name:
-            method_name = splitext(basename(file_path))[0]
+        :param sql: the sql query (with named parameters)
+        :type sql: string
 
-        # Lazy processing, store data & only do the parse if later is required
-        if lazy:
-            self._lazy[method_name] = (self.parse_file, file_path, dir_path,
-                                       bypass_types)
+        :return: the head of the statement selecting the rows (and the column
+            value as their last field) whose value is in a list, and the
+            placeholder of the list values, or None if the statement can't be
+            done on batch
+        :rtype: tuple or None
+        """
+        if not self._positional:
             return
 
-        with open(file_path, 'rt') as file_sql:
-            return self.parse_string(file_sql.read(), method_name, dir_path,
-                                     bypass_types)
+        match = LOOKUP.match(sql)
+        if not match:
+            return
 
-    def parse_string(self, sql, method_name, dir_path='sql',
-                       bypass_types=False, lazy=False):
+        columns, table, key, _ = match.groups()
+
+        sql, _ = self._positional(u"SELECT %s, %s FROM %s WHERE %s IN (:key)"
+                                  % (columns, key, table, key))
+        start = sql.rindex('(') + 1
+
+        return sql[:start], sql[start:-1]
+
+    def _lookup_many(self, lookup, sql, getargs, list_kwargs, value=False):
         """
-        Build a function from a string containing a SQL query
+        Exec a SELECT statement of a row by a column value for a list of values
 
-        Also add the function as a method to the AntiORM class
+        The values are queried on batch with an IN clause in chunks of
+        `chunk_size` values (and `max_variables` on SQLite), and the rows are
+        scattered back to the order of the parameters. Values without row are
+        checked one by one with the original statement, so types affinity or
+        collations of the column don't make to lose rows.
 
-        :param sql: the SQL code of the method to be parsed
+        :param lookup: head and placeholder of the batch statement
+        :type lookup: tuple
+        :param sql: the sql statement of one row
         :type sql: string
-        :param method_name: the name of the method
-        :type method_name: string
-        :param dir_path: path to the dir with the SQL files (for INCLUDE)
-        :type dir_path: string
-        :param bypass_types: set if parsing should bypass types
-        :type bypass_types: boolean
-        :param lazy: set if parsing should be postpone until required
-        :type lazy: boolean
-
-        :return: the parsed function or None if `lazy` is True
-        :rtype: function or None
+        :param getargs: function to get the arguments from a parameters dict
+        :type getargs: function
+        :param list_kwargs: an iterable with the keyword arguments of the query
+        :type list_kwargs: iterable of dicts
+        :param value: set if only the first field of the rows is returned
+        :type value: boolean
+
+        :return: the queried rows (or values) in the order of the parameters
+        :rtype: list
         """
+        head, placeholder = lookup
+        keys = [getargs(kwargs)[0] for kwargs in list_kwargs]
+
+        max_keys = self.chunk_size
+        if self.max_variables:
+            max_keys = min(max_keys, self.max_variables)
+        max_keys = max(max_keys, 1)
+
+        with self._manager(True) as conn:
+            cursor = conn.cursor()
+
+            # Rows with the key as last field can't be build by a row factory
+            if not value and getattr(conn, 'row_factory', None):
+                result = []
+                for key in keys:
+                    cursor.execute(sql, (key,))
+                    result.append(cursor.fetchone())
+                return result
 
-        # Lazy processing, store data & only do the parse if later is required
-        if lazy:
-            self._lazy[method_name] = (self.parse_string, sql, dir_path,
-                                       bypass_types)
-            return
+            rows = {}
+            unique = list(set(keys))
 
-        # Disable by-pass of types if not using CPython compatible bytecode
-        if bypass_types and not _getframe:
-            warn(RuntimeWarning("Can't acces to stack. "
-                                "Disabling by-pass of types."))
-            bypass_types = False
+            for start in xrange(0, len(unique), max_keys):
+                chunk = unique[start:start + max_keys]
 
-        # Set the dirpaths where to look for the INCLUDE statements
-        dirpaths = self._dirpaths
-        if dir_path not in dirpaths:
-            dirpaths.append(dir_path)
+                cursor.execute(head + ', '.join([placeholder] * len(chunk))
+                               + ')', chunk)
 
-        pipe = Pipeline()
-        pipe.append(tokenize)
-        pipe.append(IncludeStatement(dirpaths))
+                for row in cursor.fetchall():
+                    key = row[len(row) - 1]
+                    if key not in rows:
+                        rows[key] = row[0] if value else row[:-1]
 
-        stream = compact(pipe(sql.strip()))
+            # Check the missing keys with the original statement
+            for key in unique:
+                if key not in rows:
+                    cursor.execute(sql, (key,))
 
-        # One statement query
-        if len(split2(stream)) == 1:
-            return self._one_statement(method_name, stream, bypass_types)
+                    row = cursor.fetchone()
+                    if row and value:
+                        row = row[0]
+                    rows[key] = row
 
-        # Multiple statement query
-        return self._multiple_statement(method_name, stream, bypass_types)
+        return [rows[key] for key in keys]
 
-    @property
-    def row_factory(self):
-        """
-        Getter of row_factory property
+    def _fetch_columns(self, cursor):
         """
-        return self.connection.row_factory
+        Get the result of a statement as columns using the `column_factory`
 
-    @row_factory.setter
-    def row_factory(self, value):
-        """
-        Setter of row_factory property
-        """
-        self.connection.row_factory = value
+        The rows are given to the factory in chunks of `chunk_size` rows, so
+        it doesn't need to have all of them on memory at once.
 
-    def _one_statement(self, method_name, stream, bypass_types):
-        """
-        Route to the correct optimized function for one statement queries
+        :param cursor: the cursor where the statement was executed
+        :type cursor: DB-API 2.0 cursor
 
-        :param method_name: the name of the method
-        :type method_name: string
-        :param stream: the stream of tokens
-        :type stream: iterable of tokens
-        :param bypass_types: set if parsing should bypass types
-        :type bypass_types: boolean
+        :return: the columns built by the `column_factory`
         """
-        sql = Tokens2Unicode(stream)
+        def chunks():
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    return
 
-        if self._paramstyle:
-            sql = self._paramstyle(sql)
+                yield rows
 
-        # Insert statement (return last row id)
-        if IsType('INSERT')(stream):
-            return self._one_statement_INSERT(method_name, sql, bypass_types)
+        return self.column_factory(cursor, chunks())
 
-        ## Update statement (return affected row count)
-        #if IsType('UPDATE')(stream):
-        #    return self._one_statement_UPDATE(method_name, sql, bypass_types)
+    def _iter_rows(self, sql, args, reads=False):
+        """
+        Exec a statement and yield its rows lazily
+
+        The rows are fetched with `fetchmany()` in chunks of `itersize` (or
+        `chunk_size`), so only a chunk is on memory at a time. If `server_side`
+        is set, MySQL and PostgreSQL use server side cursors so the rows are
+        not buffered on the client when the statement is executed. The cursor
+        and the transaction are kept open while the rows are being iterated,
+        and are released when the generator is exhausted, closed or garbage
+        collected. Meanwhile, the calls of the thread using the connection of
+        a server side cursor raise RuntimeError.
+
+        :param sql: the sql statement
+        :type sql: string
+        :param args: the arguments of the statement
+        :type args: tuple or dict
+        :param reads: set if the statement can be executed on the replicas
+        :type reads: boolean
 
-        # One-value function (a row of a cell)
-        if getlimit(stream) == 1:
-            columns = getcolumns(stream)
+        :return: generator of the rows
+        :rtype: generator
+        """
+        size = self.itersize or self.chunk_size
 
-            # Value function (one row, one field)
-            if len(columns) == 1 and columns[0] != '*':
-                return self._one_statement_value(method_name, sql, bypass_types)
+        with self._manager(reads) as conn:
+            streaming = None
 
-            # Register function (one row, several fields)
-            return self._one_statement_register(method_name, sql, bypass_types)
+            if self.server_side and self._server_cursor:
+                cursor = self._server_cursor(conn, size)
 
-        # Table function (several rows)
-        return self._one_statement_table(method_name, sql, bypass_types)
+                # Refuse the nested calls using the connection meanwhile
+                streaming = streaming_connections()
+                streaming.add(getattr(conn, '_connection', conn))
+            else:
+                cursor = conn.cursor()
 
-    def _multiple_statement(self, method_name, stream, bypass_types):
-        """
-        Route to the correct optimized function for multiple statements queries
+            try:
+                cursor.execute(sql, args)
 
-        :param method_name: the name of the method
-        :type method_name: string
-        :param stream: the stream of tokens
-        :type stream: iterable of tokens
-        :param bypass_types: set if parsing should bypass types
-        :type bypass_types: boolean
-        """
-        stmts = map(unicode, split2(stream))
+                while True:
+                    rows = cursor.fetchmany(size)
+                    if not rows:
+                        return
 
-        if self._paramstyle:
-            stmts = map(self._paramstyle, stmts)
+                    for row in rows:
+                        yield row
 
-        # Insert statement (return last row id)
-        if IsType('INSERT')(stream):
-            return self._multiple_statement_INSERT(method_name, stmts,
-                                                   bypass_types)
+                    # Release the chunk before fetching the next one
+                    del rows, row
 
-        # Standard multiple statement query
-        return self._multiple_statement_standard(method_name, stmts,
-                                                 bypass_types)
+            finally:
+                if streaming is not None:
+                    streaming.discard(getattr(conn, '_connection', conn))
+                cursor.close()
 
     # Optimized functions
 
-    def _one_statement_INSERT__dict(self, sql):
+    def _one_statement_INSERT__dict(self, sql, method_name, reads=False):
         """
         Factory for functions with one INSERT statement by dict
 
         @param sql: the sql query
         @type sql: string
+        @param method_name: name of the method
+        @type method_name: string
+        @param reads: set if the query only reads from the database
+        @type reads: boolean
 
         @return: the optimized function
         @rtype: method function
         """
+        sql, getargs = self._prepare(sql, method_name)
+
         def _wrapped_method(self, kwargs):
             """
             Exec the statement and return the inserted row id
@@ -454,46 +2092,51 @@ class Base(object):
             with self.tx_manager as conn:
                 cursor = conn.cursor()
 
-                cursor.execute(sql, kwargs)
+                cursor.execute(sql, getargs(kwargs))
                 return cursor.lastrowid
 
         return _wrapped_method
 
-    def _one_statement_INSERT__list(self, sql):
+    def _one_statement_INSERT__list(self, sql, method_name, reads=False):
         """
         Factory for functions with one INSERT statement by list
 
         @param sql: the sql query
         @type sql: string
+        @param method_name: name of the method
+        @type method_name: string
+        @param reads: set if the query only reads from the database
+        @type reads: boolean
 
         @return: the optimized function
         @rtype: method function
         """
-        def _wrapped_method(self, list_kwargs):
-            """
-            Exec the statement and return the inserted row ids
-
-            @param list_kwargs: a list with the keyword arguments of the query
-            @type list_kwargs: list of dicts
+        sql, getargs = self._prepare(sql, method_name)
 
-            @return: the inserted row ids
-            @rtype: list of integers
+        def _wrapped_method(self, list_kwargs, rowids=True, multirow=False):
             """
-            result = []
-
-            with self.tx_manager as conn:
-                cursor = conn.cursor()
-
-                for kwargs in list_kwargs:
-                    cursor.execute(sql, kwargs)
-                    result.append(cursor.lastrowid)
-
-            return result
+            Exec the statement on bulk and return the inserted row ids
+
+            @param list_kwargs: an iterable with the keyword arguments of the
+                query
+            @type list_kwargs: iterable of dicts
+            @param rowids: set if the inserted row ids should be returned
+            @type rowids: boolean
+            @param multirow: set if the rows should be inserted with multi-row
+                INSERT statements
+            @type multirow: boolean
+
+            @return: the inserted row ids, or None if `rowids` is False
+            @rtype: list of integers or None
+            """
+            return self._insert_many(sql, getargs, list_kwargs, rowids,
+                                     multirow)
 
         return _wrapped_method
 
     _one_statement_INSERT = proxy_factory(_one_statement_INSERT__dict,
-                                          _one_statement_INSERT__list)
+                                          _one_statement_INSERT__list,
+                                          'one_statement_INSERT')
 
     #@register
     #def _statement_UPDATE_single(self, stmts):
@@ -533,16 +2176,22 @@ class Base(object):
     #
     #    return _wrapped_method
 
-    def _one_statement_value__dict(self, sql):
+    def _one_statement_value__dict(self, sql, method_name, reads=False):
         """
         Factory for functions with one statement that return a value by dict
 
         @param sql: the sql query
         @type sql: string
+        @param method_name: name of the method
+        @type method_name: string
+        @param reads: set if the query only reads from the database
+        @type reads: boolean
 
         @return: the optimized function
         @rtype: method function
         """
+        sql, getargs = self._prepare(sql, method_name)
+
         def _wrapped_method(self, kwargs):
             """
             Exec the statement and return the value
@@ -553,9 +2202,9 @@ class Base(object):
             @return: the queried value
             @rtype: stored value type or None
             """
-            with self.tx_manager as conn:
+            with self._manager(reads) as conn:
                 cursor = conn.cursor()
-                cursor.execute(sql, kwargs)
+                cursor.execute(sql, getargs(kwargs))
 
                 result = cursor.fetchone()
                 if result:
@@ -563,16 +2212,39 @@ class Base(object):
 
         return _wrapped_method
 
-    def _one_statement_value__list(self, sql):
+    def _one_statement_value__list(self, sql, method_name, reads=False):
         """
         Factory for functions with one statement that return a value by list
 
         @param sql: the sql query
         @type sql: string
+        @param method_name: name of the method
+        @type method_name: string
+        @param reads: set if the query only reads from the database
+        @type reads: boolean
 
         @return: the optimized function
         @rtype: method function
         """
+        lookup = self._lookup(sql)
+        sql, getargs = self._prepare(sql, method_name)
+
+        if lookup:
+            def _wrapped_method(self, list_kwargs):
+                """
+                Exec the statement on batch and return a list with the values
+
+                @param list_kwargs: the keyword arguments of the queries
+                @type list_kwargs: list of dicts
+
+                @return: the queried values
+                @rtype: list
+                """
+                return self._lookup_many(lookup, sql, getargs, list_kwargs,
+                                         True)
+
+            return _wrapped_method
+
         def _wrapped_method(self, list_kwargs):
             """
             Exec the statement and return a list with the values
@@ -585,11 +2257,11 @@ class Base(object):
             """
             result = []
 
-            with self.tx_manager as conn:
+            with self._manager(reads) as conn:
                 cursor = conn.cursor()
 
                 for kwargs in list_kwargs:
-                    cursor.execute(sql, kwargs)
+                    cursor.execute(sql, getargs(kwargs))
 
                     value = cursor.fetchone()
                     if value:
@@ -601,18 +2273,25 @@ class Base(object):
         return _wrapped_method
 
     _one_statement_value = proxy_factory(_one_statement_value__dict,
-                                         _one_statement_value__list)
+                                         _one_statement_value__list,
+                                         'one_statement_value')
 
-    def _one_statement_register__dict(self, sql):
+    def _one_statement_register__dict(self, sql, method_name, reads=False):
         """
         Factory for functions with one statement that return a row by dict
 
         @param sql: the sql query
         @type sql: string
+        @param method_name: name of the method
+        @type method_name: string
+        @param reads: set if the query only reads from the database
+        @type reads: boolean
 
         @return: the optimized function
         @rtype: method function
         """
+        sql, getargs = self._prepare(sql, method_name)
+
         def _wrapped_method(self, kwargs):
             """
             Exec the statement and return the row
@@ -623,24 +2302,47 @@ class Base(object):
             @return: the queried row
             @rtype: row (tuple) or None
             """
-            with self.tx_manager as conn:
+            with self._manager(reads) as conn:
                 cursor = conn.cursor()
-                cursor.execute(sql, kwargs)
+                cursor.execute(sql, getargs(kwargs))
 
                 return cursor.fetchone()
 
         return _wrapped_method
 
-    def _one_statement_register__list(self, sql):
+    def _one_statement_register__list(self, sql, method_name, reads=False):
         """
         Factory for functions with one statement that return a row by list
 
         @param sql: the sql query
         @type sql: string
+        @param method_name: name of the method
+        @type method_name: string
+        @param reads: set if the query only reads from the database
+        @type reads: boolean
 
         @return: the optimized function
         @rtype: method function
         """
+        lookup = self._lookup(sql)
+        sql, getargs = self._prepare(sql, method_name)
+
+        if lookup:
+            def _wrapped_method(self, list_kwargs):
+                """
+                Exec the statement on batch and return a list with the rows
+
+                @param list_kwargs: the keyword arguments of the queries
+                @type list_kwargs: list of dicts
+
+                @return: the queried rows
+                @rtype: list
+                """
+                return self._lookup_many(lookup, sql, getargs, list_kwargs,
+                                         False)
+
+            return _wrapped_method
+
         def _wrapped_method(self, list_kwargs):
             """
             Exec the statement and return a list with the rows
@@ -653,11 +2355,11 @@ class Base(object):
             """
             result = []
 
-            with self.tx_manager as conn:
+            with self._manager(reads) as conn:
                 cursor = conn.cursor()
 
                 for kwargs in list_kwargs:
-                    cursor.execute(sql, kwargs)
+                    cursor.execute(sql, getargs(kwargs))
 
                     result.append(cursor.fetchone())
 
@@ -666,18 +2368,25 @@ class Base(object):
         return _wrapped_method
 
     _one_statement_register = proxy_factory(_one_statement_register__dict,
-                                            _one_statement_register__list)
+                                            _one_statement_register__list,
+                                            'one_statement_register')
 
-    def _one_statement_table__dict(self, sql):
+    def _one_statement_table__dict(self, sql, method_name, reads=False):
         """
         Factory for functions with one statement that return a query by dict
 
         @param sql: the sql query
         @type sql: string
+        @param method_name: name of the method
+        @type method_name: string
+        @param reads: set if the query only reads from the database
+        @type reads: boolean
 
         @return: the optimized function
         @rtype: method function
         """
+        sql, getargs = self._prepare(sql, method_name)
+
         def _wrapped_method(self, kwargs):
             """
             Exec the statement and return the query (table, list of tuples...)
@@ -685,27 +2394,35 @@ class Base(object):
             @param kwargs: the keyword arguments of the query
             @type kwargs: dict
 
-            @return: the query
+            @return: the query, or its columns if `column_factory` is set
             @rtype: table or list of tuples or generator or None
             """
-            with self.tx_manager as conn:
+            with self._manager(reads) as conn:
                 cursor = conn.cursor()
-                cursor.execute(sql, kwargs)
+                cursor.execute(sql, getargs(kwargs))
 
+                if self.column_factory:
+                    return self._fetch_columns(cursor)
                 return cursor.fetchall()
 
         return _wrapped_method
 
-    def _one_statement_table__list(self, sql):
+    def _one_statement_table__list(self, sql, method_name, reads=False):
         """
         Factory for functions with one statement that return a table by list
 
         @param sql: the sql query
         @type sql: string
+        @param method_name: name of the method
+        @type method_name: string
+        @param reads: set if the query only reads from the database
+        @type reads: boolean
 
         @return: the optimized function
         @rtype: method function
         """
+        sql, getargs = self._prepare(sql, method_name)
+
         def _wrapped_method(self, list_kwargs):
             """
             Exec the statement and return a list with the queries
@@ -718,31 +2435,73 @@ class Base(object):
             """
             result = []
 
-            with self.tx_manager as conn:
+            with self._manager(reads) as conn:
                 cursor = conn.cursor()
 
                 for kwargs in list_kwargs:
-                    cursor.execute(sql, kwargs)
+                    cursor.execute(sql, getargs(kwargs))
 
-                    result.append(cursor.fetchall())
+                    if self.column_factory:
+                        result.append(self._fetch_columns(cursor))
+                    else:
+                        result.append(cursor.fetchall())
 
             return result
 
         return _wrapped_method
 
+    def _one_statement_table__iter(self, sql, method_name, reads=False):
+        """
+        Factory for functions with one statement that return a table lazily
+
+        @param sql: the sql query
+        @type sql: string
+        @param method_name: name of the method
+        @type method_name: string
+        @param reads: set if the query only reads from the database
+        @type reads: boolean
+
+        @return: the optimized function
+        @rtype: method function
+        """
+        sql, getargs = self._prepare(sql, method_name)
+
+        def _wrapped_method(self, kwargs):
+            """
+            Exec the statement and return an iterator over its rows
+
+            @param kwargs: the keyword arguments of the query
+            @type kwargs: dict
+
+            @return: the queried rows
+            @rtype: generator
+            """
+            return self._iter_rows(sql, getargs(kwargs), reads)
+
+        return _wrapped_method
+
     _one_statement_table = proxy_factory(_one_statement_table__dict,
-                                         _one_statement_table__list)
+                                         _one_statement_table__list,
+                                         'one_statement_table',
+                                         _one_statement_table__iter)
 
-    def _multiple_statement_INSERT__dict(self, stmts):
+    def _multiple_statement_INSERT__dict(self, stmts, method_name,
+                                                      reads=False):
         """
         Factory for functions with multiple INSERT statement by dict
 
         @param stmts: the list of sql queries
         @type stmts: iterable of strings
+        @param method_name: name of the method
+        @type method_name: string
+        @param reads: set if the query only reads from the database
+        @type reads: boolean
 
         @return: the optimized function
         @rtype: method function
         """
+        stmts = self._prepare_all(stmts, method_name)
+
         def _wrapped_method(self, kwargs):
             """
             Exec the statement and return the first inserted row id
@@ -756,29 +2515,37 @@ class Base(object):
             with self.tx_manager as conn:
                 cursor = conn.cursor()
 
-                cursor.execute(stmts[0], kwargs)
+                stmt, getargs = stmts[0]
+                cursor.execute(stmt, getargs(kwargs))
                 rowid = cursor.lastrowid
 
-                for stmt in stmts[1:]:
-                    cursor.execute(stmt, kwargs)
+                for stmt, getargs in stmts[1:]:
+                    cursor.execute(stmt, getargs(kwargs))
 
                 return rowid
 
         return _wrapped_method
 
-    def _multiple_statement_INSERT__list(self, stmts):
+    def _multiple_statement_INSERT__list(self, stmts, method_name,
+                                                      reads=False):
         """
         Factory for functions with multiple INSERT statement by list
 
         @param stmts: the list of sql queries
         @type stmts: iterable of strings
+        @param method_name: name of the method
+        @type method_name: string
+        @param reads: set if the query only reads from the database
+        @type reads: boolean
 
         @return: the optimized function
         @rtype: method function
         """
+        stmts, getargs = zip(*self._prepare_all(stmts, method_name))
+
         def _wrapped_method(self, list_kwargs):
             """
-            Exec the statement and return the inserted row ids
+            Exec the statements on bulk and return the inserted row ids
 
             @param list_kwargs: a list with the keyword arguments of the query
             @type list_kwargs: list of dicts
@@ -786,35 +2553,30 @@ class Base(object):
             @return: the first inserted row ids
             @rtype: list of integers
             """
-            result = []
-
-            with self.tx_manager as conn:
-                cursor = conn.cursor()
-
-                for kwargs in list_kwargs:
-                    cursor.execute(stmts[0], kwargs)
-                    result.append(cursor.lastrowid)
-
-                    for stmt in stmts[1:]:
-                        cursor.execute(stmt, kwargs)
-
-            return result
+            return self._insert_statements(stmts, getargs, list_kwargs)
 
         return _wrapped_method
 
     _multiple_statement_INSERT = proxy_factory(_multiple_statement_INSERT__dict,
                                                _multiple_statement_INSERT__list)
 
-    def _multiple_statement_standard__dict(self, stmts):
+    def _multiple_statement_standard__dict(self, stmts, method_name,
+                                                        reads=False):
         """
         Factory for functions with multiple statements by dict
 
         @param stmts: the list of sql queries
         @type stmts: iterable of strings
+        @param method_name: name of the method
+        @type method_name: string
+        @param reads: set if the query only reads from the database
+        @type reads: boolean
 
         @return: the optimized function
         @rtype: method function
         """
+        stmts = self._prepare_all(stmts, method_name)
+
         def _wrapped_method(self, kwargs):
             """
             Exec the statement and return the result of executes
@@ -830,23 +2592,30 @@ class Base(object):
             with self.tx_manager as conn:
                 cursor = conn.cursor()
 
-                for stmt in stmts:
-                    result.append(cursor.execute(stmt, kwargs))
+                for stmt, getargs in stmts:
+                    result.append(cursor.execute(stmt, getargs(kwargs)))
 
             return result
 
         return _wrapped_method
 
-    def _multiple_statement_standard__list(self, stmts):
+    def _multiple_statement_standard__list(self, stmts, method_name,
+                                                        reads=False):
         """
         Factory for functions with multiple statements by list
 
         @param stmts: the list of sql queries
         @type stmts: iterable of strings
+        @param method_name: name of the method
+        @type method_name: string
+        @param reads: set if the query only reads from the database
+        @type reads: boolean
 
         @return: the optimized function
         @rtype: method function
         """
+        stmts = self._prepare_all(stmts, method_name)
+
         def _wrapped_method(self, list_kwargs):
             """
             Exec the statement and return the a list of lists of results
@@ -865,8 +2634,8 @@ class Base(object):
                 for kwargs in list_kwargs:
                     result2 = []
 
-                    for stmt in stmts:
-                        result2.append(cursor.execute(stmt, kwargs))
+                    for stmt, getargs in stmts:
+                        result2.append(cursor.execute(stmt, getargs(kwargs)))
 
                     result.append(result2)
 
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent on-disk cache of the parsed SQL methods
+"""
+
+from cPickle  import dump, load, HIGHEST_PROTOCOL, UnpicklingError
+from hashlib  import sha1
+from os       import remove, rename
+from os.path  import exists, join
+from re       import compile as re_compile, IGNORECASE
+
+from sqlparse import __version__ as sqlparse_version
+
+
+INCLUDE = re_compile(r'\bINCLUDE\s+"([^"]+)"', IGNORECASE)
+
+
+class SpecCache(object):
+    """
+    On-disk cache of the classification of the parsed SQL methods
+
+    Parsing the SQL code with sqlparse is the slowest part of building the
+    methods, so the classification and the final (paramstyle adapted) SQL code
+    of each method is stored on a single file keyed by the hash of its SQL code
+    (and the ones of the files it INCLUDE), and on the next start the methods
+    are built directly from the cache without parsing them again.
+    """
+
+    # Increase it each time the format of the parsed methods change
+    _version = 2
+
+    _max_recursive = 10
+
+    def __init__(self, path):
+        """
+        Constructor
+
+        @param path: path of the file where the cache is stored
+        @type path: string
+        """
+        self.path = path
+
+        self._dirty = False
+        self._parsed = {}
+
+        # Load the cache from disk (if it exists and it's valid)
+        try:
+            with open(path, 'rb') as file_cache:
+                version, parsed = load(file_cache)
+
+        except (IOError, EOFError, TypeError, ValueError, UnpicklingError):
+            pass
+
+        else:
+            if version == (self._version, sqlparse_version):
+                self._parsed = parsed
+
+    def __len__(self):
+        return len(self._parsed)
+
+    def key(self, sql, dirpaths=(), paramstyle=None):
+        """
+        Get the key of a SQL code
+
+        @param sql: the SQL code of the method
+        @type sql: string
+        @param dirpaths: paths to the dirs with the SQL files (for INCLUDE)
+        @type dirpaths: list of strings
+        @param paramstyle: paramstyle adapter for the connection
+        @type paramstyle: function or None
+
+        @return: the key of the SQL code
+        @rtype: string
+        """
+        digest = sha1()
+
+        if paramstyle:
+            digest.update(paramstyle.__name__)
+        digest.update('\0')
+
+        self._update(digest, sql, dirpaths, self._max_recursive)
+
+        return digest.hexdigest()
+
+    def _update(self, digest, sql, dirpaths, maxrecursive):
+        """
+        Update the digest with the SQL code and the files it includes
+
+        @param digest: the digest to update
+        @type digest: hashlib hash object
+        @param sql: the SQL code
+        @type sql: string
+        @param dirpaths: paths to the dirs with the SQL files (for INCLUDE)
+        @type dirpaths: list of strings
+        @param maxrecursive: max number of nested INCLUDE statements to follow
+        @type maxrecursive: integer
+        """
+        if isinstance(sql, unicode):
+            sql = sql.encode('utf-8')
+        digest.update(sql)
+
+        if maxrecursive <= 0:
+            return
+
+        for filename in INCLUDE.findall(sql):
+            for dir_path in dirpaths:
+                path = join(dir_path, filename)
+
+                if exists(path):
+                    with open(path, 'rb') as file_sql:
+                        included = file_sql.read()
+
+                    digest.update('\0%s\0' % path)
+                    self._update(digest, included, dirpaths, maxrecursive - 1)
+                    break
+
+            # Include file not found, so the key will change when it's created
+            else:
+                digest.update('\0%s\0' % filename)
+
+    def get(self, key):
+        """
+        Get the parsed method stored with the given key
+
+        @param key: the key of the SQL code
+        @type key: string
+
+        @return: the kind of the method, its SQL query (or queries) and if it
+            only reads
+        @rtype: tuple or None
+        """
+        return self._parsed.get(key)
+
+    def set(self, key, parsed):
+        """
+        Store a parsed method with the given key
+
+        @param key: the key of the SQL code
+        @type key: string
+        @param parsed: the kind of the method, its SQL query (or queries) and
+            if it only reads
+        @type parsed: tuple
+        """
+        self._parsed[key] = parsed
+        self._dirty = True
+
+    def sync(self):
+        """
+        Write the cache to disk if it was modified
+        """
+        if not self._dirty:
+            return
+
+        # Write it on a temporary file and rename it so it's done atomically
+        path_tmp = self.path + '.tmp'
+
+        with open(path_tmp, 'wb') as file_cache:
+            dump(((self._version, sqlparse_version), self._parsed),
+                 file_cache, HIGHEST_PROTOCOL)
+
+        try:
+            rename(path_tmp, self.path)
+
+        # Windows doesn't allow to overwrite a file when renaming
+        except OSError:
+            remove(self.path)
+            rename(path_tmp, self.path)
+
+        self._dirty = False
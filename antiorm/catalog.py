@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Shared catalog of parsed SQL methods
+"""
+
+from antiorm.base  import parse_dir_specs, QueryMethod
+from antiorm.cache import SpecCache
+
+
+class QueryCatalog(object):
+    """
+    Immutable catalog of parsed SQL methods shared by several engines
+
+    The SQL files are parsed only once when the catalog is created, and later
+    the catalog can be bound to any number of engines (for example, one for
+    each connection of a pool). Instead of being attached to each instance, the
+    methods are descriptors of a class derived from the engine one that is
+    shared by all the engines of the same type and paramstyle, so binding an
+    engine only changes its class. This also allow to create the catalog
+    before forking so the methods are shared by the child processes.
+    """
+
+    def __init__(self, dir_path, cache_path=None, workers=None):
+        """
+        Constructor
+
+        @param dir_path: path of the dir with files from where to load SQL code
+        @type dir_path: string
+        @param cache_path: path of the file where to cache the parsed methods
+        @type cache_path: string
+        @param workers: number of processes used to parse the dir_path files
+        @type workers: integer
+        """
+        cache = None
+        if cache_path:
+            cache = SpecCache(cache_path)
+
+        self._specs = dict((spec.name, spec)
+                           for spec in parse_dir_specs(dir_path, cache=cache,
+                                                       workers=workers))
+
+        if cache is not None:
+            cache.sync()
+
+        self._classes = {}
+
+    def __contains__(self, method_name):
+        return method_name in self._specs
+
+    def __iter__(self):
+        return self._specs.itervalues()
+
+    def __len__(self):
+        return len(self._specs)
+
+    def bind(self, engine):
+        """
+        Add the catalog methods to an engine
+
+        @param engine: the engine where to add the methods
+        @type engine: antiorm.base.Base
+        """
+        engine.__class__ = self.engine_class(engine)
+
+    def engine_class(self, engine):
+        """
+        Get the class with the catalog methods for the type of an engine
+
+        @param engine: the engine used as model to build the methods
+        @type engine: antiorm.base.Base
+
+        @return: the engine class with the catalog methods
+        @rtype: class
+        """
+        cls = engine.__class__
+        paramstyle = engine._paramstyle
+        key = cls, paramstyle, engine._positional
+
+        try:
+            return self._classes[key]
+
+        except KeyError:
+            attrs = {'catalog': self,
+                     '_SQLS': dict(getattr(cls, '_SQLS', {}))}
+
+            for spec in self._specs.itervalues():
+                spec = spec.adapt(paramstyle)
+                attrs[spec.name] = QueryMethod(engine.build_method(
+                    spec, register=False))
+                attrs['_SQLS'][spec.name] = spec.sql
+
+            result = self._classes[key] = type(cls.__name__, (cls,), attrs)
+            return result
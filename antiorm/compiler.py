@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Ahead-of-time compiler of SQL dirs to Python modules
+
+It generates the source code of a class derived from an AntiORM backend with
+a concrete method for each one of the SQL files, so they don't need to be
+parsed when the application starts and their calls don't have the overhead of
+the proxy functions.
+"""
+
+from io       import open
+from optparse import OptionParser
+from os       import listdir
+from os.path  import join, splitext
+
+from antiorm.base      import parse_sql
+from antiorm.templates import dict_source, IDENTIFIER, indent, specialize
+from antiorm.templates import ITERATORS, LIST_ARGUMENTS, MANAGERS
+from antiorm.templates import TEMPLATES
+from antiorm.utils     import named2pyformat, parameters
+
+
+# Modules where the backends are defined and their default paramstyle
+BACKENDS = {'APSW':    ('antiorm.backends.apsw',    'named'),
+            'Generic': ('antiorm.backends.generic', 'named'),
+            'MySQL':   ('antiorm.backends.mysql',   'pyformat'),
+            'Sqlite':  ('antiorm.backends.sqlite',  'named')}
+
+PARAMSTYLES = {'named':    None,
+               'pyformat': named2pyformat}
+
+
+# Entry points of the methods for a dict and for a list of dicts
+ENTRY_POINTS = '''
+
+    def %(name)s__dict(self, kwargs):
+        """
+        Exec the `%(name)s` query with a dict of parameters
+        """
+%(one)s
+
+    def %(name)s__list(self, list_kwargs%(list_arguments)s):
+        """
+        Exec the `%(name)s` query for each dict of parameters
+        """
+%(many)s'''
+
+# Entry point of the methods returning the rows lazily
+ITER_ENTRY_POINT = '''
+
+    def %(name)s__iter(self, kwargs):
+        """
+        Exec the `%(name)s` query with a dict of parameters lazily
+        """
+%(iter)s'''
+
+MODULE = '''# -*- coding: utf-8 -*-
+"""
+AntiORM %(backend)s engine compiled from the SQL files at %(dir_path)r
+
+Generated by `python -m antiorm compile`, don't edit it by hand
+"""
+
+%(imports)s
+
+
+%(constants)s
+
+_METHODS = %(method_names)r
+
+_SQLS = {%(sqls)s}
+
+
+class %(class_name)s(%(backend)s):
+    """
+    AntiORM %(backend)s engine with the methods compiled from %(dir_path)r
+    """
+    _SQLS = _SQLS
+
+%(methods)s
+
+
+# Bind the methods to the engines with descriptors giving access to their
+# entry points
+for _method_name in _METHODS:
+    _method = %(class_name)s.__dict__[_method_name]
+    _method.one = %(class_name)s.__dict__[_method_name + '__dict']
+    _method.many = %(class_name)s.__dict__[_method_name + '__list']
+    _method.iter = %(class_name)s.__dict__.get(_method_name + '__iter')
+
+    setattr(%(class_name)s, _method_name, QueryMethod(_method))
+'''
+
+
+def compile_dir(dir_path, backend='Sqlite', class_name='Queries',
+                paramstyle=None):
+    """
+    Generate the source code of an engine with the methods of a SQL dir
+
+    :param dir_path: path of the dir with the SQL files
+    :type dir_path: string
+    :param backend: name of the backend to derive the engine from
+    :type backend: string
+    :param class_name: name of the generated class
+    :type class_name: string
+    :param paramstyle: paramstyle of the queries ('named' or 'pyformat'), by
+        default it's the one of the backend
+    :type paramstyle: string
+
+    :return: the source code of the Python module
+    :rtype: string
+    """
+    module, default_paramstyle = BACKENDS[backend]
+    paramstyle = PARAMSTYLES[paramstyle or default_paramstyle]
+
+    imports = ['from antiorm.base import QueryMethod, fallback as _fallback',
+               'from antiorm.base import MISSING as _MISSING, ROWS as _ROWS',
+               'from %s import %s' % (module, backend)]
+    constants = []
+    methods = []
+    method_names = []
+
+    for filename in sorted(listdir(dir_path)):
+        method_name = splitext(filename)[0]
+        if not IDENTIFIER.match(method_name):
+            raise ValueError("%r is not a valid method name" % method_name)
+
+        with open(join(dir_path, filename), 'rt') as file_sql:
+            kind, sql, reads = parse_sql(file_sql.read(), [dir_path],
+                                         paramstyle)
+
+        one, many = TEMPLATES[kind]
+
+        constant = '_' + method_name.upper()
+        constants.append('%s = %r' % (constant, sql))
+
+        manager = MANAGERS[reads]
+        one = indent(one % {'args': 'kwargs', 'sql': constant,
+                            'manager': manager}, '')
+        many = many % {'sql': constant, 'manager': manager}
+
+        names = parameters(sql)
+        body = 'kwargs = %s\n\n' % dict_source(names) + one
+
+        method_names.append(method_name)
+        methods.append(indent(specialize(method_name, names, body), ' ' * 4)
+                       + ENTRY_POINTS % {
+                           'name': method_name,
+                           'list_arguments': LIST_ARGUMENTS.get(kind, ''),
+                           'one': indent(one, ' ' * 8),
+                           'many': indent(many, ' ' * 8)})
+
+        iter_ = ITERATORS.get(kind)
+        if iter_:
+            methods[-1] += ITER_ENTRY_POINT % {
+                'name': method_name,
+                'iter': indent(iter_ % {'sql': constant, 'reads': reads},
+                               ' ' * 8)}
+
+    return MODULE % {'backend': backend, 'class_name': class_name,
+                     'constants': '\n'.join(constants),
+                     'dir_path': dir_path, 'imports': '\n'.join(imports),
+                     'method_names': tuple(method_names),
+                     'sqls': ', '.join('%r: _%s' % (name, name.upper())
+                                       for name in method_names),
+                     'methods': '\n'.join(methods)}
+
+
+def main(argv=None):
+    """
+    Command line entry point of the compiler
+
+    :param argv: the command line arguments (by default, the `sys.argv` ones)
+    :type argv: list of strings
+    """
+    parser = OptionParser(usage="python -m antiorm compile [options] dir_path")
+    parser.add_option('-o', '--output', help="file where to write the module")
+    parser.add_option('-b', '--backend', default='Sqlite',
+                      choices=sorted(BACKENDS),
+                      help="backend to derive the engine from [%default]")
+    parser.add_option('-c', '--class-name', default='Queries',
+                      help="name of the generated class [%default]")
+    parser.add_option('-p', '--paramstyle', choices=sorted(PARAMSTYLES),
+                      help="paramstyle of the queries [backend default]")
+
+    options, args = parser.parse_args(argv)
+    if len(args) != 2 or args[0] != 'compile':
+        parser.error("expected 'compile' command and the SQL dir path")
+
+    source = compile_dir(args[1], options.backend, options.class_name,
+                         options.paramstyle)
+
+    if options.output:
+        with open(options.output, 'wb') as file_py:
+            file_py.write(source.encode('utf-8'))
+    else:
+        print source
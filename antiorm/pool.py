@@ -0,0 +1,576 @@
+# -*- coding: utf-8 -*-
+"""
+Connections shared by the threads using an engine
+
+Each call of a generated method checks out a connection from the pool for its
+transaction and returns it when the transaction is finished, so the calls done
+from several threads use different connections instead of waiting for the lock
+of a shared one. SQLite engines can use instead a connection for each thread.
+"""
+
+from threading import Condition, current_thread, local, Lock
+from time      import time
+
+from antiorm.utils import check_streaming
+
+
+class PoolTimeout(RuntimeError):
+    """
+    No connection of the pool was released before the checkout timeout
+    """
+
+
+def check_connection(conn):
+    """
+    Check if a connection is still usable executing a trivial query
+
+    @param conn: the connection to check
+    @type conn: DB-API 2.0 database connection
+
+    @return: if the connection is usable
+    @rtype: boolean
+    """
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        cursor.close()
+    except Exception:
+        return False
+
+    return True
+
+
+def _close(connections):
+    """
+    Close a list of connections, ignoring the errors
+
+    The ones that can't be closed from this thread (like the sqlite3 ones
+    opened with `check_same_thread`) are closed when they are not referenced
+    anymore.
+
+    @param connections: the connections to close
+    @type connections: list of DB-API 2.0 database connections
+    """
+    for conn in connections:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool(object):
+    """
+    Bounded pool of connections created with a factory
+
+    The pool has at least `min_size` connections open, and opens new ones on
+    demand up to `max_size`. When all of them are in use the checkouts wait
+    until one is returned or `timeout` seconds have passed. The connections
+    idle for more than `idle_timeout` seconds are closed (keeping `min_size`
+    of them), and the ones that don't pass the `health_check` on checkout are
+    replaced by new ones. Connections returned less than `check_interval`
+    seconds ago are not checked, to don't add a round trip to each checkout
+    under load.
+    """
+
+    def __init__(self, factory, min_size=1, max_size=10, idle_timeout=None,
+                 timeout=None, health_check=check_connection,
+                 check_interval=1.0):
+        """
+        Constructor
+
+        @param factory: function that opens a new connection
+        @type factory: callable
+        @param min_size: number of connections kept open
+        @type min_size: integer
+        @param max_size: maximum number of open connections
+        @type max_size: integer
+        @param idle_timeout: seconds after which the idle connections (over
+            `min_size`) are closed, or None to keep them open
+        @type idle_timeout: number
+        @param timeout: seconds to wait for a connection when all of them are
+            in use, or None to wait forever
+        @type timeout: number
+        @param health_check: function checking if a connection can be used
+            (like `check_connection`), or None to don't check them
+        @type health_check: callable
+        @param check_interval: seconds a returned connection is used without
+            checking it
+        @type check_interval: number
+        """
+        if max_size < max(min_size, 1):
+            raise ValueError("max_size must be at least min_size and 1")
+
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.health_check = health_check
+        self.check_interval = check_interval
+
+        # Class of the connections, used by the engines to know their type
+        self.connection_class = None
+
+        self._condition = Condition(Lock())
+
+        # Idle connections and when they were returned, oldest first
+        self._idle = []
+        self._size = 0
+
+        # Open a connection at least to know its type
+        for index in xrange(max(min_size, 1)):
+            self._idle.append((time(), self._connect()))
+            self._size += 1
+
+    def __len__(self):
+        """
+        Number of open connections
+        """
+        return self._size
+
+    @property
+    def idle(self):
+        """
+        Number of connections waiting to be checked out
+        """
+        return len(self._idle)
+
+    def _connect(self):
+        """
+        Open a new connection
+        """
+        conn = self.factory()
+        self.connection_class = conn.__class__
+        return conn
+
+    def _expire(self):
+        """
+        Remove the connections idle for more than `idle_timeout` seconds
+
+        Must be called with the lock of the condition acquired.
+
+        @return: the expired connections, to be closed
+        @rtype: list
+        """
+        expired = []
+
+        if self.idle_timeout is not None:
+            limit = time() - self.idle_timeout
+            idle = self._idle
+
+            while idle and idle[0][0] < limit and self._size > self.min_size:
+                expired.append(idle.pop(0)[1])
+                self._size -= 1
+
+        return expired
+
+    def _close(self, connections):
+        """
+        Close connections ignoring their errors
+        """
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def checkout(self):
+        """
+        Get a connection, waiting for one if all of them are in use
+
+        @return: the connection
+        @rtype: DB-API 2.0 database connection
+
+        @raise PoolTimeout: no connection was available before the timeout
+        """
+        conn = None
+        last_used = None
+        deadline = None
+        if self.timeout is not None:
+            deadline = time() + self.timeout
+
+        expired = []
+
+        with self._condition:
+            while True:
+                expired.extend(self._expire())
+
+                # Reuse the most recently returned connection
+                if self._idle:
+                    last_used, conn = self._idle.pop()
+                    break
+
+                # Reserve a new connection
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+
+                if deadline is None:
+                    self._condition.wait()
+                else:
+                    remaining = deadline - time()
+                    if remaining <= 0:
+                        self._close(expired)
+                        raise PoolTimeout("no connection available after %s "
+                                          "seconds" % self.timeout)
+
+                    self._condition.wait(remaining)
+
+        self._close(expired)
+
+        # Replace the broken connections
+        if conn is not None and self.health_check \
+        and time() - last_used >= self.check_interval \
+        and not self.health_check(conn):
+            self._close((conn,))
+            conn = None
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                raise
+
+        return conn
+
+    def checkin(self, conn, broken=False):
+        """
+        Return a connection to the pool
+
+        @param conn: the connection
+        @type conn: DB-API 2.0 database connection
+        @param broken: set if the connection can't be used anymore
+        @type broken: boolean
+        """
+        with self._condition:
+            if broken:
+                self._size -= 1
+            else:
+                self._idle.append((time(), conn))
+
+            expired = self._expire()
+            self._condition.notify()
+
+        if broken:
+            expired.append(conn)
+        self._close(expired)
+
+    def close(self):
+        """
+        Close the idle connections
+        """
+        with self._condition:
+            idle = [conn for last_used, conn in self._idle]
+            del self._idle[:]
+            self._size -= len(idle)
+
+        self._close(idle)
+
+
+class PoolManager(object):
+    """
+    Transaction context manager using a connection of a pool
+
+    The connection is checked out when entering the context and returned when
+    exiting it after the commit (or the rollback if there was an exception).
+    Nested contexts of the same thread use the same connection (except while
+    a server side cursor of it is being iterated), and the connection is
+    returned when exiting the outermost one.
+    """
+
+    def __init__(self, pool, wrapper=None):
+        """
+        Constructor
+
+        @param pool: pool where to get the connections
+        @type pool: ConnectionPool
+        @param wrapper: function to wrap the connections before using them
+        @type wrapper: callable
+        """
+        self.pool = pool
+        self.wrapper = wrapper
+
+        self._local = local()
+
+    def __enter__(self):
+        state = self._local
+
+        depth = getattr(state, 'depth', 0)
+        if depth:
+            check_streaming(state.connection)
+        else:
+            conn = self.pool.checkout()
+
+            state.connection = conn
+            if self.wrapper:
+                conn = self.wrapper(conn)
+            state.wrapped = conn
+
+        state.depth = depth + 1
+        return state.wrapped
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        state = self._local
+        state.depth -= 1
+
+        conn = state.connection
+        broken = False
+
+        try:
+            # There was an exception on the context manager, rollback
+            if exc_type:
+                conn.rollback()
+
+            # There were no problems on the context manager, commit
+            else:
+                conn.commit()
+
+        except:
+            broken = True
+            raise
+
+        finally:
+            if not state.depth:
+                del state.connection, state.wrapped
+                self.pool.checkin(conn, broken)
+
+
+class ThreadLocalConnection(object):
+    """
+    Connection proxy that opens a connection for each thread
+
+    Engines of the backends using the connection as transaction manager (like
+    `Sqlite` and `APSW`) can be shared by several threads giving them an
+    instance of this class instead of a connection, so each thread uses its
+    own connection to the same database file. The `pragmas` are executed on
+    each new connection, and the `row_factory` is set on all of them. The
+    connections of the finished threads are closed when a new one is opened.
+    """
+
+    def __init__(self, factory, pragmas=(), wrapper=None):
+        """
+        Constructor
+
+        @param factory: function that opens a new connection
+        @type factory: callable
+        @param pragmas: statements to execute on each new connection (like
+            "PRAGMA journal_mode=WAL")
+        @type pragmas: iterable of strings
+        @param wrapper: function to wrap the new connections before using them
+        @type wrapper: callable
+        """
+        self.factory = factory
+        self.pragmas = tuple(pragmas)
+        self.wrapper = wrapper
+
+        self._connection_class = None
+        self._connections = []
+        self._lock = Lock()
+        self._local = local()
+        self._row_factory = None
+
+    @property
+    def connection(self):
+        """
+        Connection of the current thread, opened on its first use
+        """
+        try:
+            return self._local.connection
+        except AttributeError:
+            pass
+
+        conn = self.factory()
+        self._connection_class = conn.__class__
+
+        for pragma in self.pragmas:
+            conn.cursor().execute(pragma)
+
+        if self.wrapper:
+            conn = self.wrapper(conn)
+
+        with self._lock:
+            if self._row_factory is not None:
+                conn.row_factory = self._row_factory
+
+            # Drop the connections of the finished threads
+            dead = [owned for thread, owned in self._connections
+                    if not thread.is_alive()]
+            if dead:
+                self._connections = [(thread, owned)
+                                     for thread, owned in self._connections
+                                     if thread.is_alive()]
+
+            self._connections.append((current_thread(), conn))
+
+        _close(dead)
+
+        self._local.connection = conn
+        return conn
+
+    @property
+    def connection_class(self):
+        """
+        Class of the connections, used by the engines to know their type
+        """
+        if self._connection_class is None:
+            self.connection
+
+        return self._connection_class
+
+    @property
+    def row_factory(self):
+        """
+        Getter of the row_factory property
+        """
+        return self._row_factory
+
+    @row_factory.setter
+    def row_factory(self, value):
+        """
+        Setter of the row_factory property, set on all the connections
+        """
+        with self._lock:
+            self._row_factory = value
+
+            for _, conn in self._connections:
+                conn.row_factory = value
+
+    def __getattr__(self, name):
+        """
+        Get the attributes and methods from the connection of the thread
+        """
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        return getattr(self.connection, name)
+
+    def __enter__(self):
+        return self.connection.__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self.connection.__exit__(exc_type, exc_value, traceback)
+
+    def close(self):
+        """
+        Close the connections of all the threads
+
+        The ones that can't be closed from this thread (like the sqlite3 ones
+        opened with `check_same_thread`) are closed when their threads don't
+        reference them anymore.
+        """
+        with self._lock:
+            connections = self._connections
+            self._connections = []
+
+        _close([conn for _, conn in connections])
+
+        self._local = local()
+
+
+class ReplicaManager(object):
+    """
+    Transaction context manager of the read only methods, using the replicas
+
+    Each transaction is done on one of the replicas, selected by turns
+    (`round_robin`) or the one with less transactions in progress
+    (`least_busy`). Inside `pin()` the transactions of the thread are done on
+    the primary instead, so they can read their own writes.
+    """
+
+    def __init__(self, primary, replicas, balance='round_robin'):
+        """
+        Constructor
+
+        @param primary: the engine of the primary database
+        @type primary: antiorm.base.Base
+        @param replicas: the engines of the replicas
+        @type replicas: list of antiorm.base.Base
+        @param balance: how to select the replica of each transaction
+            ('round_robin' or 'least_busy')
+        @type balance: string
+        """
+        if balance not in ('round_robin', 'least_busy'):
+            raise ValueError("Unknown balance %r" % balance)
+        if not replicas:
+            raise ValueError("At least one replica is needed")
+
+        self.primary = primary
+        self.replicas = replicas
+        self.balance = balance
+
+        # Transactions in progress on each replica
+        self.busy = [0] * len(replicas)
+
+        self._lock = Lock()
+        self._local = local()
+        self._turn = 0
+
+    def _select(self):
+        """
+        Select the replica of a new transaction and mark it as busy
+        """
+        with self._lock:
+            if self.balance == 'least_busy':
+                busy = self.busy
+                index = busy.index(min(busy))
+            else:
+                index = self._turn
+                self._turn = (index + 1) % len(self.replicas)
+
+            self.busy[index] += 1
+
+        return index
+
+    def pin(self):
+        """
+        Do the transactions of the thread on the primary until `unpin()`
+        """
+        state = self._local
+        state.pinned = getattr(state, 'pinned', 0) + 1
+
+    def unpin(self):
+        """
+        Undo the last `pin()` of the thread
+        """
+        self._local.pinned -= 1
+
+    def __enter__(self):
+        state = self._local
+
+        # Stack of the managers of the (nested) transactions of the thread
+        try:
+            managers = state.managers
+        except AttributeError:
+            managers = state.managers = []
+
+        if getattr(state, 'pinned', 0):
+            index = None
+            manager = self.primary.tx_manager
+        else:
+            index = self._select()
+            manager = self.replicas[index].tx_manager
+
+        try:
+            conn = manager.__enter__()
+        except:
+            if index is not None:
+                with self._lock:
+                    self.busy[index] -= 1
+            raise
+
+        managers.append((index, manager))
+        return conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        index, manager = self._local.managers.pop()
+
+        try:
+            return manager.__exit__(exc_type, exc_value, traceback)
+        finally:
+            if index is not None:
+                with self._lock:
+                    self.busy[index] -= 1
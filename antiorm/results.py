@@ -0,0 +1,470 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory cache of the results of the read only methods
+
+The results are cached by the values of the parameters of the calls, and they
+are invalidated when a method writing on any of the tables read by the cached
+method is called through the engine. The tables read and written by each method
+are get from its parsed SQL code.
+"""
+
+from collections import OrderedDict
+from copy        import copy
+from re          import compile as re_compile, IGNORECASE, VERBOSE
+from thread      import allocate_lock
+from threading   import local
+from time        import time
+
+from sqlparse        import tokens
+from sqlparse.lexer  import tokenize
+
+
+# Statements that write on the table given after INTO, after the keyword
+# itself or after FROM
+WRITES = frozenset(('INSERT', 'REPLACE', 'UPDATE', 'DELETE'))
+
+# Statements that only read from the tables
+READS = frozenset(('SELECT', 'WITH', 'VALUES', '('))
+
+# Reads locking the rows, that must be done on the primary database
+LOCKING_READ = re_compile(r"""\bFOR\s+(?:NO\s+KEY\s+)?UPDATE\b
+                           | \bFOR\s+(?:KEY\s+)?SHARE\b
+                           | \bLOCK\s+IN\s+SHARE\s+MODE\b""",
+                          IGNORECASE | VERBOSE)
+
+_MISSING = object()
+
+
+def _table(stmt, index):
+    """
+    Get the name of the table at a position of a statement
+
+    :param stmt: the (type, value) significant tokens of the statement
+    :type stmt: list of tuples
+    :param index: position of the name of the table
+    :type index: integer
+
+    :return: the name of the table (without schema) and the position after
+        it and its alias, or None as name if there's no table
+    :rtype: tuple
+    """
+    name = None
+    end = len(stmt)
+
+    while index < end:
+        ttype, value = stmt[index]
+
+        if ttype not in tokens.Name and ttype not in tokens.String.Symbol \
+        and (ttype not in tokens.Keyword or ttype in tokens.Keyword.DML):
+            break
+
+        name = value.strip('"`[]').lower()
+        index += 1
+
+        # Qualified name, the table is the last part
+        if index < end and stmt[index][1] == '.':
+            index += 1
+            continue
+
+        # Alias
+        if index < end and stmt[index][1].upper() == 'AS':
+            index += 2
+        elif index < end and stmt[index][0] in tokens.Name:
+            index += 1
+        break
+
+    return name, index
+
+
+def query_tables(sql):
+    """
+    Get the tables read and written by a SQL query
+
+    :param sql: the SQL code of the query, or a tuple of them
+    :type sql: string or tuple of strings
+
+    :return: the names of the tables read and of the tables written, being
+        the last one None if the query has statements (like DDL ones) whose
+        written tables can't be known
+    :rtype: tuple
+    """
+    if not isinstance(sql, tuple):
+        sql = (sql,)
+
+    reads = set()
+    writes = set()
+
+    for sql_stmt in sql:
+        stmt = [(ttype, value) for ttype, value in tokenize(sql_stmt)
+                if ttype not in tokens.Whitespace
+                and ttype not in tokens.Comment]
+        if not stmt:
+            continue
+
+        first = stmt[0][1].upper()
+        written = first in WRITES
+
+        index = 0
+        end = len(stmt)
+        while index < end:
+            ttype, value = stmt[index]
+            upper = value.upper()
+            index += 1
+
+            # Tables written by the statement
+            if upper == 'INTO' \
+            or (upper == 'UPDATE' and ttype in tokens.Keyword.DML):
+                name, index = _table(stmt, index)
+                if name:
+                    writes.add(name)
+                written = True
+
+            elif upper == 'FROM' and stmt[index - 2][1].upper() == 'DELETE':
+                name, index = _table(stmt, index)
+                if name:
+                    writes.add(name)
+
+            # Tables read by the statement
+            elif upper == 'FROM' or upper.endswith('JOIN'):
+                while True:
+                    name, index = _table(stmt, index)
+                    if name:
+                        reads.add(name)
+
+                    if index >= end or stmt[index][1] != ',' \
+                    or upper != 'FROM':
+                        break
+                    index += 1
+
+        # Statements that could write on unknown tables
+        if not written and first not in READS:
+            writes = None
+            break
+
+    return frozenset(reads), writes if writes is None else frozenset(writes)
+
+
+def read_only(sql):
+    """
+    Check if a query only reads from the database without locking the rows
+
+    :param sql: the SQL code of the query, or a tuple of them
+    :type sql: string or tuple of strings
+
+    :return: if the query can be executed on a read only replica
+    :rtype: boolean
+    """
+    if query_tables(sql)[1] != frozenset():
+        return False
+
+    if isinstance(sql, tuple):
+        sql = '\n'.join(sql)
+
+    return not LOCKING_READ.search(sql)
+
+
+class ResultCache(object):
+    """
+    LRU cache of the results of a method, with an optional time to live
+
+    The `hits`, `misses`, `evictions` (entries removed because the cache was
+    full or they were expired) and `invalidations` counters give the
+    statistics of the cache.
+    """
+
+    def __init__(self, size=128, ttl=None, tables=()):
+        """
+        Constructor
+
+        @param size: maximum number of cached results
+        @type size: integer
+        @param ttl: seconds the results are valid, or None to not expire them
+        @type ttl: number
+        @param tables: tables read by the method
+        @type tables: iterable of strings
+        """
+        self.size = size
+        self.ttl = ttl
+        self.tables = frozenset(tables)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        # Incremented on each invalidation, so the results queried before it
+        # are not stored
+        self.generation = 0
+
+        self._data = OrderedDict()
+        self._lock = allocate_lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """
+        Get a cached result and set it as the most recently used one
+
+        @param key: the values of the parameters of the call
+        @type key: tuple
+
+        @return: the cached result, or `default` if there's none
+        """
+        with self._lock:
+            try:
+                expires, result = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+
+            if expires is not None and expires < time():
+                self.evictions += 1
+                self.misses += 1
+                return default
+
+            self._data[key] = expires, result
+            self.hits += 1
+            return result
+
+    def set(self, key, result, generation=None):
+        """
+        Store a result, discarding the least recently used one if it's full
+
+        @param key: the values of the parameters of the call
+        @type key: tuple
+        @param result: the result of the call
+        @param generation: `generation` of the cache when the call was done,
+            if it has changed the result is not stored
+        @type generation: integer
+        """
+        expires = None
+        if self.ttl is not None:
+            expires = time() + self.ttl
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+
+            self._data.pop(key, None)
+
+            while len(self._data) >= self.size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+            self._data[key] = expires, result
+
+    def clear(self):
+        """
+        Invalidate all the cached results
+        """
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        """
+        Get the counters of the cache
+
+        @return: the hits, misses, evictions, invalidations and current size
+        @rtype: dict
+        """
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations, 'size': len(self)}
+
+
+def _copy(result):
+    """
+    Get a copy of a cached result, so the callers can modify it freely
+
+    @param result: the cached result
+    @type result: list, dict or any other type of value
+
+    @return: a copy of the lists and the dicts on the result
+    """
+    if isinstance(result, list):
+        return [_copy(row) for row in result]
+    if isinstance(result, dict):
+        return copy(result)
+    return result
+
+
+class CachedQuery(object):
+    """
+    Method of a query whose results are cached
+
+    Calls giving the parameters as arguments or as a dict (also with
+    `one(mapping)`) are cached by their values, the other entry points and
+    the calls with a list of dicts are not cached. Calls inside an explicit
+    transaction of the engine don't use the cache, since they can see writes
+    not yet committed. Each call gets its own copy of the cached lists and
+    dicts.
+    """
+
+    def __init__(self, query, cache, names, engine=None):
+        """
+        Constructor
+
+        @param query: the bound method of the query
+        @type query: antiorm.base.BoundQuery
+        @param cache: cache of the results
+        @type cache: ResultCache
+        @param names: names of the parameters of the query
+        @type names: tuple of strings
+        @param engine: the engine of the method
+        @type engine: antiorm.base.Base
+        """
+        self.__doc__ = query.__doc__
+        self.__name__ = query.__name__
+
+        self.query = query
+        self.cache = cache
+        self.names = names
+        self.engine = engine
+
+        for entry in ('many', 'stream', 'load', 'iter'):
+            if hasattr(query, entry):
+                setattr(self, entry, getattr(query, entry))
+
+    def _key(self, args, kwargs):
+        """
+        Get the values of the parameters of a call, or None if can't be cached
+        """
+        if self.engine is not None and self.engine._in_transaction():
+            return
+
+        if len(args) == 1 and not kwargs and isinstance(args[0], dict):
+            params = args[0]
+        else:
+            params = dict(zip(self.names, args))
+            if kwargs:
+                params.update(kwargs)
+
+        if len(params) != len(self.names) or len(args) > len(self.names):
+            return
+
+        try:
+            key = tuple([params[name] for name in self.names])
+            hash(key)
+        except (KeyError, TypeError):
+            return
+
+        # List calls
+        for value in key:
+            if hasattr(value, '__iter__'):
+                return
+
+        return key
+
+    def _call(self, key, func, *args, **kwargs):
+        """
+        Get the result of a call from the cache, or do it and store it
+        """
+        cache = self.cache
+
+        result = cache.get(key, _MISSING)
+        if result is _MISSING:
+            generation = cache.generation
+            result = func(*args, **kwargs)
+            cache.set(key, result, generation)
+
+        return _copy(result)
+
+    def __call__(self, *args, **kwargs):
+        key = self._key(args, kwargs)
+        if key is None:
+            return self.query(*args, **kwargs)
+
+        return self._call(key, self.query, *args, **kwargs)
+
+    def one(self, kwargs):
+        """
+        Exec the query with a dict of parameters
+        """
+        key = self._key((kwargs,), {})
+        if key is None:
+            return self.query.one(kwargs)
+
+        return self._call(key, self.query.one, kwargs)
+
+
+class InvalidatingQuery(object):
+    """
+    Method of a query writing on tables read by cached methods
+
+    After each call to the method (or to any of its entry points) the cached
+    results of the methods reading from the written tables are invalidated,
+    only once for the calls dispatched to other entry points.
+    """
+
+    def __init__(self, query, engine, tables):
+        """
+        Constructor
+
+        @param query: the bound method of the query
+        @type query: antiorm.base.BoundQuery
+        @param engine: the engine with the cached methods
+        @type engine: antiorm.base.Base
+        @param tables: tables written by the method, or None if unknown
+        @type tables: frozenset of strings or None
+        """
+        self.__doc__ = query.__doc__
+        self.__name__ = query.__name__
+
+        self.query = query
+        self.engine = engine
+        self.tables = tables
+
+        # Depth of the nested calls of each thread
+        self._local = local()
+
+        for entry in ('one', 'many', 'load'):
+            if hasattr(query, entry):
+                setattr(self, entry, self._wrap(getattr(query, entry)))
+
+        if hasattr(query, 'stream'):
+            self.stream = self._wrap_generator(query.stream)
+
+    def _wrap(self, func):
+        """
+        Get a function that invalidate the cached results after calling `func`
+        """
+        def wrapper(*args, **kwargs):
+            return self._call(func, *args, **kwargs)
+
+        return wrapper
+
+    def _wrap_generator(self, func):
+        """
+        Get a generator that invalidate the cached results after exhausting
+        the one returned by `func`
+        """
+        def wrapper(*args, **kwargs):
+            try:
+                for row in func(*args, **kwargs):
+                    yield row
+            finally:
+                self.engine._invalidate(self.tables)
+
+        return wrapper
+
+    def _call(self, func, *args, **kwargs):
+        """
+        Call `func` and invalidate the cached results if it's the outermost
+        call of the thread
+        """
+        local = self._local
+        depth = getattr(local, 'depth', 0)
+
+        local.depth = depth + 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            local.depth = depth
+            if not depth:
+                self.engine._invalidate(self.tables)
+
+    def __call__(self, *args, **kwargs):
+        return self._call(self.query, *args, **kwargs)
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+Lightweight classifier of the most common SQL queries
+
+Parsing the SQL code with sqlparse is the slowest part of building the methods,
+so the most common shapes of queries are classified here with a simple scanner
+doing the same checks that the sqlparse based one, and only the queries that
+can't be classified confidently are left for it.
+"""
+
+from re import compile as re_compile, UNICODE, VERBOSE
+
+from sqlparse        import tokens
+from sqlparse.lexer  import is_keyword
+
+
+# Lexical tokens of the SQL code. Any character not matched here (comments,
+# quoted identifiers, escaped strings, other placeholders...) make the scanner
+# to give up and let sqlparse to classify the query
+TOKENS = re_compile(r"""
+    (?P<ws>\s+)
+   |(?P<string>'(?:[^'\\]|'')*')
+   |(?P<word>[^\W\d]\w*)
+   |(?P<placeholder>:\w+|\?)
+   |(?P<number>-?(?:[0-9]*\.[0-9]+|[0-9]+)(?![\w.]))
+   |(?P<punct>[;(),.])
+   |(?P<cmp>[<>=~!]+)
+   |(?P<wildcard>\*)
+   |(?P<op>[+/^&|-]+)
+""", UNICODE | VERBOSE)
+
+# Comments are stripped by sqlparse, leave them to it
+COMMENTS = re_compile(r'--|/\*|# ')
+
+# Tokens that don't need whitespaces around them on the compacted SQL code
+COMPACT = frozenset(('punct', 'cmp'))
+
+# Words checked by sqlparse in a case sensitive way
+CASED = frozenset(('AS', 'FROM', 'INSERT', 'LIMIT', 'SELECT'))
+
+# Words that include other files or define blocks where the statements can't
+# be split at the semicolons
+UNSAFE = frozenset(('BEGIN', 'DECLARE', 'END', 'INCLUDE'))
+
+
+def _tokenize(sql):
+    """
+    Split the SQL code in compacted statements
+
+    :param sql: the SQL code
+    :type sql: unicode
+
+    :return: the statements as lists of (group, value) tokens, or None if the
+        SQL code can't be scanned confidently
+    :rtype: list of lists or None
+    """
+    if COMMENTS.search(sql):
+        return
+
+    stmts = []
+    stmt = []
+    has_space = False
+
+    pos = 0
+    end = len(sql)
+    match = TOKENS.match
+
+    while pos < end:
+        token = match(sql, pos)
+        if not token:
+            return
+
+        group = token.lastgroup
+        value = token.group()
+        pos = token.end()
+
+        if group == 'ws':
+            has_space = bool(stmt)
+            continue
+
+        if group == 'word':
+            upper = value.upper()
+            if upper in UNSAFE or (upper in CASED and value != upper):
+                return
+
+        # Add the whitespace if it can't be ignored
+        if has_space:
+            if group not in COMPACT and stmt[-1][0] not in COMPACT:
+                stmt.append(('ws', u' '))
+            has_space = False
+
+        stmt.append((group, value))
+
+        # End of the statement
+        if value == ';':
+            stmts.append(stmt)
+            stmt = []
+
+    if stmt:
+        stmts.append(stmt)
+
+    # Empty statements are not supported
+    for stmt in stmts:
+        if stmt[0][1] == ';':
+            return
+
+    return stmts
+
+
+def _ttype(stmt, index):
+    """
+    Get the sqlparse token type of a token of the statement
+    """
+    group, value = stmt[index]
+
+    if group == 'word':
+        # Words around a dot or followed by a parenthesis are always names
+        if index + 1 < len(stmt) and stmt[index + 1][1] in '.(':
+            return tokens.Name
+        if index and stmt[index - 1][1] == '.':
+            return tokens.Name
+
+        return is_keyword(value)[0]
+
+    return None
+
+
+def _is_insert(stmt):
+    """
+    Check if the statement is an INSERT one
+    """
+    return stmt[0][1] == 'INSERT' and _ttype(stmt, 0) in tokens.Keyword
+
+
+def _limit(stmt):
+    """
+    Get the LIMIT of the statement the same way sqlparse does it
+
+    This is, the value two tokens after the last LIMIT keyword of the
+    statement, except if it's the seventh token counting from the end.
+    """
+    last = len(stmt) - 1
+
+    for index in xrange(last, -1, -1):
+        if last - index != 6 and stmt[index][1] == 'LIMIT' \
+        and _ttype(stmt, index) in tokens.Keyword:
+            # sqlparse would take it from the beginning of the statement
+            if index + 2 > last:
+                return
+
+            value = stmt[index + 2][1]
+            try:
+                return int(value)
+            except ValueError:
+                return value
+
+    return -1
+
+
+def _columns(stmt):
+    """
+    Get the columns of the SELECT statement the same way sqlparse does it
+    """
+    result = []
+
+    mode = 0
+    old_value = u""
+    parenthesis = 0
+
+    for index, (group, value) in enumerate(stmt):
+        # We have not detected a SELECT statement
+        if mode == 0:
+            if value == 'SELECT' and _ttype(stmt, index) in tokens.Keyword:
+                mode = 1
+
+        # We have detected a SELECT statement
+        elif mode == 1:
+            if value == 'FROM':
+                if old_value:
+                    result.append(old_value)
+                break
+
+            elif value == 'AS':
+                old_value = u""
+                mode = 2
+
+            elif value == ',' and not parenthesis:
+                if old_value:
+                    result.append(old_value)
+                old_value = u""
+
+            elif group != 'ws':
+                if value == '(':
+                    parenthesis += 1
+                elif value == ')':
+                    parenthesis -= 1
+
+                old_value += value
+
+        # We are processing an AS keyword
+        elif mode == 2:
+            ttype = _ttype(stmt, index)
+            if ttype == tokens.Name or ttype == tokens.Keyword:
+                result.append(value)
+                mode = 1
+
+    return result
+
+
+def scan(sql, paramstyle=None):
+    """
+    Classify a SQL query and get the SQL code adapted to the paramstyle
+
+    :param sql: the SQL code of the query
+    :type sql: string
+    :param paramstyle: paramstyle adapter for the connection
+    :type paramstyle: function or None
+
+    :return: the kind of the method and its SQL query (or queries), or None if
+        the query can't be classified confidently
+    :rtype: tuple or None
+    """
+    if not isinstance(sql, unicode):
+        sql = sql.decode('utf-8')
+
+    stmts = _tokenize(sql.strip())
+    if not stmts:
+        return
+
+    # One statement query
+    if len(stmts) == 1:
+        stmt = stmts[0]
+
+        sql = u''.join(value for _, value in stmt)
+
+        if paramstyle:
+            sql = paramstyle(sql)
+
+        # Insert statement (return last row id)
+        if _is_insert(stmt):
+            return 'one_statement_INSERT', sql
+
+        limit = _limit(stmt)
+        if limit is None:
+            return
+
+        # One-value function (a row of a cell)
+        if limit == 1:
+            columns = _columns(stmt)
+
+            # Value function (one row, one field)
+            if len(columns) == 1 and columns[0] != '*':
+                return 'one_statement_value', sql
+
+            # Register function (one row, several fields)
+            return 'one_statement_register', sql
+
+        # Table function (several rows)
+        return 'one_statement_table', sql
+
+    # Multiple statement query
+    sqls = [u''.join(value for _, value in statement)
+            for statement in stmts]
+
+    if paramstyle:
+        sqls = map(paramstyle, sqls)
+
+    # Insert statement (return last row id)
+    if _is_insert(stmts[0]):
+        return 'multiple_statement_INSERT', tuple(sqls)
+
+    # Standard multiple statement query
+    return 'multiple_statement_standard', tuple(sqls)
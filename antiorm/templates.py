@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+Source code templates of the optimized functions
+
+They are shared by the engines, that use them to build the methods specialized
+for the parameters of each query, and by the ahead-of-time compiler.
+"""
+
+from keyword  import iskeyword
+from re       import compile as re_compile
+from textwrap import dedent
+
+
+# Body of the methods for each kind of query. First one exec the query with
+# the `args` arguments expression (the `kwargs` dict on the compiled modules),
+# second one with each one of the dicts on `list_kwargs`. The queries that can
+# be read only use the `manager` transaction manager
+TEMPLATES = {
+    'one_statement_INSERT': ('''
+        with self.tx_manager as conn:
+            cursor = conn.cursor()
+
+            cursor.execute(%(sql)s, %(args)s)
+            return cursor.lastrowid
+        ''', '''
+        return self._insert_many(%(sql)s, None, list_kwargs, rowids,
+                                 multirow)
+        '''),
+
+    'one_statement_value': ('''
+        with %(manager)s as conn:
+            cursor = conn.cursor()
+            cursor.execute(%(sql)s, %(args)s)
+
+            result = cursor.fetchone()
+            if result:
+                return result[0]
+            return
+        ''', '''
+        result = []
+
+        with %(manager)s as conn:
+            cursor = conn.cursor()
+
+            for kwargs in list_kwargs:
+                cursor.execute(%(sql)s, kwargs)
+
+                value = cursor.fetchone()
+                if value:
+                    value = value[0]
+                result.append(value)
+
+        return result
+        '''),
+
+    'one_statement_register': ('''
+        with %(manager)s as conn:
+            cursor = conn.cursor()
+            cursor.execute(%(sql)s, %(args)s)
+
+            return cursor.fetchone()
+        ''', '''
+        result = []
+
+        with %(manager)s as conn:
+            cursor = conn.cursor()
+
+            for kwargs in list_kwargs:
+                cursor.execute(%(sql)s, kwargs)
+
+                result.append(cursor.fetchone())
+
+        return result
+        '''),
+
+    'one_statement_table': ('''
+        with %(manager)s as conn:
+            cursor = conn.cursor()
+            cursor.execute(%(sql)s, %(args)s)
+
+            if self.column_factory:
+                return self._fetch_columns(cursor)
+            return cursor.fetchall()
+        ''', '''
+        result = []
+
+        with %(manager)s as conn:
+            cursor = conn.cursor()
+
+            for kwargs in list_kwargs:
+                cursor.execute(%(sql)s, kwargs)
+
+                if self.column_factory:
+                    result.append(self._fetch_columns(cursor))
+                else:
+                    result.append(cursor.fetchall())
+
+        return result
+        '''),
+
+    'multiple_statement_INSERT': ('''
+        with self.tx_manager as conn:
+            cursor = conn.cursor()
+
+            cursor.execute(%(sql)s[0], %(args)s)
+            rowid = cursor.lastrowid
+
+            for stmt in %(sql)s[1:]:
+                cursor.execute(stmt, %(args)s)
+
+            return rowid
+        ''', '''
+        return self._insert_statements(%(sql)s, None, list_kwargs)
+        '''),
+
+    'multiple_statement_standard': ('''
+        result = []
+
+        with self.tx_manager as conn:
+            cursor = conn.cursor()
+
+            for stmt in %(sql)s:
+                result.append(cursor.execute(stmt, %(args)s))
+
+        return result
+        ''', '''
+        result = []
+
+        with self.tx_manager as conn:
+            cursor = conn.cursor()
+
+            for kwargs in list_kwargs:
+                result2 = []
+
+                for stmt in %(sql)s:
+                    result2.append(cursor.execute(stmt, kwargs))
+
+                result.append(result2)
+
+        return result
+        ''')
+}
+
+
+def indent(text, prefix):
+    """
+    Dedent `text` and add `prefix` to the beginning of its non-empty lines
+    """
+    return ''.join(prefix + line if line.strip() else line
+                   for line in dedent(text).strip('\n').splitlines(True))
+
+
+# Extra arguments of the methods for a list of dicts
+LIST_ARGUMENTS = {'one_statement_INSERT': ', rowids=True, multirow=False'}
+
+# Bodies of the methods returning the rows lazily for a dict
+ITERATORS = {'one_statement_table': '''
+        return self._iter_rows(%(sql)s, kwargs, %(reads)r)
+        '''}
+
+# Transaction managers of the methods, read only ones use the replicas if any
+MANAGERS = {False: 'self.tx_manager',
+            True:  '(self.read_manager or self.tx_manager)'}
+
+# Source code of the methods specialized for the parameters of a query. Calls
+# with all the parameters as arguments exec `body` directly, others (a dict,
+# a list of dicts, missing parameters...) are managed by `_fallback`. The name
+# of the method is given as source code, so the same compiled code can be
+# shared by several methods getting it from their globals
+SPECIALIZED = '''
+def %(func_name)s(self%(signature)s, *_args):
+    """
+    %(doc)s
+    """
+    if _args%(guard)s or isinstance(%(first)s, _ROWS):
+        return _fallback(self, %(name)s, %(names)r, %(values)s, _args)
+
+%(body)s
+'''
+
+# Methods without parameters
+SPECIALIZED_EMPTY = '''
+def %(func_name)s(self, *_args):
+    """
+    %(doc)s
+    """
+    if _args:
+        return _fallback(self, %(name)s, (), (), _args)
+
+%(body)s
+'''
+
+# Methods with parameters that can't be used as arguments
+GENERIC = '''
+def %(func_name)s(self, *_args, **_kwargs):
+    """
+    %(doc)s
+    """
+    return _fallback(self, %(name)s, %(names)r, (), _args, _kwargs)
+'''
+
+IDENTIFIER = re_compile(r'^[A-Za-z_]\w*$')
+
+# Names used by the specialized methods that can't be used as parameters
+RESERVED = frozenset(('self', 'isinstance', 'kwargs', '_args', '_kwargs',
+                      '_params', '_MISSING', '_NAME', '_ROWS', '_SQL',
+                      '_fallback', '_one'))
+
+
+def dict_source(names):
+    """
+    Get the source code of a dict with the parameters of a query
+
+    :param names: names of the parameters of the query
+    :type names: tuple of strings
+
+    :return: the source code of the dict
+    :rtype: string
+    """
+    return '{%s}' % ', '.join('%r: %s' % (param, param) for param in names)
+
+
+def tuple_source(names):
+    """
+    Get the source code of a tuple with the parameters of a query
+
+    :param names: names of the parameters of the query, in order
+    :type names: tuple of strings
+
+    :return: the source code of the tuple
+    :rtype: string
+    """
+    if len(names) == 1:
+        return '(%s,)' % names[0]
+
+    return '(%s)' % ', '.join(names)
+
+
+def specialize(name, names, body, func_name=None, name_source=None):
+    """
+    Get the source code of a method with the parameters as its arguments
+
+    The arguments of the method are the parameters of the query in order.
+    The method needs the `_MISSING`, `_ROWS` and `_fallback` names on its
+    namespace.
+
+    :param name: name of the method, or None if it's got from `name_source`
+    :type name: string or None
+    :param names: names of the parameters of the query
+    :type names: tuple of strings
+    :param body: source code executing the query using the parameters as
+        local variables
+    :type body: string
+    :param func_name: name of the function (by default, the method one)
+    :type func_name: string
+    :param name_source: source code of the name of the method (by default, a
+        literal of `name`)
+    :type name_source: string
+
+    :return: the source code of the method
+    :rtype: string
+    """
+    doc = 'Exec the `%s` query' % name if name else 'Exec the query'
+    source = {'func_name': func_name or name, 'names': names,
+              'name': name_source or repr(name), 'doc': doc}
+
+    for param in names:
+        if not IDENTIFIER.match(param) or iskeyword(param) \
+        or param in RESERVED:
+            return GENERIC % source
+
+    source['body'] = indent(body, ' ' * 4)
+
+    if not names:
+        return SPECIALIZED_EMPTY % source
+
+    source.update({
+        'first': names[0],
+        'guard': ''.join(' or %s is _MISSING' % param for param in names),
+        'signature': ''.join(', %s=_MISSING' % param for param in names),
+        'values': tuple_source(names)})
+
+    return SPECIALIZED % source
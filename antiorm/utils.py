@@ -3,9 +3,18 @@
 Several utilities functions and classes
 """
 
-from collections import namedtuple
-from re          import sub
+from array       import array
+from collections import namedtuple, OrderedDict
+from operator    import itemgetter
+from re          import compile as re_compile, sub
 from thread      import allocate_lock
+from threading   import local, RLock
+from weakref     import WeakKeyDictionary
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 # Factory classes
 import backends
@@ -15,6 +24,77 @@ import backends
 #from backends.sqlite  import Sqlite
 
 
+# Maximum number of namedtuple classes cached by `namedtuple_factory()`
+ROW_TYPES_SIZE = 128
+
+_row_types = OrderedDict()
+_row_types_lock = allocate_lock()
+
+# Description and class of the last rows, since drivers like sqlite3 give the
+# same description object for all the rows of a query
+_last_row_type = (None, None)
+
+# Locks of the transactions of each connection, and the one shared by the
+# connections that can't be weak referenced (like the sqlite3 ones). They are
+# reentrant so a thread can call other methods while iterating over the rows
+_connection_locks = WeakKeyDictionary()
+_connection_locks_lock = allocate_lock()
+_shared_lock = RLock()
+
+# Connections with a server side cursor being iterated by each thread
+_streaming = local()
+
+
+def _description(cursor):
+    """
+    Get the columns description of a DB-API 2.0 cursor
+    """
+    try:
+        return cursor.description
+    except AttributeError:  # APSW previously to version 3.7.12
+        return cursor.getdescription()
+
+
+def row_type(cursor):
+    """
+    Get the namedtuple class for the rows of a DB-API 2.0 cursor
+
+    Classes are cached by the names of the columns, so they are created only
+    once for each distinct cursor description. Only the `ROW_TYPES_SIZE` most
+    recently used classes are kept.
+
+    @param cursor: the cursor with the columns description
+    @type cursor: a DB-API 2.0 cursor
+
+    @return: the namedtuple class of the rows
+    @rtype: class
+    """
+    global _last_row_type
+
+    description = _description(cursor)
+
+    last_description, cls = _last_row_type
+    if description is last_description:
+        return cls
+
+    names = tuple([col[0] for col in description])
+
+    with _row_types_lock:
+        try:
+            cls = _row_types.pop(names)
+        except KeyError:
+            cls = namedtuple('namedtuple', names)
+
+            if len(_row_types) >= ROW_TYPES_SIZE:
+                _row_types.popitem(last=False)
+
+        # Set as most recently used
+        _row_types[names] = cls
+
+    _last_row_type = description, cls
+    return cls
+
+
 def namedtuple_factory(cursor, row):
     """
     Create a namedtuple from a DB-API 2.0 cursor description and its values
@@ -27,12 +107,100 @@ def namedtuple_factory(cursor, row):
     @return: a namedtuple object with the row data
     @rtype: namedtuple
     """
-    try:
-        description = cursor.description
-    except AttributeError:  # APSW previously to version 3.7.12
-        description = cursor.getdescription()
+    return row_type(cursor)._make(row)
+
+
+def namedtuple_batch_factory(cursor, rows):
+    """
+    Create namedtuples for a list of rows with the same cursor description
+
+    It's the batch version of `namedtuple_factory()` (and its `batch`
+    attribute), for the results of `fetchall()` or `fetchmany()`, so the
+    description is resolved only once.
+
+    @param cursor: the cursor with the columns description
+    @type cursor: a DB-API 2.0 cursor
+    @param rows: the rows of data to be returned
+    @type rows: an iterable of iterables
+
+    @return: the namedtuple objects with the rows data
+    @rtype: list of namedtuples
+    """
+    return map(row_type(cursor)._make, rows)
+
+namedtuple_factory.batch = namedtuple_batch_factory
+
+
+# array typecodes for the types of the values of the numeric columns
+TYPECODES = {int: 'l', long: 'l', float: 'd'}
+
+
+def _column(values):
+    """
+    Create an empty column for the type of its first not None value
+    """
+    for value in values:
+        if value is not None:
+            typecode = TYPECODES.get(type(value))
+            if typecode:
+                return array(typecode)
+            break
+
+    return []
+
+
+def columnar_factory(cursor, chunks):
+    """
+    Build the columns of a query result from chunks of its rows
+
+    Numeric columns are stored on `array.array` objects (converted to NumPy
+    arrays if it's installed) and the other ones on lists, so the rows are
+    transposed only one chunk at a time. If a numeric column has a None or a
+    value of other type, it's stored as a list.
+
+    @param cursor: the cursor with the columns description
+    @type cursor: a DB-API 2.0 cursor
+    @param chunks: the rows of the query (as returned by `fetchmany()`)
+    @type chunks: iterable of lists of rows
+
+    @return: the columns by their names
+    @rtype: OrderedDict of arrays or lists
+    """
+    names = [col[0] for col in _description(cursor)]
+    columns = None
+
+    for rows in chunks:
+        values = zip(*rows)
+
+        if columns is None:
+            columns = map(_column, values)
 
-    return namedtuple('namedtuple', (col[0] for col in description))(*row)
+        for index, column in enumerate(columns):
+            chunk = values[index]
+
+            if isinstance(column, array):
+                size = len(column)
+
+                try:
+                    column.extend(chunk)
+                    continue
+
+                # Not a numeric column, store it on a list
+                except (OverflowError, TypeError):
+                    del column[size:]
+                    columns[index] = column = column.tolist()
+
+            column.extend(chunk)
+
+    if columns is None:
+        columns = [[] for name in names]
+
+    elif numpy:
+        columns = [numpy.frombuffer(data, data.typecode)
+                   if isinstance(data, array) else data
+                   for data in columns]
+
+    return OrderedDict(zip(names, columns))
 
 
 def named2pyformat(sql):
@@ -48,6 +216,190 @@ def named2pyformat(sql):
     return sub(":\w+", lambda m: "%%(%s)s" % m.group(0)[1:], sql)
 
 
+# Named placeholders, skipping string literals, quoted names and casts
+NAMED = re_compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|::)|:(\w+)""")
+
+# Pyformat placeholders
+PYFORMAT = re_compile(r"%\((\w+)\)s")
+
+# Qmark and pyformat placeholders that can't be mixed with the named ones,
+# skipping string literals and quoted names
+QMARK = re_compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")|(\?)""")
+MIXED_PYFORMAT = re_compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")|(%\(\w+\)s)""")
+
+
+def _named2positional(sql, placeholder, mixed, escape=False):
+    """
+    Convert from 'named' paramstyle format to a positional one
+
+    @param sql: a sql query in named format
+    @type sql: string
+    @param placeholder: the positional placeholder
+    @type placeholder: string
+    @param mixed: the placeholders that would be taken as parameters by the
+        driver, so they can't be mixed with the named ones
+    @type mixed: compiled regular expression
+    @param escape: set if literal percent signs should be escaped
+    @type escape: boolean
+
+    @return: the sql query in positional format and the names of its
+        parameters in order
+    @rtype: tuple
+    @raise ValueError: the query has placeholders of the driver paramstyle
+    """
+    for match in mixed.finditer(sql):
+        if match.group(2):
+            raise ValueError("Placeholder %r can't be mixed with named ones: "
+                             "%s" % (match.group(2), sql))
+
+    if escape:
+        sql = sql.replace('%', '%%')
+
+    names = []
+
+    def replace(match):
+        if match.group(2):
+            names.append(match.group(2))
+            return placeholder
+        return match.group(1)
+
+    return NAMED.sub(replace, sql), tuple(names)
+
+
+def named2qmark(sql):
+    """
+    Convert from 'named' paramstyle format to 'qmark' positional format
+
+    @param sql: a sql query in named format
+    @type sql: string
+
+    @return: the sql query in qmark format and the names of its parameters
+    @rtype: tuple
+    """
+    return _named2positional(sql, '?', QMARK)
+
+
+def named2format(sql):
+    """
+    Convert from 'named' paramstyle format to 'format' positional format
+
+    Literal percent signs are escaped since the query will be formated by the
+    driver (MySQLdb, psycopg2...), while question marks are left as is so
+    operators like the PostgreSQL jsonb ? ones can be used.
+
+    @param sql: a sql query in named format
+    @type sql: string
+
+    @return: the sql query in format format and the names of its parameters
+    @rtype: tuple
+    """
+    return _named2positional(sql, '%s', MIXED_PYFORMAT, True)
+
+
+def parameters(sql):
+    """
+    Get the names of the parameters of a query without duplicates
+
+    @param sql: a sql query (or a tuple of them) in named or pyformat format
+    @type sql: string or tuple of strings
+
+    @return: the names of the parameters in order of appearance
+    @rtype: tuple of strings
+    """
+    if isinstance(sql, tuple):
+        sql = '\n'.join(sql)
+
+    names = [match.group(2) for match in NAMED.finditer(sql)
+             if match.group(2)]
+    if not names:
+        names = PYFORMAT.findall(sql)
+
+    result = []
+    for name in names:
+        name = str(name)
+        if name not in result:
+            result.append(name)
+
+    return tuple(result)
+
+
+def args_getter(names, method_name=None, expected=None):
+    """
+    Build a function that get the positional arguments from a parameters dict
+
+    If `method_name` is given, the keys of the parameters dicts are checked
+    against the names of the parameters of the method, raising a TypeError
+    with the missing and unexpected ones.
+
+    @param names: the names of the parameters in order
+    @type names: tuple of strings
+    @param method_name: name of the method of the query
+    @type method_name: string or None
+    @param expected: names of all the parameters of the method (by default,
+        the ones of the query)
+    @type expected: iterable of strings or None
+
+    @return: function that return a tuple with the parameters values
+    @rtype: function
+    """
+    if len(names) > 1:
+        getter = itemgetter(*names)
+    elif names:
+        name = names[0]
+        getter = lambda kwargs: (kwargs[name],)
+    else:
+        getter = lambda kwargs: ()
+
+    if method_name is None:
+        return getter
+
+    expected = frozenset(names if expected is None else expected)
+    count = len(expected)
+
+    def getargs(kwargs):
+        """
+        Get the positional arguments checking the keys of the parameters dict
+        """
+        # Only the number of keys is checked on the valid calls, if it's the
+        # expected one any missing parameter means there's an unexpected one
+        if len(kwargs) == count:
+            try:
+                return getter(kwargs)
+            except KeyError:
+                pass
+
+        raise parameters_error(method_name, expected, kwargs)
+
+    return getargs
+
+
+def parameters_error(method_name, expected, kwargs):
+    """
+    Build the error of a parameters dict not matching the ones of a method
+
+    @param method_name: name of the method of the query
+    @type method_name: string
+    @param expected: names of the parameters of the method
+    @type expected: frozenset of strings
+    @param kwargs: the parameters dict
+    @type kwargs: dict
+
+    @return: the error listing the missing and unexpected parameters
+    @rtype: TypeError
+    """
+    keys = frozenset(kwargs.keys())
+
+    errors = []
+    for kind, names in (('missing', expected - keys),
+                        ('unexpected', keys - expected)):
+        if names:
+            names = ', '.join("'%s'" % name for name in sorted(names))
+            errors.append('%s %s' % (kind, names))
+
+    return TypeError("%s() got wrong parameters: %s"
+                     % (method_name, '; '.join(errors)))
+
+
 def driver_factory(db_conn, *args, **kwargs):
     """
     A factory function to generate the correct type of database driver backend
@@ -58,31 +410,122 @@ def driver_factory(db_conn, *args, **kwargs):
     @return: an optimized backend driver for the database connection
     @rtype: an antiorm.base.Base child class instance
     """
+    import pool
+
     type_conn = db_conn.__class__.__module__
 
+    # Get the type of the connections opened for each thread
+    if isinstance(db_conn, pool.ThreadLocalConnection):
+        type_conn = db_conn.connection_class.__module__
+
     if type_conn == 'apsw':
+        import backends.apsw
         return backends.apsw.APSW(db_conn, *args, **kwargs)
 
 #    if type_conn == 'mysqldb':
+#        import backends.mysql
 #        return backends.mysql.MySQL(db_conn, *args, **kwargs)
 
     if type_conn == 'sqlite3':
+        import backends.sqlite
         return backends.sqlite.Sqlite(db_conn, *args, **kwargs)
 
+    import backends.generic
     return backends.generic.Generic(db_conn, *args, **kwargs)
 
 
+def connection_lock(db_conn):
+    """
+    Get the lock of the transactions of a connection
+
+    The lock is shared by all the transaction managers of the same connection
+    (also of the ones of its wrappers), so transactions on different
+    connections can be done at the same time. Connections that can't be weak
+    referenced share a process wide lock.
+
+    @param db_conn: the connection, or a wrapper of it
+    @type db_conn: DB-API 2.0 database connection
+
+    @return: the lock of the connection
+    @rtype: threading.RLock
+    """
+    db_conn = getattr(db_conn, '_connection', db_conn)
+
+    with _connection_locks_lock:
+        try:
+            lock = _connection_locks.get(db_conn)
+            if lock is None:
+                lock = _connection_locks[db_conn] = RLock()
+
+        except TypeError:
+            lock = _shared_lock
+
+    return lock
+
+
+def streaming_connections():
+    """
+    Get the connections with a server side cursor being iterated by the thread
+
+    @return: the connections (unwrapped)
+    @rtype: set
+    """
+    try:
+        return _streaming.connections
+    except AttributeError:
+        connections = _streaming.connections = set()
+        return connections
+
+
+def check_streaming(db_conn):
+    """
+    Check that the thread is not iterating a server side cursor of a connection
+
+    Nested calls can't use the connection meanwhile, since MySQL would fail
+    with "Commands out of sync" and their commits would close the psycopg2
+    named cursors.
+
+    @param db_conn: the connection, or a wrapper of it
+    @type db_conn: DB-API 2.0 database connection
+
+    @raise RuntimeError: a server side cursor of the connection is open
+    """
+    connections = getattr(_streaming, 'connections', None)
+    if connections and getattr(db_conn, '_connection', db_conn) in connections:
+        raise RuntimeError("Can't use the connection while iterating over the "
+                           "rows of a server side cursor")
+
+
 class TransactionManager(object):
     """
     Transaction context manager for databases that doesn't has support for it
+
+    Transactions of the same connection are serialized with a lock, except if
+    the exclusive access to the connection is guaranteed by other way (like by
+    a connections pool). Nested transactions of the thread holding the lock
+    (like the calls done while iterating over the rows of a table method) use
+    the connection without waiting, except while a server side cursor of it
+    is being iterated.
     """
 
-    _lock = allocate_lock()
+    def __init__(self, db_conn, lock=True):
+        """
+        Constructor
 
-    def __init__(self, db_conn):
+        @param db_conn: connection of the database
+        @type db_conn: DB-API 2.0 database connection
+        @param lock: set if the transactions should be serialized
+        @type lock: boolean
+        """
         self.connection = db_conn
 
+        self._lock = None
+        if lock:
+            self._lock = connection_lock(db_conn)
+
     def __enter__(self):
+        check_streaming(self.connection)
+
         # Use the connection context manager if its supported
         try:
             func = self.connection.__enter__
@@ -92,7 +535,8 @@ class TransactionManager(object):
             return func()
 
         # Use custom context manager
-        self._lock.acquire()
+        if self._lock:
+            self._lock.acquire()
         return self.connection
 
     def __exit__(self, exc_type, exc_value, traceback):
@@ -104,13 +548,85 @@ class TransactionManager(object):
         else:
             return func(exc_type, exc_value, traceback)
 
-        # There was an exception on the context manager, rollback and raise
-        if exc_type:
-            self.connection.rollback()
-            self._lock.release()
+        try:
+            # There was an exception on the context manager, rollback and raise
+            if exc_type:
+                self.connection.rollback()
+
+                raise exc_type, exc_value, traceback
 
-            raise exc_type, exc_value, traceback
+            # There were no problems on the context manager, commit
+            self.connection.commit()
 
-        # There were no problems on the context manager, commit
-        self.connection.commit()
-        self._lock.release()
+        finally:
+            if self._lock:
+                self._lock.release()
+
+
+class JoinedManager(object):
+    """
+    Transaction context manager joining the calls to an explicit transaction
+
+    While a thread has an explicit transaction open (`connection` is set for
+    it), its calls use the transaction connection without committing, so all
+    of them are committed at once when the explicit transaction finishes.
+    Calls of the other threads use the wrapped transaction manager.
+    """
+
+    def __init__(self, manager):
+        """
+        Constructor
+
+        @param manager: transaction manager of the engine
+        @type manager: context manager
+        """
+        self.manager = manager
+
+        self._local = local()
+
+    @property
+    def connection(self):
+        """
+        Connection of the explicit transaction of the thread, if any
+        """
+        return getattr(self._local, 'connection', None)
+
+    @connection.setter
+    def connection(self, value):
+        self._local.connection = value
+
+    @property
+    def written(self):
+        """
+        Tables written on the explicit transaction of the thread, or None if
+        they are unknown
+        """
+        return getattr(self._local, 'written', frozenset())
+
+    @written.setter
+    def written(self, value):
+        self._local.written = value
+
+    def __enter__(self):
+        state = self._local
+
+        # Stack of the (nested) calls of the thread and if they were joined
+        try:
+            joined = state.joined
+        except AttributeError:
+            joined = state.joined = []
+
+        conn = getattr(state, 'connection', None)
+        if conn is None:
+            conn = self.manager.__enter__()
+            joined.append(False)
+        else:
+            check_streaming(conn)
+            joined.append(True)
+
+        return conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Commit or rollback the calls done outside an explicit transaction
+        if not self._local.joined.pop():
+            return self.manager.__exit__(exc_type, exc_value, traceback)
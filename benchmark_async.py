@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Requests/sec of concurrent calls done with AsyncAntiORM, and with the
+synchronous engine (one connection) executed naively on a pool of threads
+
+The stand-in connections simulate the round trip to a database server sleeping
+on each statement (releasing the GIL like the MySQLdb and psycopg2 drivers do).
+"""
+
+from multiprocessing.pool import ThreadPool
+from time                 import sleep, time
+
+from antiorm.asynchronous     import AsyncAntiORM
+from antiorm.backends.generic import Generic
+import sqlite3
+
+REQUESTS = 400
+LATENCY = 0.001
+SQL = "SELECT value FROM benchmark_async LIMIT 1;"
+
+
+class RemoteCursor(object):
+    "Cursor of a connection with network latency"
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, sql, args=()):
+        sleep(LATENCY)
+        return self.cursor.execute(sql, args)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class RemoteConnection(object):
+    "Connection with network latency"
+    def __init__(self):
+        self.connection = sqlite3.connect(":memory:", check_same_thread=False)
+        self.connection.execute("CREATE TABLE benchmark_async (value)")
+        self.connection.execute("INSERT INTO benchmark_async VALUES (1)")
+
+    def cursor(self):
+        return RemoteCursor(self.connection.cursor())
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def close(self):
+        self.connection.close()
+
+
+def run(call):
+    start = time()
+
+    results = [call() for index in xrange(REQUESTS)]
+    for result in results:
+        result.get()
+
+    return REQUESTS / (time() - start)
+
+
+for workers in (1, 2, 4, 8):
+    engine = AsyncAntiORM(RemoteConnection, workers=workers)
+    engine.parse_string(SQL, "value")
+    async_engine = max(run(engine.value) for _ in xrange(3))
+    engine.close()
+
+    # Previous behaviour: synchronous engine executed on a pool of threads
+    engine = Generic(RemoteConnection())
+    engine.parse_string(SQL, "value")
+    thread_pool = ThreadPool(workers)
+    naive = max(run(lambda: thread_pool.apply_async(engine.value))
+                for _ in xrange(3))
+    thread_pool.close()
+    thread_pool.join()
+
+    print "Workers: %s\nAsyncAntiORM: %d requests/sec\n" \
+          "Synchronous engine on threads (previous behaviour): " \
+          "%d requests/sec" % (workers, async_engine, naive)
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+
+from antiorm import AntiORM
+import sqlite3
+import timeit
+
+number=10000
+
+for positional in (False, True):
+    db = sqlite3.connect(":memory:")
+    cursor = db.cursor()
+    cursor.execute("CREATE TABLE test_table (a, b, c, d, e);")
+
+    engine = AntiORM(db, positional=positional)
+    engine.parse_string("INSERT INTO test_table (a, b, c, d, e) "
+                        "VALUES (:a, :b, :c, :d, :e);", "insert")
+    engine.parse_string("SELECT e FROM test_table "
+                        "WHERE a = :a AND b = :b LIMIT 1;", "select")
+
+    for name, funct in (
+        ('insert', lambda: engine.insert(a=1, b=2, c=3, d=4, e=5)),
+        ('select', lambda: engine.select(a=1, b=2))):
+        t = timeit.Timer(funct)
+        total = t.timeit(number=number)
+
+        print "%s %s:\nTotal: %s seconds\nPartial: %.4f usec/pass" % (
+            'Positional' if positional else 'Named', name,
+            total, 1000000 * total/number
+        )
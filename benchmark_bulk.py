@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+from antiorm import AntiORM
+import sqlite3
+import timeit
+
+ROWS = 100000
+
+rows = [{'name': 'name%s' % index} for index in xrange(ROWS)]
+
+
+# Previous behaviour of the list methods, one execute() for each row
+def per_row():
+    with engine.connection as conn:
+        cursor = conn.cursor()
+
+        for kwargs in rows:
+            cursor.execute("INSERT INTO test_statement_INSERT_single (name) "
+                           "VALUES (:name);", kwargs)
+            cursor.lastrowid
+
+def executemany():
+    engine.test_statement_INSERT_single.many(rows)
+
+def executemany_norowids():
+    engine.test_statement_INSERT_single.many(rows, rowids=False)
+
+def multirow():
+    engine.test_statement_INSERT_single.many(rows, multirow=True)
+
+def multirow_norowids():
+    engine.test_statement_INSERT_single.many(rows, rowids=False,
+                                             multirow=True)
+
+
+number=3
+for name, funct in (('Per row', per_row),
+                    ('executemany', executemany),
+                    ('executemany without row ids', executemany_norowids),
+                    ('Multi-row VALUES', multirow),
+                    ('Multi-row VALUES without row ids', multirow_norowids)):
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE test_statement_INSERT_single (name TEXT);")
+
+    engine = AntiORM(db, "./tests/samples_sql")
+
+    t = timeit.Timer(funct)
+    total = t.timeit(number=number)
+
+    print "%s:\nTotal: %s seconds\nRows/sec: %d" % (
+        name, total, number * ROWS / total
+    )
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+from os       import listdir, remove
+from os.path  import join
+from shutil   import rmtree
+from tempfile import mkdtemp
+
+from antiorm import AntiORM
+import sqlite3
+import timeit
+
+SAMPLES = "./tests/samples_sql"
+FILES = 1500
+
+# Build a big dir of SQL files using the samples ones as templates
+dir_path = mkdtemp()
+samples = sorted(listdir(SAMPLES))
+for index in range(FILES):
+    sample = samples[index % len(samples)]
+
+    with open(join(SAMPLES, sample)) as file_sql:
+        sql = file_sql.read().replace('test_', 'test%s_' % index)
+    with open(join(dir_path, "%s_%s" % (index, sample)), 'w') as file_sql:
+        file_sql.write(sql)
+
+cache_path = dir_path + '.cache'
+
+def cold():
+    try:
+        remove(cache_path)
+    except OSError:
+        pass
+
+    db = sqlite3.connect(":memory:")
+    engine = AntiORM(db, dir_path, cache_path=cache_path)
+
+def warm():
+    db = sqlite3.connect(":memory:")
+    engine = AntiORM(db, dir_path, cache_path=cache_path)
+
+
+number=5
+for name, funct in (('Cold', cold), ('Warm', warm)):
+    t = timeit.Timer(funct)
+    total = t.timeit(number=number)
+
+    print "%s: %s seconds\nPartial: %.4f msec/pass (%s files)" % (
+        name, total, 1000 * total/number, FILES
+    )
+
+remove(cache_path)
+rmtree(dir_path)
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+from antiorm import AntiORM
+import sqlite3
+import timeit
+
+db = sqlite3.connect(":memory:")
+
+engine = AntiORM(db)
+engine.parse_string("SELECT :a + :b AS c LIMIT 1;", "add")
+
+# Same work done by the method, without the dispatch of the call
+def raw():
+    with db:
+        cursor = db.cursor()
+        cursor.execute("SELECT ? + ? AS c LIMIT 1;", (1, 2))
+        cursor.fetchone()[0]
+
+calls = (('Raw cursor', raw),
+         ('Arguments', lambda: engine.add(1, 2)),
+         ('Keywords', lambda: engine.add(a=1, b=2)),
+         ('one(mapping)', lambda: engine.add.one({'a': 1, 'b': 2})),
+         ('Mapping', lambda: engine.add({'a': 1, 'b': 2})))
+
+number=100000
+for name, funct in calls:
+    t = timeit.Timer(funct)
+    total = min(t.repeat(5, number))
+
+    print "%s:\nBest total: %s seconds\nPartial: %.4f usec/pass" % (
+        name, total, 1000000 * total/number
+    )
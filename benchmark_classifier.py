@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+from io      import open
+from os      import listdir
+from os.path import join
+
+from antiorm.base import parse_sql, parse_sql_full
+import timeit
+
+SAMPLES = "./tests/samples_sql"
+
+corpus = []
+for filename in sorted(listdir(SAMPLES)):
+    with open(join(SAMPLES, filename), 'rt') as file_sql:
+        corpus.append(file_sql.read())
+
+
+def time_scanner():
+    for sql in corpus:
+        parse_sql(sql, [SAMPLES])
+
+def time_sqlparse():
+    for sql in corpus:
+        parse_sql_full(sql, [SAMPLES])
+
+
+number=1000
+for name, funct in (('Scanner', time_scanner), ('sqlparse', time_sqlparse)):
+    t = timeit.Timer(funct)
+    total = t.timeit(number=number)
+
+    print "%s: %s seconds\nThroughput: %.1f queries/sec" % (
+        name, total, number * len(corpus) / total
+    )
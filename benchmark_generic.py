@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Rows/sec fetched through the Generic driver with and without row factory
+
+MySQL and PostgreSQL are measured if their drivers are installed and the
+connection parameters are given on the ANTIORM_MYSQL (like "host=localhost
+user=test db=test") and ANTIORM_POSTGRESQL (a libpq DSN) environment vars.
+"""
+
+from os import environ
+import sqlite3
+import timeit
+
+from antiorm.backends.generic import Generic
+from antiorm.utils import namedtuple_factory
+
+ROWS = 100000
+
+
+def connections():
+    yield 'SQLite', sqlite3.connect(":memory:"), '?'
+
+    if environ.get('ANTIORM_MYSQL'):
+        try:
+            import MySQLdb
+        except ImportError:
+            print "MySQLdb not installed, skipping MySQL"
+        else:
+            params = dict(param.split('=', 1)
+                          for param in environ['ANTIORM_MYSQL'].split())
+            yield 'MySQL', MySQLdb.connect(**params), '%s'
+
+    if environ.get('ANTIORM_POSTGRESQL'):
+        try:
+            import psycopg2
+        except ImportError:
+            print "psycopg2 not installed, skipping PostgreSQL"
+        else:
+            yield ('PostgreSQL', psycopg2.connect(environ['ANTIORM_POSTGRESQL']),
+                   '%s')
+
+
+for db_name, db, placeholder in connections():
+    cursor = db.cursor()
+    cursor.execute("DROP TABLE IF EXISTS benchmark_generic")
+    cursor.execute("CREATE TABLE benchmark_generic "
+                   "(name VARCHAR(32), surname VARCHAR(32))")
+    cursor.executemany("INSERT INTO benchmark_generic VALUES (%s, %s)"
+                       % (placeholder, placeholder),
+                       [('name%s' % index, 'surname%s' % index)
+                        for index in xrange(ROWS)])
+    db.commit()
+
+    engine = Generic(db)
+    engine.parse_string("SELECT name, surname FROM benchmark_generic;",
+                        "names")
+
+    number = 3
+    for name, row_factory in (('No row factory', None),
+                              ('namedtuple_factory', namedtuple_factory),
+                              ('Per row namedtuple_factory',
+                               lambda cursor, row:
+                                   namedtuple_factory(cursor, row))):
+        engine.row_factory = row_factory
+
+        t = timeit.Timer(engine.names)
+        total = min(t.repeat(3, number))
+
+        print "%s, %s:\nTotal: %s seconds\nRows/sec: %d" % (
+            db_name, name, total, number * ROWS / total
+        )
+
+    cursor.execute("DROP TABLE benchmark_generic")
+    db.commit()
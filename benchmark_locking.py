@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Queries/sec done by several threads, each one with its own connection
+
+The connections simulate the round trip to a database server sleeping on each
+statement (releasing the GIL like the MySQLdb and psycopg2 drivers do), so the
+throughput should scale with the number of threads while the transactions of
+different connections don't share a lock.
+"""
+
+from thread    import allocate_lock
+from threading import Thread
+from time      import sleep, time
+
+from antiorm.backends.generic import Generic
+import sqlite3
+
+QUERIES = 200
+LATENCY = 0.001
+
+
+class RemoteCursor(object):
+    "Cursor of a connection with network latency"
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, sql, args=()):
+        sleep(LATENCY)
+        return self.cursor.execute(sql, args)
+
+    def executemany(self, sql, args):
+        sleep(LATENCY)
+        return self.cursor.executemany(sql, args)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class RemoteConnection(object):
+    "Connection with network latency"
+    def __init__(self):
+        self.connection = sqlite3.connect(":memory:", check_same_thread=False)
+        self.connection.execute("CREATE TABLE benchmark_locking (value)")
+        self.connection.execute("INSERT INTO benchmark_locking VALUES (1)")
+
+    def cursor(self):
+        return RemoteCursor(self.connection.cursor())
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+
+def run(engines):
+    def worker(engine):
+        for index in xrange(QUERIES):
+            engine.value()
+
+    threads = [Thread(target=worker, args=(engine,)) for engine in engines]
+
+    start = time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return len(engines) * QUERIES / (time() - start)
+
+
+# Previous behaviour: one lock shared by all the transaction managers
+shared_lock = allocate_lock()
+
+for threads in (1, 2, 4, 8):
+    engines = []
+    for index in xrange(threads):
+        engine = Generic(RemoteConnection())
+        engine.parse_string("SELECT value FROM benchmark_locking LIMIT 1;",
+                            "value")
+        engines.append(engine)
+
+    per_connection = max(run(engines) for _ in xrange(3))
+
+    for engine in engines:
+        engine.tx_manager._lock = shared_lock
+    shared = max(run(engines) for _ in xrange(3))
+
+    print "Threads: %s\nPer connection lock: %d queries/sec\n" \
+          "Shared lock (previous behaviour): %d queries/sec" % (
+        threads, per_connection, shared
+    )
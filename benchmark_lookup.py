@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+from antiorm import AntiORM
+import sqlite3
+import timeit
+
+ROWS = 100000
+
+db = sqlite3.connect(":memory:")
+db.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT);")
+db.executemany("INSERT INTO users (name) VALUES (?);",
+               [('name%s' % index,) for index in xrange(ROWS)])
+db.commit()
+
+engine = AntiORM(db)
+engine.parse_string("SELECT name FROM users WHERE id = :id LIMIT 1;", "name")
+
+# Keys in random-like order, with a 10% of misses
+keys = [{'id': index * 7919 % (ROWS + ROWS // 10)} for index in xrange(ROWS)]
+
+
+# Previous behaviour of the list methods, one execute() for each key
+def per_key():
+    with engine.connection as conn:
+        cursor = conn.cursor()
+
+        result = []
+        for kwargs in keys:
+            cursor.execute("SELECT name FROM users WHERE id = ? LIMIT 1;",
+                           (kwargs['id'],))
+
+            value = cursor.fetchone()
+            if value:
+                value = value[0]
+            result.append(value)
+
+def batch():
+    engine.name.many(keys)
+
+
+number=3
+for name, funct in (('Per key', per_key),
+                    ('Batch IN', batch)):
+    t = timeit.Timer(funct)
+    total = min(t.repeat(3, number))
+
+    print "%s:\nTotal: %s seconds\nKeys/sec: %d" % (
+        name, total, number * ROWS / total
+    )
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+from antiorm import AntiORM
+import sqlite3
+import timeit
+
+ROWS = 100000
+
+rows = [{'name': 'name%s' % index, 'surname': 'surname%s' % index}
+        for index in xrange(ROWS)]
+
+
+# Previous behaviour of the list methods, all the statements for each row
+def row_major():
+    with engine.connection as conn:
+        cursor = conn.cursor()
+
+        for kwargs in rows:
+            cursor.execute("INSERT INTO test_multiple_statement_INSERT (name) "
+                           "VALUES (?);", (kwargs['name'],))
+            cursor.lastrowid
+
+            cursor.execute("UPDATE test_multiple_statement_INSERT "
+                           "SET surname = ? WHERE name = ?;",
+                           (kwargs['surname'], kwargs['name']))
+
+def statement_major():
+    engine.test_multiple_statement_INSERT.many(rows)
+
+
+number=3
+for name, funct in (('Row-major', row_major),
+                    ('Statement-major executemany', statement_major)):
+    # The UPDATE look for the rows by name, so it needs to be indexed
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE test_multiple_statement_INSERT "
+               "(name TEXT PRIMARY KEY, surname TEXT NULL);")
+
+    engine = AntiORM(db, "./tests/samples_sql")
+
+    # Each run insert the same names, so empty the table after it
+    def funct(funct=funct):
+        funct()
+        db.execute("DELETE FROM test_multiple_statement_INSERT")
+
+    t = timeit.Timer(funct)
+    total = t.timeit(number=number)
+
+    print "%s:\nTotal: %s seconds\nRows/sec: %d" % (
+        name, total, number * ROWS / total
+    )
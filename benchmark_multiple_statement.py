@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+from antiorm import AntiORM
+from antiorm.backends.sqlite import quote_sql
+from antiorm.utils import named2pyformat
+import sqlite3
+import timeit
+
+CALLS = 10000
+
+db = sqlite3.connect(":memory:")
+db.execute("CREATE TABLE test_multiple_statement (name TEXT);")
+db.execute("INSERT INTO test_multiple_statement VALUES ('a');")
+db.commit()
+
+engine = AntiORM(db, "./tests/samples_sql")
+
+with open("./tests/samples_sql/test_multiple_statement.sql") as file_sql:
+    script = named2pyformat(file_sql.read())
+
+
+# Previous behaviour of the Sqlite backend, quote the values and executescript
+def executescript():
+    for index in xrange(CALLS):
+        kwargs = {'name': quote_sql('a')}
+
+        with db:
+            db.cursor().executescript(script % kwargs)
+
+def binded():
+    for index in xrange(CALLS):
+        engine.test_multiple_statement('a')
+
+
+number=3
+for name, funct in (('executescript', executescript),
+                    ('Binded statements', binded)):
+    t = timeit.Timer(funct)
+    total = min(t.repeat(3, number))
+
+    print "%s:\nTotal: %s seconds\nCalls/sec: %d" % (
+        name, total, number * CALLS / total
+    )
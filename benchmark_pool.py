@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Queries/sec done by several threads sharing an engine, with one connection
+and with a pool of them
+
+The SQLite stand-in connections simulate the round trip to a database server
+sleeping on each statement (releasing the GIL like the MySQLdb and psycopg2
+drivers do). MySQL and PostgreSQL are measured if their drivers are installed
+and the connection parameters are given on the ANTIORM_MYSQL (like
+"host=localhost user=test db=test") and ANTIORM_POSTGRESQL (a libpq DSN)
+environment vars.
+"""
+
+from os        import environ
+from threading import Thread
+from time      import sleep, time
+
+from antiorm.backends.generic import Generic
+from antiorm.pool             import ConnectionPool
+import sqlite3
+
+QUERIES = 200
+LATENCY = 0.001
+
+
+class RemoteCursor(object):
+    "Cursor of a connection with network latency"
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, sql, args=()):
+        sleep(LATENCY)
+        return self.cursor.execute(sql, args)
+
+    def executemany(self, sql, args):
+        sleep(LATENCY)
+        return self.cursor.executemany(sql, args)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class RemoteConnection(object):
+    "Connection with network latency"
+    def __init__(self):
+        self.connection = sqlite3.connect(":memory:", check_same_thread=False)
+        self.connection.execute("CREATE TABLE benchmark_pool (value)")
+        self.connection.execute("INSERT INTO benchmark_pool VALUES (1)")
+
+    def cursor(self):
+        return RemoteCursor(self.connection.cursor())
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def close(self):
+        self.connection.close()
+
+
+def factories():
+    yield 'SQLite stand-in', RemoteConnection
+
+    if environ.get('ANTIORM_MYSQL'):
+        try:
+            import MySQLdb
+        except ImportError:
+            print "MySQLdb not installed, skipping MySQL"
+        else:
+            params = dict(param.split('=', 1)
+                          for param in environ['ANTIORM_MYSQL'].split())
+            yield 'MySQL', lambda: MySQLdb.connect(**params)
+
+    if environ.get('ANTIORM_POSTGRESQL'):
+        try:
+            import psycopg2
+        except ImportError:
+            print "psycopg2 not installed, skipping PostgreSQL"
+        else:
+            yield ('PostgreSQL',
+                   lambda: psycopg2.connect(environ['ANTIORM_POSTGRESQL']))
+
+
+def run(engine, threads):
+    def worker():
+        for index in xrange(QUERIES):
+            engine.value()
+
+    threads = [Thread(target=worker) for index in xrange(threads)]
+
+    start = time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return len(threads) * QUERIES / (time() - start)
+
+
+for db_name, factory in factories():
+    if db_name != 'SQLite stand-in':
+        db = factory()
+        cursor = db.cursor()
+        cursor.execute("DROP TABLE IF EXISTS benchmark_pool")
+        cursor.execute("CREATE TABLE benchmark_pool (value INTEGER)")
+        cursor.execute("INSERT INTO benchmark_pool VALUES (1)")
+        db.commit()
+        db.close()
+
+    for threads in (1, 2, 4, 8):
+        # Previous behaviour: all the threads share one connection
+        engine = Generic(factory())
+        engine.parse_string("SELECT value FROM benchmark_pool LIMIT 1;",
+                            "value")
+        shared = max(run(engine, threads) for _ in xrange(3))
+
+        pool = ConnectionPool(factory, max_size=threads)
+        engine = Generic(pool)
+        engine.parse_string("SELECT value FROM benchmark_pool LIMIT 1;",
+                            "value")
+        pooled = max(run(engine, threads) for _ in xrange(3))
+        pool.close()
+
+        print "%s, threads: %s\nPool: %d queries/sec\n" \
+              "One connection (previous behaviour): %d queries/sec" % (
+            db_name, threads, pooled, shared
+        )
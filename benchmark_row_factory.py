@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+import sqlite3
+import timeit
+
+try:
+    import apsw
+except ImportError:
+    apsw = None
+
+from antiorm import AntiORM
+from antiorm.utils import namedtuple_factory
+
+ROWS = 100000
+
+
+# Previous behaviour of the row factory, a new namedtuple class for each row
+def uncached_factory(cursor, row):
+    try:
+        description = cursor.description
+    except AttributeError:
+        description = cursor.getdescription()
+
+    return namedtuple('namedtuple', (col[0] for col in description))(*row)
+
+
+def fill(db):
+    cursor = db.cursor()
+    cursor.execute("CREATE TABLE test (name TEXT, surname TEXT);")
+    cursor.execute("BEGIN;")
+    cursor.executemany("INSERT INTO test VALUES (?, ?);",
+                       [('name%s' % index, 'surname%s' % index)
+                        for index in xrange(ROWS)])
+    cursor.execute("COMMIT;")
+
+
+connections = [('sqlite3', sqlite3.connect(":memory:", isolation_level=None))]
+if apsw:
+    connections.append(('APSW', apsw.Connection(":memory:")))
+else:
+    print "APSW not installed, skipping it"
+
+for db_name, db in connections:
+    fill(db)
+
+    engine = AntiORM(db)
+    engine.parse_string("SELECT name, surname FROM test;", "test")
+
+    # The uncached factory is too slow, use only 1% of the rows
+    number = 3
+    for name, row_factory, limit in (('No row factory', None, ROWS),
+                                     ('Uncached namedtuple', uncached_factory,
+                                      ROWS // 100),
+                                     ('Cached namedtuple', namedtuple_factory,
+                                      ROWS)):
+        engine.parse_string("SELECT name, surname FROM test LIMIT %d;" % limit,
+                            "test")
+        engine.row_factory = row_factory
+
+        t = timeit.Timer(engine.test)
+        total = min(t.repeat(3, number))
+
+        print "%s, %s:\nTotal: %s seconds\nRows/sec: %d" % (
+            db_name, name, total, number * limit / total
+        )
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Reads/sec done by several threads sharing a SQLite engine on a WAL database,
+with one connection for each thread and with only one shared connection
+
+sqlite3 releases the GIL while running the statements, so the reads of
+different connections run in parallel.
+"""
+
+from os.path   import join
+from shutil    import rmtree
+from tempfile  import mkdtemp
+from thread    import allocate_lock
+from threading import Thread
+from time      import time
+
+from antiorm.backends.sqlite import Sqlite
+from antiorm.pool            import ThreadLocalConnection
+import sqlite3
+
+ROWS = 100000
+QUERIES = 40
+
+SQL = "SELECT count(*) FROM benchmark WHERE value % :modulo = 0;"
+
+
+def run(engine, threads):
+    def worker():
+        for index in xrange(QUERIES):
+            engine.count(7)
+
+    threads = [Thread(target=worker) for index in xrange(threads)]
+
+    start = time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return len(threads) * QUERIES / (time() - start)
+
+
+class LockedConnection(object):
+    "Connection shared by all the threads, serialized with a lock"
+    def __init__(self, connection):
+        self.connection = connection
+        self.lock = allocate_lock()
+
+    def __enter__(self):
+        self.lock.acquire()
+        return self.connection.__enter__()
+
+    def __exit__(self, *exc_info):
+        try:
+            return self.connection.__exit__(*exc_info)
+        finally:
+            self.lock.release()
+
+
+dir_path = mkdtemp()
+db_path = join(dir_path, 'benchmark.db')
+
+db = sqlite3.connect(db_path)
+db.execute("PRAGMA journal_mode=WAL")
+db.execute("CREATE TABLE benchmark (value INTEGER)")
+db.executemany("INSERT INTO benchmark VALUES (?)",
+               ((index,) for index in xrange(ROWS)))
+db.commit()
+db.close()
+
+for threads in (1, 2, 4, 8):
+    connection = ThreadLocalConnection(lambda: sqlite3.connect(db_path),
+                                       ["PRAGMA journal_mode=WAL"])
+    engine = Sqlite(connection)
+    engine.parse_string(SQL, "count")
+    thread_local = max(run(engine, threads) for _ in xrange(3))
+    connection.close()
+
+    # Previous behaviour: only one connection, that must be serialized
+    connection = sqlite3.connect(db_path, check_same_thread=False)
+    engine = Sqlite(connection)
+    engine.parse_string(SQL, "count")
+    engine.tx_manager = LockedConnection(connection)
+    shared = max(run(engine, threads) for _ in xrange(3))
+    connection.close()
+
+    print "Threads: %s\nThread local connections: %d reads/sec\n" \
+          "Shared connection (previous behaviour): %d reads/sec" % (
+        threads, thread_local, shared
+    )
+
+rmtree(dir_path)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Inserts/sec of single row method calls on a file-backed SQLite database, done
+inside an explicit transaction and on their own (committing each call)
+"""
+
+from os.path  import join
+from shutil   import rmtree
+from tempfile import mkdtemp
+from time     import time
+
+from antiorm.backends.sqlite import Sqlite
+import sqlite3
+
+ROWS = 2000
+
+SQL = "INSERT INTO benchmark VALUES (:value);"
+
+
+def run(engine, transaction):
+    engine.connection.execute("DELETE FROM benchmark")
+    engine.connection.commit()
+
+    start = time()
+
+    if transaction:
+        with engine.transaction():
+            for index in xrange(ROWS):
+                engine.insert(index)
+    else:
+        for index in xrange(ROWS):
+            engine.insert(index)
+
+    return ROWS / (time() - start)
+
+
+dir_path = mkdtemp()
+
+connection = sqlite3.connect(join(dir_path, 'benchmark.db'))
+connection.execute("PRAGMA synchronous=FULL")
+connection.execute("CREATE TABLE benchmark (value INTEGER)")
+connection.commit()
+
+engine = Sqlite(connection)
+engine.parse_string(SQL, "insert")
+
+scope = max(run(engine, True) for _ in xrange(3))
+
+# Previous behaviour: each call commits its own transaction
+calls = max(run(engine, False) for _ in xrange(3))
+
+print "Inside engine.transaction(): %d inserts/sec\n" \
+      "Committing each call (previous behaviour): %d inserts/sec" % (
+    scope, calls
+)
+
+connection.close()
+rmtree(dir_path)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+from multiprocessing import cpu_count
+from os              import listdir
+from os.path         import join
+from shutil          import rmtree
+from tempfile        import mkdtemp
+
+from antiorm import AntiORM
+import sqlite3
+import timeit
+
+SAMPLES = "./tests/samples_sql"
+FILES = 5000
+
+
+if __name__ == '__main__':
+    # Build a big dir of SQL files using the samples ones as templates
+    dir_path = mkdtemp()
+    samples = sorted(listdir(SAMPLES))
+    for index in range(FILES):
+        sample = samples[index % len(samples)]
+
+        with open(join(SAMPLES, sample)) as file_sql:
+            sql = file_sql.read().replace('test_', 'test%s_' % index)
+        with open(join(dir_path, "%s_%s" % (index, sample)), 'w') as file_sql:
+            file_sql.write(sql)
+
+    for workers in sorted(set((1, 2, 4, cpu_count()))):
+        def time_funct():
+            db = sqlite3.connect(":memory:")
+            engine = AntiORM(db, dir_path, workers=workers)
+
+        number=3
+        t = timeit.Timer(time_funct)
+        total = t.timeit(number=number)
+
+        print "Workers: %s\nTotal: %s seconds\nPartial: %.4f msec/pass (%s files)" % (
+            workers, total, 1000 * total/number, FILES
+        )
+
+    rmtree(dir_path)
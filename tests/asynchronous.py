@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+from gc       import collect
+from os.path  import join
+from shutil   import rmtree
+from sqlite3  import connect
+from tempfile import mkdtemp
+from thread   import get_ident
+from unittest import main, TestCase
+
+import sys
+sys.path.insert(0, '..')
+
+from antiorm.asynchronous    import AsyncAntiORM
+from antiorm.backends.sqlite import Sqlite
+
+
+class TestAsync(TestCase):
+    "Test for the asynchronous engine"
+
+    def setUp(self):
+        self.tmp_path = mkdtemp()
+        db_path = join(self.tmp_path, 'db')
+
+        self.threads = set()
+
+        def factory():
+            self.threads.add(get_ident())
+            return connect(db_path, timeout=10)
+
+        self.engine = AsyncAntiORM(factory, workers=2, chunk_size=10,
+                                   pragmas=["PRAGMA journal_mode=WAL"])
+        self.engine.parse_string("CREATE TABLE numbers (value INTEGER);",
+                                 "create")
+        self.engine.parse_string("INSERT INTO numbers VALUES (:value);",
+                                 "insert")
+        self.engine.parse_string("SELECT value FROM numbers "
+                                 "WHERE value >= :start ORDER BY value;",
+                                 "numbers")
+        self.engine.parse_string("SELECT value FROM missing "
+                                 "WHERE value >= :start;", "missing")
+
+        self.engine.create().get()
+        self.engine.insert.many([{'value': value}
+                                 for value in xrange(100)]).get()
+
+    def tearDown(self):
+        self.engine.close()
+        rmtree(self.tmp_path)
+
+    def test_engine(self):
+        self.assertIsInstance(self.engine.engine, Sqlite)
+        self.assertIs(self.engine.numbers, self.engine.numbers)
+
+    def test_calls(self):
+        results = [self.engine.numbers(start) for start in xrange(0, 100, 10)]
+        results.append(self.engine.numbers.one({'start': 95}))
+
+        self.assertListEqual([len(result.get()) for result in results],
+                             [100, 90, 80, 70, 60, 50, 40, 30, 20, 10, 5])
+
+        # Main thread and the workers, each one with its own connection
+        self.assertLessEqual(len(self.threads), 3)
+
+    def test_errors(self):
+        result = self.engine.missing(0)
+
+        self.assertRaises(Exception, result.get)
+        self.assertFalse(result.successful())
+
+    def test_iter(self):
+        rows = self.engine.numbers.iter({'start': 5}, prefetch=1)
+
+        self.assertListEqual(list(rows), [(value,) for value in xrange(5, 100)])
+        self.assertRaises(StopIteration, next, rows)
+
+        self.assertRaises(Exception, list,
+                          self.engine.missing.iter({'start': 0}))
+
+    def test_iter_close(self):
+        rows = self.engine.numbers.iter({'start': 0}, prefetch=1)
+        self.assertEqual(next(rows), (0,))
+        rows.close()
+
+        self.assertRaises(StopIteration, next, rows)
+
+        # The threads are released
+        results = [self.engine.numbers(99) for index in xrange(4)]
+        self.assertListEqual([result.get(5) for result in results],
+                             [[(99,)]] * 4)
+
+
+    def test_iter_dropped(self):
+        for index in xrange(2):
+            rows = self.engine.numbers.iter({'start': 0}, prefetch=1)
+            self.assertEqual(next(rows), (0,))
+        del rows
+        collect()
+
+        # The threads are released without closing the iterators
+        self.assertListEqual(self.engine.numbers(99).get(5), [(99,)])
+
+
+if __name__ == "__main__":
+    main()
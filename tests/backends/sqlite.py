@@ -5,13 +5,22 @@ try:
 except ImportError:
     from unittest2 import main, skip, TestCase
 
-from sqlite3 import connect
+from inspect   import getargspec
+from os.path   import join
+from shutil    import rmtree
+from sqlite3   import connect, InterfaceError, register_adapter
+from tempfile  import mkdtemp
+from threading import Thread
 
 import sys
 sys.path.insert(0, '..')
 
-from antiorm.backends.generic import Generic
+import antiorm.base
+
+from antiorm.backends.generic import Generic, GenericConnection
 from antiorm.backends.sqlite  import Sqlite
+from antiorm.base             import MISSING, psycopg2_server_cursor
+from antiorm.catalog          import QueryCatalog
 from antiorm.utils            import driver_factory
 
 from base import Base
@@ -59,6 +68,858 @@ class Driver__ByPass__LazyLoading(TestFactory, TestCase):
         TestFactory.setUp(self)
 
 
+class Driver__Workers(TestFactory, TestCase):
+    "Test for the AntiORM SQLite driver"
+    def setUp(self):
+        self.connection = connect(":memory:")
+        self.engine = driver_factory(self.connection, self.dir_path,
+                                     workers=2)
+
+        TestFactory.setUp(self)
+
+
+class Driver__Catalog(TestFactory, TestCase):
+    "Test for the AntiORM SQLite driver"
+    def setUp(self):
+        self.connection = connect(":memory:")
+        self.engine = driver_factory(self.connection,
+                                     catalog=QueryCatalog(self.dir_path))
+
+        TestFactory.setUp(self)
+
+
+class Driver__Named(TestFactory, TestCase):
+    "Test for the AntiORM SQLite driver"
+    def setUp(self):
+        self.connection = connect(":memory:")
+        self.engine = driver_factory(self.connection, self.dir_path,
+                                     positional=False)
+
+        TestFactory.setUp(self)
+
+
+class TracedConnection(object):
+    "Connection wrapper that store the executed statements"
+    def __init__(self, connection):
+        self.connection = connection
+        self.statements = []
+        self.transactions = 0
+
+    def __enter__(self):
+        self.connection.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.transactions += 1
+        return self.connection.__exit__(*exc_info)
+
+    def cursor(self):
+        cursor = self.connection.cursor()
+        statements = self.statements
+
+        class TracedCursor(object):
+            def execute(self, sql, *args):
+                statements.append(sql)
+                return cursor.execute(sql, *args)
+
+            def __getattr__(self, name):
+                return getattr(cursor, name)
+
+        return TracedCursor()
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+
+class BulkInsert(TestCase):
+    "Test for the AntiORM SQLite bulk INSERTs"
+    def setUp(self):
+        self.connection = connect(":memory:")
+        self.connection.execute("CREATE TABLE users "
+                                "(id INTEGER PRIMARY KEY, name TEXT)")
+
+        self.engine = Sqlite(self.connection)
+
+    def test_rowid_range(self):
+        self.engine.parse_string("INSERT INTO users (name) VALUES (:name);",
+                                 "insert")
+
+        rowids = self.engine.insert.many([{'name': 'Lawrence'},
+                                          {'name': 'Linda'}])
+
+        self.assertTrue(self.engine._rowid_ranges.values()[0])
+        self.assertSequenceEqual(
+            self.connection.execute("SELECT id FROM users").fetchall(),
+            [(rowid,) for rowid in rowids])
+
+    def test_multirow_max_variables(self):
+        self.engine.parse_string("INSERT INTO users (id, name) "
+                                 "VALUES (:id, :name);", "insert")
+        self.engine.max_variables = 5
+
+        rows = [{'id': index, 'name': str(index)} for index in range(5)]
+
+        self.engine.tx_manager = TracedConnection(self.connection)
+
+        self.assertIsNone(self.engine.insert.many(rows, False, True))
+
+        self.assertEqual(len(self.engine.tx_manager.statements), 3)
+        self.assertSequenceEqual(
+            self.connection.execute("SELECT * FROM users").fetchall(),
+            [(index, unicode(index)) for index in range(5)])
+
+    def test_load_commit_every(self):
+        self.engine.parse_string("INSERT INTO users (name) VALUES (:name);",
+                                 "insert")
+        self.engine.tx_manager = TracedConnection(self.connection)
+
+        rows = ({'name': str(index)} for index in xrange(10))
+        self.assertEqual(self.engine.insert.load(rows, 4, rowids=False), 10)
+
+        self.assertEqual(self.engine.tx_manager.transactions, 3)
+
+    def test_explicit_rowid(self):
+        self.engine.parse_string("INSERT INTO users (id, name) "
+                                 "VALUES (:id, :name);", "insert")
+
+        rowids = self.engine.insert.many([{'id': 7, 'name': 'Lawrence'},
+                                          {'id': 3, 'name': 'Linda'}])
+
+        self.assertFalse(self.engine._rowid_ranges.values()[0])
+        self.assertListEqual(rowids, [7, 3])
+
+    def test_returning(self):
+        self.engine.parse_string("INSERT INTO users (name) VALUES (:name);",
+                                 "insert")
+        self.engine.connection.execute("INSERT INTO users VALUES (5, 'Ann')")
+        self.engine.max_variables = 2
+
+        # PostgreSQL primary key (SQLite also support RETURNING)
+        self.engine._primary_key = lambda cursor, sql: '"id"'
+        self.engine.tx_manager = TracedConnection(self.connection)
+
+        rowids = self.engine.insert.many({'name': str(index)}
+                                         for index in range(5))
+
+        self.assertListEqual(rowids, [6, 7, 8, 9, 10])
+        self.assertEqual(len(self.engine.tx_manager.statements), 3)
+        self.assertTrue(self.engine.tx_manager.statements[0].endswith(
+                        ' RETURNING "id";'))
+
+    def test_primary_key(self):
+        class Cursor(object):
+            def __init__(self):
+                self.executed = []
+                self.result = (False, [])
+
+            def execute(self, sql, args):
+                self.executed.append(args)
+
+            def fetchone(self):
+                return self.result
+
+        self.engine._primary_keys = {}
+        cursor = Cursor()
+
+        sql = "INSERT INTO users (name) VALUES (%s);"
+
+        # Table not found, check it again on next call
+        self.assertIsNone(self.engine._primary_key(cursor, sql))
+
+        cursor.result = (True, ['id'])
+        self.assertEqual(self.engine._primary_key(cursor, sql), '"id"')
+        self.assertEqual(self.engine._primary_key(cursor, sql), '"id"')
+        self.assertListEqual(cursor.executed, [('users', 'users')] * 2)
+
+        # Compound primary keys and other statements don't return the row ids
+        cursor.result = (True, ['user', 'email'])
+        self.assertIsNone(self.engine._primary_key(
+            cursor, "INSERT INTO emails VALUES (%s, %s);"))
+        self.assertIsNone(self.engine._primary_key(
+            cursor, "INSERT INTO users SELECT * FROM users;"))
+        self.assertEqual(len(cursor.executed), 3)
+
+
+class BulkMultipleInsert(TestCase):
+    "Test for the AntiORM SQLite bulk INSERTs of several statements"
+    def setUp(self):
+        self.connection = connect(":memory:")
+        self.connection.execute("CREATE TABLE users "
+                                "(id INTEGER PRIMARY KEY, name TEXT)")
+        self.connection.execute("CREATE TABLE emails "
+                                "(user INTEGER, email TEXT)")
+
+        self.engine = Sqlite(self.connection)
+        self.engine.tx_manager = TracedConnection(self.connection)
+
+    def test_statement_major(self):
+        self.engine.parse_string("INSERT INTO users (name) VALUES (:name);"
+                                 "INSERT INTO emails VALUES (:id, :email);",
+                                 "insert")
+
+        rowids = self.engine.insert.many([{'id': 1, 'name': 'Lawrence',
+                                           'email': 'lawrence@example.com'},
+                                          {'id': 2, 'name': 'Linda',
+                                           'email': 'linda@example.com'}])
+
+        self.assertListEqual(rowids, [1, 2])
+        self.assertEqual(self.engine.tx_manager.transactions, 1)
+
+        # Only the pragma and the last row id queries are executed one by one
+        self.assertListEqual(self.engine.tx_manager.statements,
+                             ["SELECT name, type, pk "
+                              "FROM pragma_table_info(?)",
+                              "SELECT last_insert_rowid()"])
+        self.assertSequenceEqual(
+            self.connection.execute("SELECT * FROM emails").fetchall(),
+            [(1, u'lawrence@example.com'), (2, u'linda@example.com')])
+
+    def test_last_insert_rowid(self):
+        self.engine.parse_string("INSERT INTO users (name) VALUES (:name);"
+                                 "INSERT INTO emails "
+                                 "VALUES (last_insert_rowid(), :email);",
+                                 "insert")
+
+        rowids = self.engine.insert.many([{'name': 'Lawrence',
+                                           'email': 'lawrence@example.com'},
+                                          {'name': 'Linda',
+                                           'email': 'linda@example.com'}])
+
+        self.assertListEqual(rowids, [1, 2])
+        self.assertSequenceEqual(
+            self.connection.execute("SELECT * FROM emails").fetchall(),
+            [(1, u'lawrence@example.com'), (2, u'linda@example.com')])
+
+
+class MultipleStatement(TestCase):
+    "Test for the AntiORM SQLite multiple statement methods"
+    def setUp(self):
+        self.connection = connect(":memory:")
+        self.connection.execute("CREATE TABLE users "
+                                "(id INTEGER PRIMARY KEY, name TEXT)")
+
+        self.engine = Sqlite(self.connection)
+        self.engine.parse_string("UPDATE users SET name = :name || '!' "
+                                 "WHERE id = :id;"
+                                 "INSERT INTO users VALUES (:id, :name);",
+                                 "upsert")
+
+        self.engine.tx_manager = TracedConnection(self.connection)
+
+    def test_binded(self):
+        self.engine.upsert.many([{'id': 1, 'name': "O'Hara"},
+                                 {'id': 2, 'name': "Robert'); DROP TABLE"}])
+
+        self.assertSetEqual(set(self.engine.tx_manager.statements),
+                            set(["UPDATE users SET name=? || '!' WHERE id=?;",
+                                 "INSERT INTO users VALUES(?,?);"]))
+        self.assertSequenceEqual(
+            self.connection.execute("SELECT * FROM users").fetchall(),
+            [(1, u"O'Hara"), (2, u"Robert'); DROP TABLE")])
+
+    def test_rollback(self):
+        with self.assertRaises(Exception):
+            self.engine.upsert.many([{'id': 1, 'name': 'Lawrence'},
+                                     {'id': 1, 'name': 'Linda'}])
+
+        self.assertListEqual(
+            self.connection.execute("SELECT * FROM users").fetchall(), [])
+
+    def test_parameters(self):
+        self.engine.parse_string("INSERT INTO users VALUES (:id, :name);"
+                                 "UPDATE users SET name = name || :suffix "
+                                 "WHERE id = :id;", "register")
+
+        # The parameters of all the statements are expected
+        self.engine.register.one({'id': 1, 'name': 'Ann', 'suffix': '!'})
+        self.assertRaises(TypeError, self.engine.register.one,
+                          {'id': 2, 'name': 'Bob'})
+
+        self.assertListEqual(
+            self.connection.execute("SELECT * FROM users").fetchall(),
+            [(1, u'Ann!')])
+
+
+class TableIterator(TestCase):
+    "Test for the AntiORM SQLite lazy table methods"
+    def setUp(self):
+        self.connection = connect(":memory:")
+        self.connection.execute("CREATE TABLE numbers (value INTEGER)")
+
+        self.engine = Sqlite(self.connection, chunk_size=100)
+        self.engine.parse_string("SELECT value FROM numbers "
+                                 "WHERE value >= :start;", "numbers")
+
+    def fill(self, rows):
+        self.connection.execute("DELETE FROM numbers")
+        self.connection.executemany("INSERT INTO numbers VALUES (?)",
+                                    ((index,) for index in xrange(rows)))
+        self.connection.commit()
+
+    def peak_rows(self, rows):
+        "Get the maximum number of rows alive at once while iterating"
+        self.fill(rows)
+
+        class Row(tuple):
+            alive = 0
+            peak = 0
+
+            def __new__(cls, cursor, row):
+                Row.alive += 1
+                Row.peak = max(Row.peak, Row.alive)
+                return tuple.__new__(cls, row)
+
+            def __del__(self):
+                Row.alive -= 1
+
+        self.engine.row_factory = Row
+
+        count = 0
+        for row in self.engine.numbers.iter({'start': 0}):
+            count += 1
+        del row
+
+        self.assertEqual(count, rows)
+        self.assertEqual(Row.alive, 0)
+        return Row.peak
+
+    def test_flat_memory(self):
+        self.assertLessEqual(self.peak_rows(1000), 101)
+        self.assertEqual(self.peak_rows(10000), self.peak_rows(1000))
+
+    def test_close(self):
+        self.fill(1000)
+
+        rows = self.engine.numbers.iter({'start': 0})
+        self.assertEqual(next(rows), (0,))
+        rows.close()
+
+        # The generator is finished and the connection can be used again
+        self.assertRaises(StopIteration, next, rows)
+        self.assertListEqual(list(self.engine.numbers.iter({'start': 999})),
+                             [(999,)])
+
+    def test_nested_calls(self):
+        connection = connect(":memory:", check_same_thread=False)
+        connection.execute("CREATE TABLE numbers (value INTEGER)")
+        connection.executemany("INSERT INTO numbers VALUES (?)",
+                               [(0,), (1,), (2,)])
+
+        engine = Generic(connection)
+        engine.parse_string("SELECT value FROM numbers "
+                            "WHERE value >= :start;", "numbers")
+        engine.parse_string("SELECT value * 2 FROM numbers "
+                            "WHERE value = :value LIMIT 1;", "double")
+
+        # Calls done while iterating don't wait for the transaction lock
+        result = []
+
+        def iterate():
+            for row in engine.numbers.iter({'start': 0}):
+                result.append(engine.double(row[0]))
+
+        thread = Thread(target=iterate)
+        thread.daemon = True
+        thread.start()
+        thread.join(5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertListEqual(result, [0, 2, 4])
+
+    def test_server_side(self):
+        self.fill(10)
+
+        cursors = []
+
+        def server_cursor(conn, itersize):
+            cursors.append(itersize)
+            return conn.cursor()
+
+        self.engine._server_cursor = server_cursor
+        self.engine.itersize = 3
+
+        self.assertEqual(len(list(self.engine.numbers.iter({'start': 0}))), 10)
+        self.assertListEqual(cursors, [])
+
+        self.engine.server_side = True
+
+        self.assertEqual(len(list(self.engine.numbers.iter({'start': 0}))), 10)
+        self.assertListEqual(cursors, [3])
+
+    def test_nested_server_side(self):
+        connection = connect(":memory:")
+        connection.execute("CREATE TABLE numbers (value INTEGER)")
+        connection.executemany("INSERT INTO numbers VALUES (?)",
+                               [(0,), (1,), (2,)])
+        connection.commit()
+
+        engine = Generic(connection, server_side=True)
+        engine._server_cursor = lambda conn, itersize: conn.cursor()
+        engine.parse_string("SELECT value FROM numbers "
+                            "WHERE value >= :start;", "numbers")
+        engine.parse_string("SELECT value * 2 FROM numbers "
+                            "WHERE value = :value LIMIT 1;", "double")
+
+        # Calls done while iterating can't use the connection of the server
+        # side cursor, since they would commit on it
+        rows = engine.numbers.iter({'start': 0})
+        self.assertEqual(next(rows), (0,))
+        self.assertRaises(RuntimeError, engine.double, 0)
+
+        # The connection can be used again once the cursor is released
+        rows.close()
+        self.assertEqual(engine.double(1), 2)
+
+    def test_psycopg2_server_cursor(self):
+        class NamedCursor(object):
+            def __init__(self, name):
+                self.name = name
+                self.itersize = 2000
+
+            def execute(self, sql, args):
+                pass
+
+            executemany = execute
+
+        class Connection(object):
+            def cursor(self, name=None):
+                return NamedCursor(name)
+
+        first = psycopg2_server_cursor(Connection(), 50)
+        second = psycopg2_server_cursor(GenericConnection(Connection()), 50)
+
+        self.assertEqual(first.itersize, 50)
+        self.assertEqual(second._cursor.itersize, 50)
+        self.assertNotEqual(first.name, second.name)
+
+
+class BatchLookup(TestCase):
+    "Test for the AntiORM SQLite batched lookups"
+    def setUp(self):
+        self.connection = connect(":memory:")
+        self.connection.execute("CREATE TABLE users "
+                                "(id INTEGER PRIMARY KEY, name TEXT)")
+        self.connection.executemany("INSERT INTO users VALUES (?, ?)",
+                                    [(1, 'Lawrence'), (2, 'Linda'),
+                                     (3, '4')])
+
+        self.engine = Sqlite(self.connection)
+        self.engine.parse_string("SELECT name FROM users WHERE id = :id "
+                                 "LIMIT 1;", "name")
+        self.engine.parse_string("SELECT * FROM users WHERE id = :id "
+                                 "LIMIT 1;", "user")
+
+        self.engine.tx_manager = TracedConnection(self.connection)
+
+    def test_value(self):
+        self.engine.chunk_size = 2
+
+        self.assertListEqual(
+            self.engine.name.many([{'id': 2}, {'id': 1}, {'id': 2},
+                                   {'id': 3}]),
+            [u'Linda', u'Lawrence', u'Linda', u'4'])
+        self.assertEqual(len(self.engine.tx_manager.statements), 2)
+
+    def test_register(self):
+        self.assertListEqual(self.engine.user.many([{'id': 3}, {'id': 1}]),
+                             [(3, u'4'), (1, u'Lawrence')])
+        self.assertEqual(len(self.engine.tx_manager.statements), 1)
+
+    def test_misses(self):
+        self.assertListEqual(self.engine.user.many([{'id': 7}, {'id': 1}]),
+                             [None, (1, u'Lawrence')])
+        self.assertEqual(len(self.engine.tx_manager.statements), 2)
+
+    def test_affinity(self):
+        self.engine.parse_string("SELECT id FROM users WHERE name = :name "
+                                 "LIMIT 1;", "user_id")
+
+        self.assertListEqual(self.engine.user_id.many([{'name': 4},
+                                                       {'name': 'Linda'}]),
+                             [3, 2])
+
+    def test_row_factory(self):
+        self.engine.row_factory = lambda cursor, row: list(row)
+
+        self.assertListEqual(self.engine.user.many([{'id': 2}, {'id': 1}]),
+                             [[2, u'Linda'], [1, u'Lawrence']])
+        self.assertEqual(len(self.engine.tx_manager.statements), 2)
+
+    def test_aggregates(self):
+        self.connection.executemany("INSERT INTO users (name) VALUES (?)",
+                                    [('Linda',), ('Linda',)])
+        self.engine.parse_string("SELECT count(*) FROM users "
+                                 "WHERE name = :name LIMIT 1;", "count")
+        self.engine.parse_string("SELECT max(id), min(id) FROM users "
+                                 "WHERE name = :name LIMIT 1;", "range")
+        self.engine.parse_string("SELECT DISTINCT name FROM users "
+                                 "WHERE name = :name LIMIT 1;", "distinct")
+
+        # Aggregates are evaluated for each value, not over all the rows
+        names = [{'name': 'Linda'}, {'name': 'Lawrence'}]
+
+        self.assertListEqual(self.engine.count.many(names), [3, 1])
+        self.assertListEqual(self.engine.range.many(names),
+                             [(5, 2), (1, 1)])
+        self.assertListEqual(self.engine.distinct.many(names),
+                             [u'Linda', u'Lawrence'])
+        self.assertEqual(len(self.engine.tx_manager.statements), 6)
+
+    def test_plain_columns(self):
+        self.engine.parse_string("SELECT u.id AS key, u.name FROM users u "
+                                 "WHERE u.id = :id LIMIT 1;", "aliased")
+
+        self.assertListEqual(self.engine.aliased.many([{'id': 2}, {'id': 1}]),
+                             [(2, u'Linda'), (1, u'Lawrence')])
+        self.assertEqual(len(self.engine.tx_manager.statements), 1)
+
+
+class Blob(bytearray):
+    "Iterable value bound by the driver (like bytearray on Python 3)"
+
+register_adapter(Blob, buffer)
+
+
+class SpecializedCalls(TestCase):
+    "Test for the AntiORM SQLite methods with the parameters as arguments"
+    def setUp(self):
+        self.connection = connect(":memory:")
+        self.connection.execute("CREATE TABLE blobs (data BLOB, size INTEGER)")
+
+        self.engine = Sqlite(self.connection)
+        self.engine.parse_string("INSERT INTO blobs VALUES (:data, :size);",
+                                 "insert")
+
+    def rows(self):
+        return [(str(data), size)
+                for data, size in self.connection.execute(
+                    "SELECT data, size FROM blobs ORDER BY rowid")]
+
+    def test_iterable_keyword(self):
+        self.engine.insert(data=Blob('ab'), size=2)
+        self.engine.insert(size=1, data=Blob('c'))
+
+        self.assertListEqual(self.rows(), [('ab', 2), ('c', 1)])
+
+        # Lists given by keyword are values, not a list of dicts
+        self.assertRaises(InterfaceError, self.engine.insert, data=[1, 2],
+                          size=2)
+        self.assertRaises(InterfaceError, self.engine.insert,
+                          data=[{'data': 'd', 'size': 1}], size=1)
+
+    def test_iterable_positional(self):
+        self.engine.insert(Blob('ab'), 2)
+        self.engine.insert([{'data': 'c', 'size': 1},
+                            {'data': 'de', 'size': 2}])
+        self.engine.insert({'data': 'f', 'size': 1})
+
+        self.assertListEqual(self.rows(), [('ab', 2), ('c', 1), ('de', 2),
+                                           ('f', 1)])
+
+    def test_signature(self):
+        self.assertEqual(getargspec(self.engine.insert.func),
+                         (['self', 'data', 'size'], '_args', None,
+                          (MISSING, MISSING)))
+        self.assertEqual(self.engine.insert.__name__, 'insert')
+
+    def test_shared_code(self):
+        self.engine.parse_string("INSERT INTO blobs (data, size) "
+                                 "VALUES (:data, :size);", "insert_columns")
+        self.engine.parse_string("INSERT INTO blobs (size, data) "
+                                 "VALUES (:data, :size);", "insert_swapped")
+
+        # Methods with the same kind and parameters use the same code
+        engine = Sqlite(self.connection)
+        engine.parse_string("INSERT INTO blobs VALUES (:data, :size);",
+                            "insert")
+
+        self.assertIs(engine.insert.func.func_code,
+                      self.engine.insert.func.func_code)
+        self.assertIs(self.engine.insert_columns.func.func_code,
+                      self.engine.insert_swapped.func.func_code)
+
+        self.engine.insert_columns('a', 1)
+        self.engine.insert_swapped(2, 'b')
+        self.assertListEqual(self.rows(), [('a', 1), ('b', 2)])
+
+    def test_arguments_errors(self):
+        self.assertRaises(TypeError, self.engine.insert, 'a', 1, 2)
+        self.assertRaises(TypeError, self.engine.insert, 'a', 1, data='b')
+        self.assertRaises(TypeError, self.engine.insert, 'a')
+
+    def assertParametersError(self, message, func, *args, **kwargs):
+        with self.assertRaises(TypeError) as context:
+            func(*args, **kwargs)
+
+        self.assertEqual(str(context.exception),
+                         "insert() got wrong parameters: " + message)
+
+    def test_missing_parameters(self):
+        self.assertParametersError("missing 'size'", self.engine.insert.one,
+                                   {'data': 'a'})
+        self.assertParametersError("missing 'data', 'size'",
+                                   self.engine.insert.many,
+                                   [{'data': 'a', 'size': 1}, {}])
+        self.assertParametersError("missing 'size'", self.engine.insert,
+                                   {'data': 'a'})
+
+        self.assertListEqual(self.rows(), [])
+
+    def test_unexpected_parameters(self):
+        self.assertParametersError("unexpected 'extra'",
+                                   self.engine.insert.one,
+                                   {'data': 'a', 'size': 1, 'extra': True})
+        self.assertParametersError("missing 'size'; unexpected 'length'",
+                                   self.engine.insert.one,
+                                   {'data': 'a', 'length': 1})
+        self.assertParametersError("unexpected 'extra'",
+                                   self.engine.insert,
+                                   [{'data': 'a', 'size': 1, 'extra': True}])
+
+        self.assertRaises(TypeError, self.engine.insert, data='a', size=1,
+                          extra=True)
+
+
+class GenericRowFactory(TestCase):
+    "Test for the row factory of the AntiORM generic driver cursors"
+    def setUp(self):
+        self.connection = connect(":memory:")
+        self.connection.execute("CREATE TABLE numbers (value INTEGER)")
+        self.connection.executemany("INSERT INTO numbers VALUES (?)",
+                                    [(1,), (2,), (3,)])
+
+        self.engine = Generic(self.connection)
+        self.engine.row_factory = lambda cursor, row: (cursor.description[0][0],
+                                                       row[0])
+
+    def test_fetch(self):
+        cursor = self.engine.connection.cursor()
+        cursor.execute("SELECT value FROM numbers")
+
+        self.assertEqual(cursor.fetchone(), ('value', 1))
+        self.assertListEqual(cursor.fetchmany(1), [('value', 2)])
+        self.assertListEqual(cursor.fetchall(), [('value', 3)])
+        self.assertIsNone(cursor.fetchone())
+        self.assertListEqual(cursor.fetchall(), [])
+
+
+class ReadReplicas(TestCase):
+    "Test for the AntiORM SQLite read only methods executed on replicas"
+    def setUp(self):
+        self.dir_path = mkdtemp()
+        db_path = join(self.dir_path, 'replicas.db')
+
+        self.connection = connect(db_path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE numbers (value INTEGER)")
+        self.connection.executemany("INSERT INTO numbers VALUES (?)",
+                                    [(1,), (2,), (3,)])
+        self.connection.commit()
+
+        # Read only connections to the same database
+        self.readers = [connect('file:%s?mode=ro' % db_path)
+                        for index in xrange(2)]
+
+        self.engine = Sqlite(self.connection, replicas=self.readers)
+        self.engine.parse_string("SELECT count(*) FROM numbers LIMIT 1;",
+                                 "count")
+        self.engine.parse_string("SELECT value FROM numbers "
+                                 "WHERE value >= :start;", "numbers")
+        self.engine.parse_string("INSERT INTO numbers VALUES (:value);",
+                                 "insert")
+
+        self.engine.tx_manager = TracedConnection(self.connection)
+        for replica, reader in zip(self.engine.replicas, self.readers):
+            replica.tx_manager = TracedConnection(reader)
+
+    def tearDown(self):
+        for reader in self.readers:
+            reader.close()
+        self.connection.close()
+
+        rmtree(self.dir_path)
+
+    def transactions(self):
+        "Get the transactions done on the primary and on each replica"
+        return [self.engine.tx_manager.transactions] \
+             + [replica.tx_manager.transactions
+                for replica in self.engine.replicas]
+
+    def test_round_robin(self):
+        self.assertEqual(self.engine.count(), 3)
+        self.assertEqual(self.engine.count.many([{}, {}]), [3, 3])
+        self.assertListEqual(list(self.engine.numbers.iter({'start': 2})),
+                             [(2,), (3,)])
+
+        self.assertListEqual(self.transactions(), [0, 2, 1])
+
+    def test_least_busy(self):
+        engine = Sqlite(self.connection, replicas=self.readers,
+                        balance='least_busy')
+        engine.parse_string("SELECT count(*) FROM numbers LIMIT 1;",
+                            "count")
+        engine.parse_string("SELECT value FROM numbers "
+                            "WHERE value >= :start;", "numbers")
+
+        # The iterator keeps the first replica busy until it's exhausted
+        rows = engine.numbers.iter({'start': 0})
+        self.assertEqual(next(rows), (1,))
+        self.assertListEqual(engine.read_manager.busy, [1, 0])
+
+        self.assertEqual(engine.count(), 3)
+        self.assertEqual(engine.count(), 3)
+        self.assertListEqual(engine.read_manager.busy, [1, 0])
+
+        rows.close()
+        self.assertListEqual(engine.read_manager.busy, [0, 0])
+
+    def test_writes(self):
+        self.engine.insert(4)
+
+        self.assertListEqual(self.transactions(), [1, 0, 0])
+
+        # Committed writes are seen by the replicas
+        self.assertEqual(self.engine.count(), 4)
+        self.assertEqual(self.engine.count(), 4)
+
+    def test_primary_only(self):
+        self.engine.parse_string("PRAGMA user_version;", "user_version")
+        self.engine.parse_string("SELECT count(*) FROM numbers;"
+                                 "SELECT max(value) FROM numbers;", "stats")
+
+        self.engine.user_version()
+        self.engine.stats()
+
+        self.assertListEqual(self.transactions(), [2, 0, 0])
+
+    def test_primary(self):
+        with self.engine.primary():
+            self.engine.insert(4)
+            self.assertEqual(self.engine.count(), 4)
+
+            with self.engine.primary():
+                self.assertListEqual(
+                    list(self.engine.numbers.iter({'start': 4})), [(4,)])
+
+        self.assertListEqual(self.transactions(), [3, 0, 0])
+
+        self.assertEqual(self.engine.count(), 4)
+        self.assertListEqual(self.transactions(), [3, 1, 0])
+
+    def test_row_factory(self):
+        self.engine.row_factory = lambda cursor, row: list(row)
+
+        self.assertListEqual(self.engine.numbers(3), [[3]])
+        self.assertListEqual(self.engine.numbers(3), [[3]])
+
+    def test_transaction(self):
+        self.engine.tx_manager = self.connection
+
+        with self.engine.transaction():
+            self.engine.insert(4)
+            self.assertEqual(self.engine.count(), 4)
+
+        self.assertListEqual([replica.tx_manager.transactions
+                              for replica in self.engine.replicas], [0, 0])
+
+    def test_without_replicas(self):
+        def fail(sql):
+            self.fail("Reads of the query were checked")
+
+        read_only = antiorm.base.read_only
+        antiorm.base.read_only = fail
+
+        try:
+            engine = Sqlite(self.connection)
+            engine.parse_string("SELECT count(*) FROM numbers LIMIT 1;",
+                                "count")
+        finally:
+            antiorm.base.read_only = read_only
+
+        self.assertEqual(engine.count(), 3)
+
+
+class Transactions(TestCase):
+    "Test for the AntiORM SQLite explicit transactions"
+    def setUp(self):
+        self.dir_path = mkdtemp()
+        db_path = join(self.dir_path, 'transactions.db')
+
+        self.connection = connect(db_path)
+        self.connection.execute("CREATE TABLE numbers (value INTEGER)")
+        self.connection.commit()
+
+        # Connection to see only the committed rows
+        self.reader = connect(db_path)
+
+        self.engine = Sqlite(self.connection)
+        self.engine.parse_string("INSERT INTO numbers VALUES (:value);",
+                                 "insert")
+        self.engine.parse_string("SELECT count(*) FROM numbers LIMIT 1;",
+                                 "count")
+
+    def tearDown(self):
+        self.reader.close()
+        self.connection.close()
+
+        rmtree(self.dir_path)
+
+    def committed(self):
+        "Get the committed rows"
+        return self.reader.execute("SELECT value FROM numbers "
+                                   "ORDER BY rowid").fetchall()
+
+    def test_commit_once(self):
+        with self.engine.transaction() as conn:
+            self.assertIs(conn, self.connection)
+            self.assertIsNot(self.engine.tx_manager, self.connection)
+
+            for value in xrange(3):
+                self.engine.insert(value)
+            self.engine.insert.many([{'value': 3}, {'value': 4}])
+
+            # Reads of the transaction see its own writes
+            self.assertEqual(self.engine.count(), 5)
+            self.assertListEqual(self.committed(), [])
+
+        self.assertListEqual(self.committed(),
+                             [(0,), (1,), (2,), (3,), (4,)])
+
+        # The engine is restored when there're no explicit transactions
+        self.assertIs(self.engine.tx_manager, self.connection)
+        self.assertEqual(self.connection.isolation_level, '')
+
+    def test_rollback(self):
+        def transaction():
+            with self.engine.transaction():
+                self.engine.insert(1)
+                raise ValueError
+
+        self.assertRaises(ValueError, transaction)
+        self.assertListEqual(self.committed(), [])
+
+        self.engine.insert(2)
+        self.assertListEqual(self.committed(), [(2,)])
+
+    def test_savepoint(self):
+        with self.engine.transaction():
+            self.engine.insert(1)
+
+            try:
+                with self.engine.transaction():
+                    self.engine.insert(2)
+                    raise ValueError
+            except ValueError:
+                pass
+
+            with self.engine.transaction():
+                self.engine.insert(3)
+
+            self.assertListEqual(self.committed(), [])
+
+        self.assertListEqual(self.committed(), [(1,), (3,)])
+
+
 class GenericDriver(Base, TestCase):
     "Test for the AntiORM generic driver"
     def setUp(self):
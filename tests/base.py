@@ -2,7 +2,7 @@
 
 from os.path import abspath, dirname, join
 
-from antiorm.utils import namedtuple_factory
+from antiorm.utils import columnar_factory, namedtuple_factory
 
 
 class Base:
@@ -77,6 +77,68 @@ class Base:
         self.assertSequenceEqual(result, [(u'Katie',),
                                           (u'Milly',)])
 
+    def test_statement_INSERT_single_many(self):
+        self.engine.chunk_size = 2
+
+        names = [u'Baljeet', u'Buford', u'Irving', u'Django', u'Adyson']
+        rowids = self.engine.test_statement_INSERT_single.many(
+            {'name': name} for name in names)
+
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT rowid, name FROM test_statement_INSERT_single")
+        result = cursor.fetchall()
+
+        self.assertSequenceEqual(result, zip(rowids, names))
+
+    def test_statement_INSERT_single_many_multirow(self):
+        self.engine.chunk_size = 2
+
+        names = [u'Baljeet', u'Buford', u'Irving', u'Django', u'Adyson']
+        rowids = self.engine.test_statement_INSERT_single.many(
+            ({'name': name} for name in names), multirow=True)
+
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT rowid, name FROM test_statement_INSERT_single")
+        result = cursor.fetchall()
+
+        self.assertSequenceEqual(result, zip(rowids, names))
+
+    def test_statement_INSERT_single_many_norowids(self):
+        rowids = self.engine.test_statement_INSERT_single.many(
+            [{'name': 'Jenny'}, {'name': 'Suzy'}], rowids=False)
+
+        self.assertIsNone(rowids)
+
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT * FROM test_statement_INSERT_single")
+        result = cursor.fetchall()
+
+        self.assertSequenceEqual(result, [(u'Jenny',), (u'Suzy',)])
+
+    def test_statement_INSERT_single_stream(self):
+        names = [u'Baljeet', u'Buford', u'Irving', u'Django', u'Adyson']
+        rowids = self.engine.test_statement_INSERT_single.stream(
+            ({'name': name} for name in names), 2)
+
+        self.assertEqual(len(list(rowids)), 5)
+
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT name FROM test_statement_INSERT_single")
+        result = cursor.fetchall()
+
+        self.assertSequenceEqual(result, [(name,) for name in names])
+
+    def test_statement_INSERT_single_load(self):
+        count = self.engine.test_statement_INSERT_single.load(
+            ({'name': name} for name in ('Jenny', 'Suzy', 'Stacy')), 2,
+            rowids=False)
+
+        self.assertEqual(count, 3)
+
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT count(*) FROM test_statement_INSERT_single")
+        self.assertEqual(cursor.fetchone()[0], 3)
+
     def test_multiple_statement_INSERT(self):
         rowid = self.engine.test_multiple_statement_INSERT(name='Isabella',
                                                            surname='Saphiro')
@@ -135,6 +197,38 @@ class Base:
 
         self.assertListEqual(result, [u'Eiffel Tower'])
 
+    def test_one_statement_value_args(self):
+        result = self.engine.test_one_statement_value('Time machine')
+
+        self.assertEqual(result, u'Time machine')
+
+    def test_one_statement_value_one(self):
+        result = self.engine.test_one_statement_value.one({'doing': 'Comet'})
+
+        self.assertEqual(result, u'Comet')
+
+    def test_one_statement_value_many(self):
+        result = self.engine.test_one_statement_value.many(
+            {'doing': doing} for doing in ('Beach', 'Rollercoaster'))
+
+        self.assertListEqual(result, [u'Beach', u'Rollercoaster'])
+
+    def test_one_statement_value_extra(self):
+        with self.assertRaises(TypeError):
+            self.engine.test_one_statement_value(doing='Tree house',
+                                                 extra=True)
+
+    def test_one_statement_value_missing(self):
+        with self.assertRaises(TypeError):
+            self.engine.test_one_statement_value()
+
+    def test_one_statement_value_stream(self):
+        result = self.engine.test_one_statement_value.stream(
+            {'doing': doing} for doing in ('Beach', 'Rollercoaster', 'Comet'))
+
+        self.assertEqual(next(result), u'Beach')
+        self.assertListEqual(list(result), [u'Rollercoaster', u'Comet'])
+
     def test_one_statement_register(self):
         result = self.engine.test_one_statement_register(doing='Monster')
 
@@ -167,6 +261,27 @@ class Base:
         for index, l in enumerate(result):
             self.assertSequenceEqual(l, expected[index])
 
+    def test_one_statement_table_iter(self):
+        result = self.engine.test_one_statement_table.iter({'doing': 'Racing'})
+
+        self.assertNotIsInstance(result, list)
+        self.assertListEqual(list(result), [(u'Racing',)])
+
+    def test_one_statement_table_iter_server_side(self):
+        self.engine.server_side = True
+        self.engine.itersize = 1
+
+        result = self.engine.test_one_statement_table.iter({'doing': 'Racing'})
+
+        self.assertListEqual(list(result), [(u'Racing',)])
+
+    def test_one_statement_table_columnar(self):
+        self.engine.column_factory = columnar_factory
+
+        result = self.engine.test_one_statement_table(doing='Surfing')
+
+        self.assertDictEqual(dict(result), {'doing': [u'Surfing']})
+
     def test_multiple_statement(self):
         cursor = self.connection.cursor()
         cursor.execute("INSERT INTO test_multiple_statement(name) VALUES('a')")
@@ -209,3 +324,13 @@ class Base:
 
         self.assertEqual(result.name, u'Phineas')
         self.assertEqual(result.surname, u'Flinn')
+
+    def test_row_factory_table(self):
+        self.engine.row_factory = namedtuple_factory
+
+        result = self.engine.test_one_statement_table(doing='Skating')
+        self.assertEqual(result[0].doing, u'Skating')
+
+        result = list(self.engine.test_one_statement_table.iter({'doing':
+                                                                 'Diving'}))
+        self.assertEqual(result[0].doing, u'Diving')
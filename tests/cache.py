@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+from os       import remove
+from os.path  import abspath, dirname, exists, join
+from shutil   import rmtree
+from sqlite3  import connect
+from tempfile import mkdtemp
+from unittest import main, TestCase
+
+import sys
+sys.path.insert(0, '..')
+
+import antiorm.base
+
+from antiorm.backends.sqlite import Sqlite
+from antiorm.cache           import SpecCache
+
+
+dir_path = join(abspath(dirname(__file__)), 'samples_sql')
+
+
+class TestCache(TestCase):
+    "Test for the AntiORM parsed methods cache"
+
+    def setUp(self):
+        self.tmp_path = mkdtemp()
+        self.cache_path = join(self.tmp_path, 'cache')
+
+    def tearDown(self):
+        rmtree(self.tmp_path)
+
+    def test_warm_start(self):
+        Sqlite(connect(":memory:"), dir_path, cache_path=self.cache_path)
+
+        self.assertTrue(exists(self.cache_path))
+
+        # Methods should be build from the cache without parsing them again
+        parse_sql = antiorm.base.parse_sql
+        read_only = antiorm.base.read_only
+
+        def fail(*args, **kwargs):
+            self.fail("SQL code was parsed")
+        antiorm.base.parse_sql = fail
+        antiorm.base.read_only = fail
+
+        try:
+            engine = Sqlite(connect(":memory:"), dir_path,
+                            cache_path=self.cache_path)
+            Sqlite(connect(":memory:"), dir_path, cache_path=self.cache_path,
+                   replicas=[connect(":memory:")])
+        finally:
+            antiorm.base.parse_sql = parse_sql
+            antiorm.base.read_only = read_only
+
+        self.assertEqual(engine.test_one_statement_value(doing='Cached'),
+                         u'Cached')
+
+    def test_invalid_cache(self):
+        with open(self.cache_path, 'wb') as file_cache:
+            file_cache.write('garbage')
+
+        engine = Sqlite(connect(":memory:"), dir_path,
+                        cache_path=self.cache_path)
+
+        self.assertEqual(engine.test_one_statement_value(doing='Garbage'),
+                         u'Garbage')
+        self.assertEqual(len(SpecCache(self.cache_path)), 7)
+
+    def test_key_include(self):
+        cache = SpecCache(self.cache_path)
+
+        sql = 'INCLUDE "included.sql"'
+        key = cache.key(sql, [self.tmp_path])
+
+        included_path = join(self.tmp_path, 'included.sql')
+
+        # Creating the included file change the key
+        with open(included_path, 'w') as file_sql:
+            file_sql.write('SELECT 1')
+        key_created = cache.key(sql, [self.tmp_path])
+        self.assertNotEqual(key, key_created)
+
+        # Modifying the included file change the key
+        with open(included_path, 'w') as file_sql:
+            file_sql.write('SELECT 2')
+        key_modified = cache.key(sql, [self.tmp_path])
+        self.assertNotEqual(key_created, key_modified)
+
+        self.assertEqual(key_modified, cache.key(sql, [self.tmp_path]))
+
+        remove(included_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+from os.path  import abspath, dirname, join
+from sqlite3  import connect
+from unittest import main, TestCase
+
+import sys
+sys.path.insert(0, '..')
+
+from antiorm.backends.generic import Generic
+from antiorm.backends.sqlite  import Sqlite
+from antiorm.catalog          import QueryCatalog
+
+
+dir_path = join(abspath(dirname(__file__)), 'samples_sql')
+
+
+class TestCatalog(TestCase):
+    "Test for the AntiORM shared catalog of methods"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.catalog = QueryCatalog(dir_path)
+
+    def test_catalog(self):
+        self.assertEqual(len(self.catalog), 7)
+        self.assertIn('test_one_statement_value', self.catalog)
+
+    def test_shared_class(self):
+        engine1 = Sqlite(connect(":memory:"), catalog=self.catalog)
+        engine2 = Sqlite(connect(":memory:"), catalog=self.catalog)
+
+        self.assertIs(type(engine1), type(engine2))
+        self.assertIsInstance(engine1, Sqlite)
+
+        self.assertIs(engine1.test_one_statement_value.func,
+                      engine2.test_one_statement_value.func)
+
+        # The methods are class descriptors, not instance attributes
+        for method in self.catalog:
+            self.assertNotIn(method.name, engine1.__dict__)
+
+        self.assertEqual(engine1.test_one_statement_value(doing='Candace'),
+                         u'Candace')
+        self.assertEqual(engine2.test_one_statement_value(doing='Stacy'),
+                         u'Stacy')
+
+    def test_engine_types(self):
+        engine1 = Sqlite(connect(":memory:"), catalog=self.catalog)
+        engine2 = Generic(connect(":memory:"), catalog=self.catalog)
+
+        self.assertIsNot(type(engine1), type(engine2))
+        self.assertIsInstance(engine2, Generic)
+
+        self.assertEqual(engine2.test_one_statement_value(doing='Isabella'),
+                         u'Isabella')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+from inspect  import getargspec
+from os.path  import abspath, dirname, join
+from sqlite3  import connect
+from unittest import main, TestCase
+
+import sys
+sys.path.insert(0, '..')
+
+from antiorm.compiler import compile_dir
+
+from base import Base
+
+
+dir_path = join(abspath(dirname(__file__)), 'samples_sql')
+
+
+def compile_engine(backend):
+    namespace = {}
+    exec compile_dir(dir_path, backend) in namespace
+    return namespace['Queries']
+
+
+class Compiled(Base):
+    def test_methods_compiled(self):
+        self.assertIs(self.engine.test_one_statement_value.func,
+                      type(self.engine).__dict__['test_one_statement_value']
+                      .func)
+
+    def test_methods_not_on_instance(self):
+        self.assertNotIn('test_one_statement_value', self.engine.__dict__)
+        self.assertEqual(self.engine.test_one_statement_value.__name__,
+                         'test_one_statement_value')
+
+    def test_signature(self):
+        self.assertEqual(getargspec(self.engine.test_one_statement_value.func)
+                         [:2], (['self', 'doing'], '_args'))
+
+
+class Driver(Compiled, TestCase):
+    "Test for the AntiORM compiled SQLite driver"
+    def setUp(self):
+        self.connection = connect(":memory:")
+        self.engine = compile_engine('Sqlite')(self.connection)
+
+        Compiled.setUp(self)
+
+
+class GenericDriver(Compiled, TestCase):
+    "Test for the AntiORM compiled generic driver"
+    def setUp(self):
+        self.connection = connect(":memory:")
+        self.engine = compile_engine('Generic')(self.connection)
+
+        Compiled.setUp(self)
+
+
+if __name__ == "__main__":
+    main()
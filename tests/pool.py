@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+
+from os.path   import join
+from shutil    import rmtree
+from sqlite3   import connect, ProgrammingError
+from tempfile  import mkdtemp
+from threading import Thread
+from unittest  import main, TestCase
+
+import sys
+sys.path.insert(0, '..')
+
+from antiorm import pool
+
+from antiorm.backends.generic import Generic
+from antiorm.pool             import ConnectionPool, PoolTimeout
+from antiorm.pool             import ThreadLocalConnection
+from antiorm.utils            import driver_factory
+
+
+class TestPool(TestCase):
+    "Test for the pool of connections"
+
+    def setUp(self):
+        self.opened = []
+
+        def factory():
+            conn = connect(":memory:", check_same_thread=False)
+            self.opened.append(conn)
+            return conn
+
+        self.factory = factory
+
+    def test_checkout(self):
+        connections = ConnectionPool(self.factory, min_size=2, max_size=3)
+        self.assertEqual(len(connections), 2)
+
+        conn = connections.checkout()
+        connections.checkin(conn)
+
+        # Most recently returned connection is reused
+        self.assertIs(connections.checkout(), conn)
+
+        connections.checkout()
+        connections.checkout()
+        self.assertEqual(len(connections), 3)
+        self.assertEqual(len(self.opened), 3)
+
+    def test_timeout(self):
+        connections = ConnectionPool(self.factory, max_size=1, timeout=0.01)
+
+        conn = connections.checkout()
+        self.assertRaises(PoolTimeout, connections.checkout)
+
+        # Waiting checkouts get the returned connections
+        result = []
+        thread = Thread(target=lambda: result.append(connections.checkout()))
+
+        connections.timeout = None
+        thread.start()
+        connections.checkin(conn)
+        thread.join()
+
+        self.assertListEqual(result, [conn])
+
+    def test_idle_timeout(self):
+        now = [100]
+        time = pool.time
+        pool.time = lambda: now[0]
+
+        try:
+            connections = ConnectionPool(self.factory, min_size=1, max_size=3,
+                                         idle_timeout=10)
+            checked = [connections.checkout() for index in xrange(3)]
+            for conn in checked:
+                connections.checkin(conn)
+            self.assertEqual(connections.idle, 3)
+
+            now[0] = 111
+            connections.checkout()
+
+            self.assertEqual(len(connections), 1)
+            self.assertEqual(connections.idle, 0)
+        finally:
+            pool.time = time
+
+    def test_health_check(self):
+        connections = ConnectionPool(self.factory, check_interval=0)
+
+        conn = connections.checkout()
+        conn.close()
+        connections.checkin(conn)
+
+        self.assertIsNot(connections.checkout(), conn)
+        self.assertEqual(len(connections), 1)
+        self.assertEqual(len(self.opened), 2)
+
+    def test_broken(self):
+        connections = ConnectionPool(self.factory, health_check=None)
+
+        connections.checkin(connections.checkout(), broken=True)
+
+        self.assertEqual(len(connections), 0)
+        self.assertIsNot(connections.checkout(), self.opened[0])
+
+
+class TestPooledEngine(TestCase):
+    "Test for the engines using a pool of connections"
+
+    def setUp(self):
+        self.tmp_path = mkdtemp()
+        db_path = join(self.tmp_path, 'db')
+
+        conn = connect(db_path)
+        conn.execute("CREATE TABLE numbers (value INTEGER)")
+        conn.commit()
+        conn.close()
+
+        self.pool = ConnectionPool(lambda: connect(db_path, timeout=10,
+                                                   check_same_thread=False),
+                                   max_size=4)
+        self.engine = Generic(self.pool)
+        self.engine.parse_string("INSERT INTO numbers VALUES (:value);",
+                                 "insert")
+        self.engine.parse_string("SELECT value FROM numbers "
+                                 "ORDER BY value;", "numbers")
+
+    def tearDown(self):
+        self.pool.close()
+        rmtree(self.tmp_path)
+
+    def test_threads(self):
+        def worker(start):
+            for value in xrange(start, start + 25):
+                self.engine.insert(value)
+
+        threads = [Thread(target=worker, args=(start,))
+                   for start in xrange(0, 100, 25)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertListEqual(self.engine.numbers(),
+                             [(value,) for value in xrange(100)])
+        self.assertEqual(self.pool.idle, len(self.pool))
+
+    def test_row_factory(self):
+        self.engine.insert(7)
+        self.engine.row_factory = lambda cursor, row: row[0]
+
+        self.assertListEqual(self.engine.numbers(), [7])
+
+    def test_iter(self):
+        self.engine.insert.many([{'value': 1}, {'value': 2}])
+
+        rows = self.engine.numbers.iter({})
+        self.assertEqual(next(rows), (1,))
+        self.assertEqual(self.pool.idle, 0)
+
+        # Nested transactions of the same thread use the same connection
+        self.engine.insert(3)
+        self.assertEqual(len(self.pool), 1)
+
+        self.assertListEqual(list(rows), [(2,)])
+        self.assertEqual(self.pool.idle, 1)
+        self.assertListEqual(self.engine.numbers(), [(1,), (2,), (3,)])
+
+    def test_transaction(self):
+        with self.engine.transaction():
+            self.engine.insert.many([{'value': 1}, {'value': 2}])
+
+            try:
+                with self.engine.transaction():
+                    self.engine.insert(3)
+                    raise ValueError
+            except ValueError:
+                pass
+
+            # All the calls use the connection of the transaction
+            self.assertListEqual(self.engine.numbers(), [(1,), (2,)])
+            self.assertEqual(self.pool.idle, 0)
+
+        self.assertEqual(len(self.pool), 1)
+        self.assertEqual(self.pool.idle, 1)
+        self.assertListEqual(self.engine.numbers(), [(1,), (2,)])
+
+
+
+class TestThreadLocal(TestCase):
+    "Test for the engines using a connection for each thread"
+
+    def setUp(self):
+        self.tmp_path = mkdtemp()
+        db_path = join(self.tmp_path, 'db')
+
+        self.opened = []
+
+        def factory():
+            conn = connect(db_path, timeout=10)
+            self.opened.append(conn)
+            return conn
+
+        self.connection = ThreadLocalConnection(factory,
+                                                ["PRAGMA journal_mode=WAL"])
+        self.engine = driver_factory(self.connection)
+        self.engine.parse_string("CREATE TABLE numbers (value INTEGER);",
+                                 "create")
+        self.engine.parse_string("INSERT INTO numbers VALUES (:value);",
+                                 "insert")
+        self.engine.parse_string("SELECT value FROM numbers "
+                                 "ORDER BY value;", "numbers")
+        self.engine.parse_string("PRAGMA journal_mode;", "journal_mode")
+
+        self.engine.create()
+        self.engine.insert.many([{'value': 1}, {'value': 2}])
+
+    def tearDown(self):
+        self.connection.close()
+        rmtree(self.tmp_path)
+
+    def test_threads(self):
+        self.engine.row_factory = lambda cursor, row: row[0]
+
+        results = []
+
+        def worker():
+            self.engine.insert(3)
+            results.append((self.engine.numbers(),
+                            self.engine.journal_mode()))
+
+        threads = [Thread(target=worker) for index in xrange(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Each thread has its own connection with the pragmas and row factory
+        self.assertEqual(len(self.opened), 5)
+        self.assertEqual(len(set(self.opened)), 5)
+        for numbers, journal_mode in results:
+            self.assertListEqual(numbers[:2], [1, 2])
+            self.assertEqual(journal_mode, [u'wal'])
+
+        self.assertListEqual(self.engine.numbers(), [1, 2, 3, 3, 3, 3])
+
+    def test_finished_threads(self):
+        opened = []
+
+        def factory():
+            conn = connect(join(self.tmp_path, 'db'), check_same_thread=False)
+            opened.append(conn)
+            return conn
+
+        connection = ThreadLocalConnection(factory)
+
+        for index in xrange(20):
+            thread = Thread(target=lambda: connection.cursor())
+            thread.start()
+            thread.join()
+
+        # Only the connection of the last finished thread is kept
+        self.assertEqual(len(opened), 20)
+        self.assertEqual(len(connection._connections), 1)
+
+        self.assertRaises(ProgrammingError, opened[0].cursor)
+        opened[19].cursor()
+
+        connection.cursor()
+        self.assertEqual(len(connection._connections), 1)
+        self.assertRaises(ProgrammingError, opened[19].cursor)
+
+        connection.close()
+
+    def test_close(self):
+        self.connection.close()
+
+        # A new connection is opened on the next use
+        self.assertListEqual(self.engine.numbers(), [(1,), (2,)])
+        self.assertEqual(len(self.opened), 2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+
+from sqlite3  import connect
+from unittest import main, TestCase
+
+import sys
+sys.path.insert(0, '..')
+
+from antiorm import results
+
+from antiorm.backends.sqlite import Sqlite
+from antiorm.results         import query_tables, read_only, ResultCache
+
+
+class TestQueryTables(TestCase):
+    "Test for the tables used by the queries"
+
+    def test_select(self):
+        self.assertEqual(query_tables("SELECT * FROM users WHERE id = :id"),
+                         (frozenset(['users']), frozenset()))
+
+    def test_join(self):
+        reads, writes = query_tables('SELECT u.name FROM main.users AS u '
+                                     'LEFT JOIN "Emails" e ON u.id = e.uid, '
+                                     'logs')
+        self.assertEqual(reads, frozenset(['users', 'emails']))
+        self.assertEqual(writes, frozenset())
+
+        reads, writes = query_tables("SELECT * FROM users, logs l")
+        self.assertEqual(reads, frozenset(['users', 'logs']))
+
+    def test_subquery(self):
+        self.assertEqual(query_tables("SELECT * FROM (SELECT * FROM users) u"),
+                         (frozenset(['users']), frozenset()))
+
+    def test_writes(self):
+        self.assertEqual(query_tables("INSERT INTO users SELECT * FROM logs"),
+                         (frozenset(['logs']), frozenset(['users'])))
+        self.assertEqual(query_tables("UPDATE users SET name = :name")[1],
+                         frozenset(['users']))
+        self.assertEqual(query_tables("DELETE FROM `users`")[1],
+                         frozenset(['users']))
+        self.assertEqual(query_tables(("UPDATE users SET name = :name",
+                                       "SELECT * FROM logs")),
+                         (frozenset(['logs']), frozenset(['users'])))
+
+    def test_unknown(self):
+        self.assertIsNone(query_tables("DROP TABLE users")[1])
+        self.assertIsNone(query_tables(("SELECT * FROM users",
+                                        "CREATE TABLE logs (id)"))[1])
+
+    def test_read_only(self):
+        self.assertTrue(read_only("SELECT * FROM users WHERE id = :id"))
+        self.assertTrue(read_only(("SELECT * FROM users",
+                                   "SELECT * FROM logs")))
+
+        self.assertFalse(read_only("UPDATE users SET name = :name"))
+        self.assertFalse(read_only("PRAGMA user_version"))
+        self.assertFalse(read_only("SELECT * FROM users FOR UPDATE"))
+        self.assertFalse(read_only("SELECT * FROM users "
+                                   "LOCK IN SHARE MODE"))
+        self.assertFalse(read_only("SELECT * FROM users "
+                                   "FOR NO KEY UPDATE SKIP LOCKED"))
+
+
+class TestResultCache(TestCase):
+    "Test for the LRU cache of the results"
+
+    def test_lru(self):
+        cache = ResultCache(2)
+
+        cache.set((1,), 'a')
+        cache.set((2,), 'b')
+        self.assertEqual(cache.get((1,)), 'a')
+        cache.set((3,), 'c')
+
+        self.assertIsNone(cache.get((2,)))
+        self.assertEqual(cache.get((1,)), 'a')
+        self.assertEqual(cache.stats(), {'hits': 2, 'misses': 1,
+                                         'evictions': 1, 'invalidations': 0,
+                                         'size': 2})
+
+    def test_ttl(self):
+        now = [100]
+        time = results.time
+        results.time = lambda: now[0]
+
+        try:
+            cache = ResultCache(ttl=10)
+            cache.set((1,), 'a')
+
+            now[0] = 105
+            self.assertEqual(cache.get((1,)), 'a')
+
+            now[0] = 111
+            self.assertIsNone(cache.get((1,)))
+            self.assertEqual(cache.evictions, 1)
+            self.assertEqual(len(cache), 0)
+        finally:
+            results.time = time
+
+    def test_generation(self):
+        cache = ResultCache()
+
+        generation = cache.generation
+        cache.clear()
+        cache.set((1,), 'a', generation)
+
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.invalidations, 1)
+
+
+class TestEngineCache(TestCase):
+    "Test for the cached results of the engine methods"
+
+    def setUp(self):
+        self.connection = connect(":memory:")
+        self.connection.execute("CREATE TABLE users "
+                                "(id INTEGER PRIMARY KEY, name TEXT)")
+        self.connection.execute("CREATE TABLE logs (message TEXT)")
+        self.connection.execute("INSERT INTO users VALUES (1, 'Lawrence')")
+
+        self.engine = Sqlite(self.connection)
+        self.engine.parse_string("SELECT name FROM users WHERE id = :id "
+                                 "LIMIT 1;", "name")
+        self.engine.parse_string("UPDATE users SET name = :name "
+                                 "WHERE id = :id;", "rename")
+        self.engine.parse_string("INSERT INTO logs VALUES (:message);", "log")
+
+    def test_hits(self):
+        cache = self.engine.cache_results('name')
+
+        self.assertEqual(self.engine.name(1), u'Lawrence')
+        self.connection.execute("UPDATE users SET name = 'Linda'")
+
+        self.assertEqual(self.engine.name(1), u'Lawrence')
+        self.assertEqual(self.engine.name(id=1), u'Lawrence')
+        self.assertEqual(self.engine.name({'id': 1}), u'Lawrence')
+        self.assertEqual(self.engine.name.one({'id': 1}), u'Lawrence')
+        self.assertEqual(self.engine.cache_stats(),
+                         {'name': {'hits': 4, 'misses': 1, 'evictions': 0,
+                                   'invalidations': 0, 'size': 1}})
+
+        # List calls are not cached
+        self.assertListEqual(self.engine.name([{'id': 1}]), [u'Linda'])
+        self.assertEqual(cache.hits + cache.misses, 5)
+
+    def test_invalidation(self):
+        cache = self.engine.cache_results('name')
+
+        self.assertEqual(self.engine.name(1), u'Lawrence')
+
+        self.engine.log(u'unrelated')
+        self.assertEqual(cache.invalidations, 0)
+
+        self.engine.rename(u'Linda', 1)
+        self.assertEqual(cache.invalidations, 1)
+        self.assertEqual(self.engine.name(1), u'Linda')
+
+        self.engine.rename.many([{'id': 1, 'name': u'Lucy'}])
+        self.assertEqual(self.engine.name(1), u'Lucy')
+
+    def test_invalidation_once(self):
+        cache = self.engine.cache_results('name')
+
+        # Dict and list calls are dispatched to the other entry points
+        self.engine.rename({'id': 1, 'name': u'Linda'})
+        self.assertEqual(cache.invalidations, 1)
+
+        self.engine.rename([{'id': 1, 'name': u'Lucy'}])
+        self.assertEqual(cache.invalidations, 2)
+        self.assertEqual(self.engine.name(1), u'Lucy')
+
+    def test_copies(self):
+        self.engine.parse_string("SELECT id, name FROM users;", "users")
+        self.engine.cache_results('users')
+        self.engine.row_factory = lambda cursor, row: {'id': row[0],
+                                                       'name': row[1]}
+
+        users = self.engine.users()
+        users.append(None)
+        users[0]['name'] = u'Linda'
+
+        self.assertListEqual(self.engine.users(),
+                             [{'id': 1, 'name': u'Lawrence'}])
+
+    def test_later_methods(self):
+        cache = self.engine.cache_results('name')
+        self.engine.name(1)
+
+        self.engine.parse_string("DELETE FROM users;", "clear")
+        self.engine.clear()
+
+        self.assertEqual(cache.invalidations, 1)
+        self.assertIsNone(self.engine.name(1))
+
+    def test_write_method(self):
+        self.assertRaises(ValueError, self.engine.cache_results, 'rename')
+
+    def test_transaction_rollback(self):
+        self.connection.commit()
+        cache = self.engine.cache_results('name')
+        self.assertEqual(self.engine.name(1), u'Lawrence')
+
+        def transaction():
+            with self.engine.transaction():
+                self.engine.rename(u'Linda', 1)
+                self.assertEqual(self.engine.name(1), u'Linda')
+                raise ValueError
+
+        self.assertRaises(ValueError, transaction)
+
+        # The not committed results were not cached
+        self.assertEqual(self.engine.name(1), u'Lawrence')
+        self.assertEqual(self.engine.name(1), u'Lawrence')
+        self.assertEqual(cache.hits, 1)
+
+    def test_transaction_commit(self):
+        cache = self.engine.cache_results('name')
+
+        with self.engine.transaction():
+            self.engine.rename(u'Linda', 1)
+
+            # Results cached meanwhile (like by other threads) are discarded
+            cache.set((1,), u'Lawrence')
+
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(self.engine.name(1), u'Linda')
+
+
+if __name__ == "__main__":
+    main()
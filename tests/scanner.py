@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+from io       import open
+from os       import listdir
+from os.path  import abspath, dirname, join
+from unittest import main, TestCase
+
+import sys
+sys.path.insert(0, '..')
+
+from antiorm.base    import parse_sql_full
+from antiorm.scanner import scan
+from antiorm.utils   import named2pyformat
+
+
+dir_path = join(abspath(dirname(__file__)), 'samples_sql')
+
+
+# Common shapes of queries, that should be classified by the scanner
+COMMON = [
+    u"INSERT INTO users (name, email) VALUES (:name, :email)",
+    u"INSERT INTO users(name) VALUES(:name);",
+    u"INSERT INTO t (a) SELECT b FROM u WHERE c = :c",
+    u"SELECT name FROM users WHERE id = :id LIMIT 1",
+    u"SELECT COUNT(*) FROM users LIMIT 1",
+    u"SELECT COUNT(*) AS total FROM users WHERE age > :age LIMIT 1",
+    u"SELECT u.name AS name FROM users AS u WHERE u.id = :id LIMIT 1",
+    u"SELECT * FROM users WHERE id = :id LIMIT 1",
+    u"SELECT name, email FROM users WHERE id = :id LIMIT 1",
+    u"SELECT name, email\nFROM users\nWHERE id=:id\nLIMIT 1;",
+    u"SELECT 'a, b' AS text, 'it''s' AS quoted LIMIT 1",
+    u"SELECT :doing AS doing LIMIT 1",
+    u"SELECT * FROM users",
+    u"SELECT name FROM users WHERE name LIKE :pattern ORDER BY name",
+    u"SELECT name FROM users LIMIT 10",
+    u"SELECT name FROM users LIMIT :limit",
+    u"SELECT name FROM users LIMIT 1 OFFSET 10",
+    u"SELECT * FROM (SELECT id FROM users LIMIT 1) AS s",
+    u"SELECT a + b, a || b, -1, 0.5, a*b FROM t WHERE a >= -2 LIMIT 1",
+    u"SELECT MAX(age) FROM users WHERE ? < age LIMIT 1",
+    u"UPDATE users SET name = :name WHERE id = :id",
+    u"DELETE FROM users WHERE id = :id",
+    u"INSERT INTO a (x) VALUES (:x);UPDATE a SET y = :y WHERE x = :x;",
+    u"INSERT INTO a (x) VALUES (:x);\n\nUPDATE a SET y = :y WHERE x = :x",
+    u"UPDATE a SET x = 1;\nUPDATE a SET y = 2;",
+    u"DELETE FROM a; DELETE FROM b; DELETE FROM c;",
+    u"SELECT ñame FROM tabla WHERE año = :año LIMIT 1",
+]
+
+# Queries that should be left to sqlparse
+UNSAFE = [
+    u"-- comment\nSELECT 1 LIMIT 1",
+    u"SELECT 1 /* comment */ LIMIT 1",
+    u'SELECT "name" FROM users LIMIT 1',
+    u"SELECT `name` FROM users LIMIT 1",
+    u"SELECT [name] FROM users LIMIT 1",
+    u"select name from users limit 1",
+    u"insert into users (name) values (:name)",
+    u"SELECT x::int FROM t",
+    u"SELECT %(name)s",
+    u"SELECT 1e5, 0x1F LIMIT 1",
+    u"INCLUDE \"other.sql\"",
+    u"CREATE TRIGGER t AFTER INSERT ON a BEGIN UPDATE b SET c = 1; END;",
+    u"SELECT CASE WHEN a THEN b END FROM t",
+    u"SELECT 'back\\\\slash' LIMIT 1",
+    u"SELECT 1;;SELECT 2",
+    u"",
+]
+
+
+class TestScanner(TestCase):
+    "Differential test of the scanner against the sqlparse classifier"
+
+    def assertClassification(self, sql, paramstyle=None):
+        parsed = scan(sql, paramstyle)
+        if parsed is not None:
+            self.assertEqual(parsed,
+                             parse_sql_full(sql, [dir_path], paramstyle), sql)
+        return parsed
+
+    def test_common(self):
+        for sql in COMMON:
+            self.assertIsNotNone(self.assertClassification(sql), sql)
+
+    def test_common_pyformat(self):
+        for sql in COMMON:
+            self.assertClassification(sql, named2pyformat)
+
+    def test_unsafe(self):
+        for sql in UNSAFE:
+            self.assertIsNone(scan(sql), sql)
+
+    def test_samples(self):
+        for filename in listdir(dir_path):
+            with open(join(dir_path, filename), 'rt') as file_sql:
+                self.assertIsNotNone(self.assertClassification(file_sql.read()),
+                                     filename)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,16 @@
 # -*- coding: utf-8 -*-
 
-from unittest import main, TestCase
+from threading import Thread
+from unittest  import main, TestCase
 
 import sys
 sys.path.insert(0, '..')
 
-from antiorm.utils import namedtuple_factory, named2pyformat
+from antiorm import utils
+from antiorm.utils import args_getter, columnar_factory
+from antiorm.utils import namedtuple_batch_factory
+from antiorm.utils import namedtuple_factory, named2format, named2pyformat
+from antiorm.utils import named2qmark, TransactionManager
 
 
 class FakeCursor:
@@ -32,12 +37,173 @@ class TestUtils(TestCase):
         self.assertEqual(namedtuple.b, 'y')
         self.assertEqual(namedtuple.c, 'z')
 
+    def test_namedtuple_factory_cached(self):
+        row1 = namedtuple_factory(self.fakecursor, ('x', 'y', 'z'))
+        row2 = namedtuple_factory(FakeCursor(('a', 'b', 'c')), (1, 2, 3))
+        row3 = namedtuple_factory(FakeCursor(('a', 'b')), (1, 2))
+
+        self.assertIs(type(row1), type(row2))
+        self.assertIsNot(type(row1), type(row3))
+
+    def test_namedtuple_factory_lru(self):
+        size = utils.ROW_TYPES_SIZE
+        utils.ROW_TYPES_SIZE = 2
+        try:
+            first = type(namedtuple_factory(FakeCursor(('a',)), (1,)))
+            namedtuple_factory(FakeCursor(('b',)), (1,))
+            namedtuple_factory(FakeCursor(('c',)), (1,))
+
+            self.assertLessEqual(len(utils._row_types), 2)
+            self.assertIsNot(type(namedtuple_factory(FakeCursor(('a',)),
+                                                     (1,))),
+                             first)
+        finally:
+            utils.ROW_TYPES_SIZE = size
+
+    def test_namedtuple_batch_factory(self):
+        rows = namedtuple_batch_factory(self.fakecursor, [('x', 'y', 'z'),
+                                                          (1, 2, 3)])
+
+        self.assertListEqual(rows, [('x', 'y', 'z'), (1, 2, 3)])
+        self.assertEqual(rows[1].c, 3)
+        self.assertIs(type(rows[0]), type(rows[1]))
+
+    def test_columnar_factory(self):
+        columns = columnar_factory(self.fakecursor,
+                                   [[(1, 1.5, 'x'), (2, 2.5, 'y')],
+                                    [(3, 3.5, 'z')]])
+
+        self.assertListEqual(columns.keys(), ['a', 'b', 'c'])
+        self.assertListEqual(list(columns['a']), [1, 2, 3])
+        self.assertListEqual(list(columns['b']), [1.5, 2.5, 3.5])
+        self.assertListEqual(columns['c'], ['x', 'y', 'z'])
+
+        if utils.numpy is None:
+            self.assertEqual(columns['a'].typecode, 'l')
+            self.assertEqual(columns['b'].typecode, 'd')
+
+    def test_columnar_factory_mixed(self):
+        columns = columnar_factory(self.fakecursor,
+                                   [[(1, None, 'x'), (2, 2.5, 'y')],
+                                    [(None, 3.5, 'z')]])
+
+        self.assertListEqual(columns['a'], [1, 2, None])
+        self.assertListEqual(columns['b'], [None, 2.5, 3.5])
+
+    def test_columnar_factory_empty(self):
+        columns = columnar_factory(self.fakecursor, [])
+
+        self.assertDictEqual(dict(columns), {'a': [], 'b': [], 'c': []})
+
     def test_named2pyformat(self):
         self.assertEqual(named2pyformat(""), "")
         self.assertEqual(named2pyformat("asdf"), "asdf")
         self.assertEqual(named2pyformat("a :formated word"),
                          "a %(formated)s word")
 
+    def test_named2qmark(self):
+        self.assertEqual(named2qmark(""), ("", ()))
+        self.assertEqual(named2qmark("asdf"), ("asdf", ()))
+        self.assertEqual(named2qmark("SELECT :a, :b, :a"),
+                         ("SELECT ?, ?, ?", ('a', 'b', 'a')))
+
+        # String literals, quoted names and casts are not parameters
+        self.assertEqual(named2qmark("SELECT ':a', \"b:c\", d::text, :d"),
+                         ("SELECT ':a', \"b:c\", d::text, ?", ('d',)))
+        self.assertEqual(named2qmark("SELECT 'it''s :a', :b"),
+                         ("SELECT 'it''s :a', ?", ('b',)))
+
+        # Placeholders of other paramstyles can't be mixed
+        self.assertRaises(ValueError, named2qmark, "SELECT :a, ?")
+
+        self.assertEqual(named2qmark("SELECT '?', :a"),
+                         ("SELECT '?', ?", ('a',)))
+
+        # Percent signs are only modulo operators for qmark drivers
+        self.assertEqual(named2qmark("SELECT a%size, :b"),
+                         ("SELECT a%size, ?", ('b',)))
+
+    def test_named2format(self):
+        self.assertEqual(named2format("a :formated word"),
+                         ("a %s word", ('formated',)))
+
+        # Literal percent signs are escaped
+        self.assertEqual(named2format("SELECT * WHERE a LIKE 'b%' AND c = :c"),
+                         ("SELECT * WHERE a LIKE 'b%%' AND c = %s", ('c',)))
+        self.assertEqual(named2format("SELECT a%size, :b"),
+                         ("SELECT a%%size, %s", ('b',)))
+
+        # Question marks are operators (PostgreSQL jsonb) for format drivers
+        self.assertEqual(named2format("SELECT d ? 'k', d ?| :keys"),
+                         ("SELECT d ? 'k', d ?| %s", ('keys',)))
+
+        # Pyformat placeholders can't be mixed
+        self.assertRaises(ValueError, named2format, "SELECT :a, %(b)s")
+
+    def test_args_getter(self):
+        kwargs = {'a': 1, 'b': 2, 'c': 3}
+
+        self.assertEqual(args_getter(())(kwargs), ())
+        self.assertEqual(args_getter(('b',))(kwargs), (2,))
+        self.assertEqual(args_getter(('c', 'a', 'c'))(kwargs), (3, 1, 3))
+
+        self.assertRaises(KeyError, args_getter(('d',)), kwargs)
+
+    def test_transaction_manager_lock(self):
+        class Connection(object):
+            def commit(self):
+                pass
+
+            def rollback(self):
+                pass
+
+        class Wrapper(object):
+            def __init__(self, connection):
+                self._connection = connection
+
+        first = Connection()
+        second = Connection()
+
+        manager = TransactionManager(first)
+        self.assertIs(manager._lock, TransactionManager(Wrapper(first))._lock)
+        self.assertIsNot(manager._lock, TransactionManager(second)._lock)
+        self.assertIsNone(TransactionManager(first, lock=False)._lock)
+
+        # The lock is released also if the transaction fails
+        def fail():
+            with manager:
+                raise ValueError
+
+        self.assertRaises(ValueError, fail)
+
+        def acquire():
+            acquired.append(manager._lock.acquire(False))
+            if acquired[0]:
+                manager._lock.release()
+
+        acquired = []
+        thread = Thread(target=acquire)
+        thread.start()
+        thread.join()
+        self.assertListEqual(acquired, [True])
+
+    def test_transaction_manager_reentrant(self):
+        class Connection(object):
+            commits = 0
+
+            def commit(self):
+                self.commits += 1
+
+        connection = Connection()
+        manager = TransactionManager(connection)
+
+        # Nested transactions of the same thread don't wait for the lock
+        with manager:
+            with TransactionManager(connection):
+                pass
+
+        self.assertEqual(connection.commits, 2)
+
 
 if __name__ == "__main__":
     main()